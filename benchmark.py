@@ -0,0 +1,499 @@
+"""Local microbenchmarks for Voiz.
+
+Measures the hot paths that run on the user's machine (no API calls):
+
+    --callback       Recorder._audio_callback throughput with synthetic blocks
+    --encode         Recorder.stop() encode time and peak memory (10/60/600 s takes)
+    --icon           create_icon() cost per status
+    --hotkey         on_press/on_release key normalization path
+    --hotkey-native  Native X11 backend: wakeups while typing and combination
+                     delivery latency (needs an X server, e.g. xvfb-run)
+    --start-latency  Recorder.start() latency, cold vs. warm stream
+    --resample       Native-rate conversion: CPU per second of audio and
+                     quality (SNR vs. an ideal 16 kHz signal, alias rejection)
+    --vocabulary     Custom-vocabulary pass per transcript (1k / 5k / 20k rules)
+    --workers        Main-thread responsiveness (1 ms timer lateness) while a
+                     48 kHz stereo take is converted and encoded in a thread
+                     vs. in the worker-process pool
+    --all            Everything above
+
+--fake replaces sounddevice with a stub whose InputStream is a synthetic
+stream, so the suite runs without audio hardware or PortAudio (--callback
+and --encode never need a device).
+Results can be stored as JSON and compared between revisions:
+
+    python benchmark.py --all --fake --out before.json
+    ... change code ...
+    python benchmark.py --all --fake --out after.json --compare before.json
+"""
+
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import types
+
+import numpy as np
+
+if __name__ == "__main__" and "--fake" in sys.argv:
+    # Importing the real sounddevice fails without PortAudio. recorder only
+    # needs these names at import time; use_fake_stream() sets InputStream.
+    _sd = types.ModuleType("sounddevice")
+    _sd.PortAudioError = type("PortAudioError", (Exception,), {})
+    _sd.CallbackFlags = object
+    _sd.InputStream = None
+    _sd.query_devices = lambda kind=None: {"max_input_channels": 1, "default_samplerate": 16000}
+    sys.modules["sounddevice"] = _sd
+
+import recorder
+from recorder import CHANNELS, SAMPLE_RATE, Recorder
+from resample import StreamResampler
+from vocabulary import Vocabulary
+from workers import WorkerPool, encode_wav
+
+BLOCK_SIZE = 512  # Typical PortAudio block at 16 kHz (~32 ms)
+
+
+# ---------------------------------------------------------------------------
+# Fake audio stream (no hardware needed)
+# ---------------------------------------------------------------------------
+
+class FakeInputStream:
+    """Stand-in for sd.InputStream that feeds synthetic blocks in real time."""
+
+    def __init__(
+        self,
+        samplerate: float,
+        channels: int,
+        dtype: str,
+        callback,
+        blocksize: int = 0,
+        **kwargs: object,
+    ) -> None:
+        self._callback = callback
+        self._blocksize = blocksize or BLOCK_SIZE
+        self._interval = self._blocksize / samplerate
+        self._block = _synthetic_block(self._blocksize, channels)
+        self._running = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        next_at = time.perf_counter()
+        while self._running.is_set():
+            self._callback(self._block, self._blocksize, None, None)
+            next_at += self._interval
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+
+
+def use_fake_stream() -> None:
+    """Makes every Recorder use FakeInputStream instead of the sound card."""
+    recorder.sd.InputStream = FakeInputStream
+
+
+def _synthetic_block(frames: int, channels: int = CHANNELS) -> np.ndarray:
+    """Returns speech-level noise as an int16 block (frames x channels)."""
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal((frames, channels)) * 3000).astype(np.int16)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _summary(samples_ms: list[float]) -> dict:
+    """Returns min / median / p95 / max of a list of milliseconds."""
+    ordered = sorted(samples_ms)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "min_ms": round(ordered[0], 4),
+        "median_ms": round(statistics.median(ordered), 4),
+        "p95_ms": round(p95, 4),
+        "max_ms": round(ordered[-1], 4),
+        "runs": len(ordered),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+        )
+        return result.stdout.strip() or "unknown"
+    except (OSError, subprocess.TimeoutExpired):
+        return "unknown"
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+def bench_audio_callback(blocks: int = 20_000, repeats: int = 5) -> dict:
+    """Measures Recorder._audio_callback cost per block while recording."""
+    block = _synthetic_block(BLOCK_SIZE)
+    samples = []
+    for _ in range(repeats):
+        rec = Recorder()
+        rec._recording = True
+        callback = rec._audio_callback
+        t0 = time.perf_counter()
+        for _ in range(blocks):
+            callback(block, BLOCK_SIZE, None, None)
+        samples.append((time.perf_counter() - t0) * 1000 / blocks)
+    result = _summary(samples)
+    # How many times faster than real time the callback keeps up
+    block_ms = BLOCK_SIZE / SAMPLE_RATE * 1000
+    result["realtime_factor"] = round(block_ms / result["median_ms"])
+    return {"per_block": result}
+
+
+def bench_encode(durations_s: tuple[int, ...] = (10, 60, 600), repeats: int = 3) -> dict:
+    """Measures Recorder.stop() (concatenate + WAV encode) time and peak memory."""
+    block = _synthetic_block(BLOCK_SIZE)
+    results = {}
+    for duration in durations_s:
+        n_blocks = duration * SAMPLE_RATE // BLOCK_SIZE
+        times, peaks = [], []
+        for _ in range(repeats):
+            rec = Recorder()
+            rec._frames = [block.copy() for _ in range(n_blocks)]
+            rec._recording = True
+            rec._stream = FakeInputStream(SAMPLE_RATE, CHANNELS, "int16", rec._audio_callback)
+
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            wav = rec.stop()
+            times.append((time.perf_counter() - t0) * 1000)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            del wav
+        result = _summary(times)
+        result["peak_mb"] = round(max(peaks) / 1024 / 1024, 2)
+        results[f"{duration}s"] = result
+    return results
+
+
+def bench_create_icon(runs: int = 50) -> dict:
+    """Measures create_icon() for each tray status."""
+    from main import COLOR_MAP, create_icon
+
+    results = {}
+    for status in COLOR_MAP:
+        create_icon(status)  # Warm up font/PIL caches
+        samples = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            create_icon(status)
+            samples.append((time.perf_counter() - t0) * 1000)
+        results[status] = _summary(samples)
+    return results
+
+
+def bench_hotkey(keystrokes: int = 100_000) -> dict:
+    """Measures the per-keystroke cost of the hotkey handler.
+
+    Replays ordinary typing (letters, shift, backspace) through
+    on_press/on_release -- the path every system-wide keystroke takes.
+    """
+    from pynput import keyboard
+    from main import make_hotkey_handlers
+
+    on_press, on_release = make_hotkey_handlers(types.SimpleNamespace())
+    keys = [keyboard.KeyCode.from_char(c) for c in "the quick brown fox jumps"]
+    keys += [keyboard.Key.shift, keyboard.Key.backspace, keyboard.Key.enter]
+
+    samples = []
+    for _ in range(5):
+        t0 = time.perf_counter()
+        for i in range(keystrokes):
+            key = keys[i % len(keys)]
+            on_press(key)
+            on_release(key)
+        samples.append((time.perf_counter() - t0) * 1000 / keystrokes)
+    result = _summary(samples)
+    result["median_us"] = round(result["median_ms"] * 1000, 3)
+    return {"per_keystroke": result}
+
+
+def bench_hotkey_native(keystrokes: int = 2000) -> dict:
+    """Types through XTest with the X11 backend registered (see hotkeys.selftest).
+
+    wakeups_per_1k is how often ordinary typing woke the backend (0 = the
+    per-keystroke cost is gone); the timing is press-to-callback latency.
+    """
+    from hotkeys import selftest
+
+    result = selftest(keystrokes)
+    if not result["correct"]:
+        raise RuntimeError(f"{result['combos_received']}/{result['combos_expected']} combinations matched")
+    delivery = _summary(result["latencies_ms"])
+    delivery["wakeups_per_1k"] = round(result["wakeups_while_typing"] * 1000 / keystrokes, 2)
+    return {"x11_delivery": delivery}
+
+
+def bench_start_latency(runs: int = 20, take_s: float = 0.2) -> dict:
+    """Measures Recorder.start() latency with a cold vs. warm input stream.
+
+    Cold: a new sd.InputStream is opened on every start() (default mode).
+    Warm: the stream stays open, start() only swaps buffers.
+
+    Needs a working input device unless use_fake_stream() was called.
+    """
+    results = {}
+    for label, warm in (("cold", False), ("warm", True)):
+        rec = Recorder(warm=warm, idle_release_s=0)
+        rec.warm_up()
+        time.sleep(0.5)  # Let the pre-roll fill
+        samples = []
+        try:
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                rec.start()
+                samples.append((time.perf_counter() - t0) * 1000)
+                time.sleep(take_s)
+                rec.stop()
+                time.sleep(0.05)
+        finally:
+            rec.close()
+        results[label] = _summary(samples)
+    return results
+
+
+def bench_resample(
+    rates: tuple[int, ...] = (44_100, 48_000, 96_000),
+    seconds: int = 10,
+    repeats: int = 5,
+) -> dict:
+    """Measures StreamResampler cost and quality for common device rates.
+
+    Cost is CPU time per second of stereo audio, fed in 10 ms blocks like
+    the capture path. Quality: SNR of a 440 Hz + 3 kHz test signal against
+    the same signal generated directly at 16 kHz, and the level of a
+    10 kHz tone (above the 8 kHz output Nyquist) that must not fold back,
+    floored at one int16 LSB.
+    """
+    results = {}
+    for rate in rates:
+        block = rate // 100
+        t = np.arange(rate * seconds) / rate
+        signal = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.2 * np.sin(2 * np.pi * 3000 * t)
+        stereo = np.repeat((signal * 32767).astype(np.int16)[:, None], 2, axis=1)
+
+        samples = []
+        for _ in range(repeats):
+            resampler = StreamResampler(rate, SAMPLE_RATE)
+            t0 = time.perf_counter()
+            out = [resampler.process(stereo[i:i + block]) for i in range(0, len(stereo), block)]
+            out.append(resampler.flush())
+            samples.append((time.perf_counter() - t0) * 1000 / seconds)
+        result = _summary(samples)
+
+        converted = np.concatenate(out).astype(np.float64) / 32767
+        t_out = np.arange(len(converted)) / SAMPLE_RATE
+        ideal = 0.3 * np.sin(2 * np.pi * 440 * t_out) + 0.2 * np.sin(2 * np.pi * 3000 * t_out)
+        edge = SAMPLE_RATE // 10  # Skip the filter's start-up and tail
+        error = converted[edge:-edge] - ideal[edge:-edge]
+        result["snr_db"] = round(
+            10 * np.log10(np.sum(ideal[edge:-edge] ** 2) / np.sum(error ** 2)), 1
+        )
+
+        tone = (0.5 * np.sin(2 * np.pi * 10_000 * t[:rate]) * 32767).astype(np.int16)
+        resampler = StreamResampler(rate, SAMPLE_RATE)
+        folded = np.concatenate([resampler.process(tone), resampler.flush()])[edge:-edge]
+        level = np.sqrt(np.mean((folded.astype(np.float64) / 32767) ** 2)) / (0.5 / np.sqrt(2))
+        lsb = 1 / 32767 / (0.5 / np.sqrt(2))  # int16 output cannot go lower
+        result["alias_db"] = round(20 * np.log10(max(level, lsb)), 1)
+        results[f"{rate // 1000}k_stereo"] = result
+    return results
+
+
+def bench_vocabulary(
+    sizes: tuple[int, ...] = (1_000, 5_000, 20_000),
+    words: int = 250,
+    runs: int = 200,
+) -> dict:
+    """Measures Vocabulary.apply() on a ~250-word transcript.
+
+    Synthetic rules (single words and two-word phrases); about one word in
+    twenty of the transcript is a dictionary hit.
+    """
+    rng = random.Random(0)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    filler = ["the", "and", "we", "meeting", "tomorrow", "project", "about", "should"]
+    results = {}
+    for size in sizes:
+        terms = ["".join(rng.choices(alphabet, k=rng.randint(4, 10))) for _ in range(size + 1)]
+        lines = [
+            f"{terms[i]} {terms[i + 1]} => {terms[i].title()}{terms[i + 1].title()}"
+            if i % 3 == 0 else f"{terms[i]} => {terms[i].upper()}"
+            for i in range(size)
+        ]
+        vocab = Vocabulary.parse("\n".join(lines))
+        text = " ".join(
+            rng.choice(terms) if rng.random() < 0.05 else rng.choice(filler)
+            for _ in range(words)
+        )
+        samples = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            vocab.apply(text)
+            samples.append((time.perf_counter() - t0) * 1000)
+        results[f"{size}_rules"] = _summary(samples)
+    return results
+
+
+def bench_workers(durations_s: tuple[int, ...] = (60, 600), rate: int = 48_000) -> dict:
+    """Measures how late a 1 ms main-thread timer fires during encoding.
+
+    The lateness stands in for the hotkey listener and tray loop, which
+    need the GIL while a take is being converted. "encode_ms" is the time
+    until the WAV bytes are back.
+    """
+    block = _synthetic_block(rate * 32 // 1000, 2)
+    pool = WorkerPool(1)
+    pool.start()
+    pool.encode_take([block], rate)  # Wait until the worker is up
+    results = {}
+    for duration in durations_s:
+        frames = [block.copy() for _ in range(duration * 1000 // 32)]
+        for mode in ("thread", "process"):
+            encode = (
+                (lambda: encode_wav(np.concatenate(frames, axis=0), rate))
+                if mode == "thread" else (lambda: pool.encode_take(frames, rate))
+            )
+            done = threading.Event()
+            elapsed = [0.0]
+
+            def run() -> None:
+                t0 = time.perf_counter()
+                encode()
+                elapsed[0] = (time.perf_counter() - t0) * 1000
+                done.set()
+
+            lateness = []
+            threading.Thread(target=run, daemon=True).start()
+            while not done.is_set():
+                t0 = time.perf_counter()
+                time.sleep(0.001)
+                lateness.append((time.perf_counter() - t0 - 0.001) * 1000)
+            result = _summary(lateness)
+            result["encode_ms"] = round(elapsed[0], 1)
+            results[f"{mode}_{duration}s"] = result
+    pool.shutdown()
+    return results
+
+
+BENCHMARKS = {
+    "--callback": ("audio_callback", bench_audio_callback),
+    "--encode": ("encode", bench_encode),
+    "--icon": ("create_icon", bench_create_icon),
+    "--hotkey": ("hotkey", bench_hotkey),
+    "--hotkey-native": ("hotkey_native", bench_hotkey_native),
+    "--start-latency": ("start_latency", bench_start_latency),
+    "--resample": ("resample", bench_resample),
+    "--vocabulary": ("vocabulary", bench_vocabulary),
+    "--workers": ("workers", bench_workers),
+}
+
+
+# ---------------------------------------------------------------------------
+# Output & comparison
+# ---------------------------------------------------------------------------
+
+def _print_results(name: str, results: dict) -> None:
+    print(f"  {name}")
+    for label, stats in results.items():
+        if "error" in stats:
+            print(f"    {label:<14} skipped: {stats['error']}")
+            continue
+        extra = "".join(
+            f"  {k} {v}" for k, v in stats.items()
+            if k in ("peak_mb", "realtime_factor", "median_us", "snr_db", "alias_db", "encode_ms", "wakeups_per_1k")
+        )
+        print(
+            f"    {label:<14} median {stats['median_ms']:10.4f} ms  "
+            f"p95 {stats['p95_ms']:10.4f} ms  ({stats['runs']} runs){extra}"
+        )
+
+
+def _compare(old: dict, new: dict) -> None:
+    """Prints the median change per metric between two result files."""
+    print(f"\n  Compared with {old.get('revision', '?')} -> {new.get('revision', '?')}")
+    for bench, results in new["results"].items():
+        for label, stats in results.items():
+            before = old.get("results", {}).get(bench, {}).get(label, {})
+            if "median_ms" not in stats or "median_ms" not in before:
+                continue
+            change = (stats["median_ms"] - before["median_ms"]) / before["median_ms"] * 100
+            print(
+                f"    {bench + '/' + label:<28} {before['median_ms']:10.4f} -> "
+                f"{stats['median_ms']:10.4f} ms  ({change:+.1f}%)"
+            )
+
+
+def _arg_value(flag: str) -> str | None:
+    if flag in sys.argv and sys.argv.index(flag) + 1 < len(sys.argv):
+        return sys.argv[sys.argv.index(flag) + 1]
+    return None
+
+
+if __name__ == "__main__":
+    selected = [flag for flag in BENCHMARKS if flag in sys.argv or "--all" in sys.argv]
+    if not selected:
+        print(
+            "Usage: python benchmark.py [--all | --callback --encode --icon --hotkey "
+            "--hotkey-native --start-latency --resample --vocabulary --workers] [--fake] [--runs N] [--out FILE] [--compare FILE]"
+        )
+        sys.exit(1)
+
+    if "--fake" in sys.argv:
+        use_fake_stream()
+
+    report = {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fake_stream": "--fake" in sys.argv,
+        "results": {},
+    }
+    for flag in selected:
+        name, bench = BENCHMARKS[flag]
+        kwargs = {}
+        if flag == "--start-latency" and _arg_value("--runs"):
+            kwargs["runs"] = int(_arg_value("--runs"))
+        try:
+            results = bench(**kwargs)
+        except Exception as e:  # Missing device / display -> skip, keep the rest
+            reason = (str(e).splitlines() or [""])[0]
+            results = {"all": {"error": f"{type(e).__name__}: {reason}"}}
+        report["results"][name] = results
+        _print_results(name, results)
+
+    if _arg_value("--out"):
+        with open(_arg_value("--out"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n  Results written to {_arg_value('--out')}")
+
+    if _arg_value("--compare"):
+        with open(_arg_value("--compare"), "r", encoding="utf-8") as f:
+            _compare(json.load(f), report)
@@ -1,4 +1,5 @@
-"""API key management with keyring (Windows Credential Manager / macOS Keychain).
+"""API key management with keyring (Windows Credential Manager / macOS Keychain)
+and user settings (settings.json in the app data directory).
 
 All GUI dialogs run in separate subprocesses to avoid threading conflicts
 with pystray (Tcl_AsyncDelete crash).
@@ -7,6 +8,8 @@ In PyInstaller mode, dialogs are invoked via the .exe's sub-commands
 (--api-key-dialog, --error-dialog) instead of python -c scripts.
 """
 
+import json
+import os
 import subprocess
 import sys
 import textwrap
@@ -18,6 +21,133 @@ KEY_NAME = "openai_api_key"
 
 _FROZEN = getattr(sys, 'frozen', False)
 
+# Defaults for every user-tunable setting. Users override individual keys in
+# settings.json; unknown keys are ignored.
+DEFAULT_SETTINGS: dict = {
+    "history_max_entries": 500,   # Oldest entries beyond this are deleted
+    "history_audio_days": 3,      # Raw audio is kept this long, then dropped
+    "transcription_model": "whisper-1",  # gpt-4o(-mini)-transcribe stream their output
+    "incremental_paste": False,   # Type streamed text into the focused app as it arrives
+    "streaming_upload": False,    # Send the audio while recording (one chunked request per take)
+    "vocabulary_path": "",        # Custom vocabulary file ("" = vocabulary.txt in the app data folder)
+    "vocabulary_prompt": True,    # Also send the vocabulary terms as a transcription prompt hint
+    "hotkey_backend": "auto",     # "auto" = register the combinations with the OS, else pynput; "pynput" = always pynput
+    "warm_microphone": False,     # Keep the input stream open between takes
+    "preroll_ms": 300,            # Warm mode: audio kept from before the hotkey press
+    "mic_idle_release_s": 300,    # Warm mode: release the device after this idle time (0 = never)
+    "native_sample_rate": False,  # Capture at the device rate, convert to 16 kHz mono
+    "worker_processes": 0,        # Resample/encode takes in N warm worker processes (0 = in the tray process)
+    "auto_stop": False,           # End the take automatically when the speaker stops talking
+    "auto_stop_silence_ms": 1200,  # Auto-stop: trailing silence that ends the take
+    "vad_hangover_ms": 300,       # Auto-stop: quiet time still counted as speech (word endings)
+    "vad_min_speech_ms": 500,     # Auto-stop: speech needed before it can trigger
+    "mem_sample_interval_s": 600,  # RSS sample to the metrics log every N seconds (0 = off)
+    "mem_idle_budget_mb": 150,    # Trim caches/buffers when idle above this RSS (0 = off)
+    "trace_sessions": False,      # Record anonymized job timing to trace.jsonl for loadgen.py
+    "profile_seconds": 30,        # Tray -> Diagnostics -> Profile CPU: sampling window
+    "profile_interval_ms": 10,    # Profiler: time between stack samples
+    "spool_max_mb": 200,          # Offline spool: total size cap for pending jobs
+    "spool_max_age_days": 7,      # Offline spool: pending jobs older than this are dropped
+    "spool_delivery": "history",  # Recovered results go to "history" or "clipboard"
+    "scheduler_max_concurrency": 4,  # API jobs running at once (hotkeys, retries, daemon)
+    "scheduler_interactive_slots": 1,  # Of those, slots only hotkey jobs may use
+    "scheduler_rate_per_min": 0,  # Request budget per minute across all lanes (0 = unlimited)
+    "scheduler_rate_reserve": 0.2,  # Share of that budget only hotkey jobs may use
+    "scheduler_preempt": True,    # Hotkey jobs abort background work when every slot is busy
+    # Endpoint pool, e.g. [{"name": "team-key"},
+    #   {"name": "azure-eu", "kind": "azure", "base_url": "https://x.openai.azure.com",
+    #    "api_version": "2024-06-01", "models": {"whisper-1": "whisper-deploy"}},
+    #   {"name": "local", "base_url": "http://127.0.0.1:8000/v1"}]
+    # Keys live in keyring (python endpoints.py --set-key NAME). Empty = the main key only.
+    "endpoints": [],
+    "daemon_port": 8765,          # Headless mode (--daemon): HTTP port on 127.0.0.1
+    "daemon_socket": "",          # Headless mode: optional Unix socket path
+    "daemon_token": "",           # Headless mode: bearer token ("" = generated, stored in daemon-token)
+    "daemon_workers": 4,          # Headless mode: concurrent jobs
+    "incremental_optimize": False,  # Re-send only edited paragraphs of long texts
+    "incremental_min_paragraphs": 3,  # Shorter texts are always sent whole
+    "langid_same_language": "proofread",  # Translate modes, text already in the target language: "proofread", "skip" or "off"
+    "email_compaction": "off",    # Email mode: drop quoted replies/signatures/disclaimers first: "strip", "context" or "off"
+    "email_context_chars": 300,   # "context": characters of the replied-to message kept as background
+    "translation_memory": False,  # Translate modes: reuse stored sentence translations
+    "transmem_max_entries": 20000,  # Translation memory: least recently used sentences beyond this are evicted
+    "transmem_fuzzy_threshold": 0.8,  # Similarity (0-1) for sending a stored translation as an edit hint
+    "local_model_path": "",       # GGUF instruct model for local text tools ("" = off)
+    "local_modes": ["slack", "translate_en", "translate_de"],  # Modes the local model may run
+    "local_max_chars": 600,       # Longer texts always go to the API
+    "local_fallback": True,       # Local model answers while the API is unreachable
+    "local_threads": 0,           # CPU threads for the local model (0 = llama.cpp default)
+    "cancel_keeps_audio": True,   # Cancelled recordings stay in the history (audio only)
+}
+
+
+# ---------------------------------------------------------------------------
+# App data directory & settings
+# ---------------------------------------------------------------------------
+
+def app_data_dir() -> str:
+    """Returns (and creates) the per-user directory for Voiz data.
+
+    Windows: %APPDATA%\\Voiz
+    macOS:   ~/Library/Application Support/Voiz
+    Linux:   $XDG_DATA_HOME/voiz (default ~/.local/share/voiz)
+    """
+    if sys.platform == "win32":
+        base = os.path.join(os.environ.get("APPDATA", os.path.expanduser("~")), "Voiz")
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~"), "Library", "Application Support", "Voiz")
+    else:
+        xdg = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+        base = os.path.join(xdg, "voiz")
+    os.makedirs(base, exist_ok=True)
+    return base
+
+
+def settings_path() -> str:
+    """Returns the path of the user's settings.json."""
+    return os.path.join(app_data_dir(), "settings.json")
+
+
+_settings_cache: dict = {"mtime": None, "values": dict(DEFAULT_SETTINGS)}
+
+
+def load_settings() -> dict:
+    """Returns the merged settings (defaults overridden by settings.json).
+
+    The file is re-read only when its modification time changes, so this
+    is cheap enough to call on every hotkey press.
+    """
+    path = settings_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+
+    if mtime != _settings_cache["mtime"]:
+        values = dict(DEFAULT_SETTINGS)
+        if mtime is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    user = json.load(f)
+                if isinstance(user, dict):
+                    values.update({k: v for k, v in user.items() if k in DEFAULT_SETTINGS})
+            except (OSError, ValueError):
+                pass  # Broken file -> fall back to defaults
+        _settings_cache["mtime"] = mtime
+        _settings_cache["values"] = values
+
+    return _settings_cache["values"]
+
+
+def get_setting(name: str):
+    """Returns a single setting value (see DEFAULT_SETTINGS)."""
+    return load_settings()[name]
+
+
+# ---------------------------------------------------------------------------
+# API key (keyring)
+# ---------------------------------------------------------------------------
+
 
 def get_api_key() -> str | None:
     """Reads the stored OpenAI API key from the Credential Manager."""
@@ -29,6 +159,16 @@ def set_api_key(api_key: str) -> None:
     keyring.set_password(SERVICE_NAME, KEY_NAME, api_key)
 
 
+def get_endpoint_key(name: str) -> str | None:
+    """Reads the API key of a named endpoint (see "endpoints" setting)."""
+    return keyring.get_password(SERVICE_NAME, f"{KEY_NAME}:{name}")
+
+
+def set_endpoint_key(name: str, api_key: str) -> None:
+    """Stores the API key of a named endpoint."""
+    keyring.set_password(SERVICE_NAME, f"{KEY_NAME}:{name}", api_key)
+
+
 def delete_api_key() -> None:
     """Deletes the stored API key."""
     try:
@@ -37,6 +177,11 @@ def delete_api_key() -> None:
         pass
 
 
+# ---------------------------------------------------------------------------
+# GUI dialogs (subprocesses)
+# ---------------------------------------------------------------------------
+
+
 def _subprocess_flags() -> int:
     """Returns creationflags to hide the console window on Windows."""
     if sys.platform == "win32":
@@ -0,0 +1,384 @@
+"""Headless Voiz service: local HTTP API for the transcription and text-tool
+pipeline (no tray, no hotkeys).
+
+Editor plugins and scripts on the same machine share one warm process --
+one endpoint pool with reused connections -- instead of each starting their
+own SDK clients. Listens on 127.0.0.1 (and optionally a Unix socket).
+
+Endpoints:
+    GET  /v1/health                      -> {"ok": true, "modes": [...], "scheduler": {...}}
+    POST /v1/transcriptions  (WAV body)  -> {"id": ..., "status": "queued"}
+    POST /v1/text  {"text": ..., "mode": ...}
+    GET  /v1/jobs/<id>                   -> status, result / error
+    GET  /v1/jobs/<id>/events            -> server-sent events: delta*, done | error
+
+Add ?wait=1 to a POST to get the finished job in the response, and
+?priority=interactive|speculative|background to pick the scheduler lane
+(default interactive; bulk jobs should use background so they yield to
+interactive requests -- see scheduler.py).
+Every request needs "Authorization: Bearer <token>". The token is the
+"daemon_token" setting or, if that is empty, a random token generated on
+first start and stored in the "daemon-token" file in the app data folder
+(readable by the user only). Requests with a Host other than
+127.0.0.1/localhost (DNS rebinding) are refused, and /v1/text only accepts
+Content-Type: application/json, so a web page cannot send it as a simple
+cross-origin request.
+
+Usage:
+    python daemon.py
+    voiz.exe --daemon
+"""
+
+import hmac
+import json
+import os
+import secrets
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from config import app_data_dir, get_api_key, get_setting
+from jobs import CancelledError
+from scheduler import INTERACTIVE, LANES, get_scheduler, run as run_scheduled
+from texttools import SYSTEM_PROMPTS, optimize_text
+from transcriber import transcribe
+
+MAX_BODY_BYTES = 100 * 1024 * 1024  # ~50 min of 16 kHz mono WAV
+MAX_FINISHED_JOBS = 200             # Finished jobs kept for status queries
+TOKEN_FILE = "daemon-token"          # Generated bearer token (app data folder)
+ALLOWED_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+
+
+class Job:
+    """A submitted transcription or text-tool request."""
+
+    def __init__(self, kind: str, lane: str = INTERACTIVE) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.lane = lane
+        self.status = "queued"
+        self.result: str | None = None
+        self.error: str | None = None
+        self.created = time.time()
+        self.finished: float | None = None
+        self.deltas: list[str] = []
+        self.changed = threading.Condition()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "priority": self.lane,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "error")
+
+
+class JobRunner:
+    """Runs jobs on a shared worker pool and keeps their state."""
+
+    def __init__(self, api_key: str, workers: int) -> None:
+        self._api_key = api_key
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="voiz-job")
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def submit_transcription(self, audio_bytes: bytes, lane: str = INTERACTIVE) -> Job:
+        job = self._add(Job("transcription", lane))
+
+        def _on_delta(delta: str) -> None:
+            with job.changed:
+                job.deltas.append(delta)
+                job.changed.notify_all()
+
+        self._executor.submit(
+            self._run, job,
+            lambda token: transcribe(audio_bytes, self._api_key, on_delta=_on_delta, cancel=token),
+        )
+        return job
+
+    def submit_text(self, text: str, mode: str, lane: str = INTERACTIVE) -> Job:
+        job = self._add(Job("text", lane))
+        self._executor.submit(
+            self._run, job, lambda token: optimize_text(text, mode, self._api_key, cancel=token)
+        )
+        return job
+
+    def _add(self, job: Job) -> Job:
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [j for j in self._jobs.values() if j.done]
+            for old in sorted(finished, key=lambda j: j.finished or 0)[:-MAX_FINISHED_JOBS]:
+                del self._jobs[old.id]
+        return job
+
+    @staticmethod
+    def _run(job: Job, fn) -> None:
+        def _start(token):
+            with job.changed:
+                job.status = "running"
+                job.changed.notify_all()
+            return fn(token)
+
+        try:
+            result = run_scheduled(job.lane, _start)
+            status, error = "done", None
+        except CancelledError:
+            result, status, error = None, "error", "Cancelled: preempted by an interactive job"
+        except Exception as e:
+            result, status, error = None, "error", str(e)
+        # finished before status: _add() reads both without this lock
+        with job.changed:
+            job.result, job.error = result, error
+            job.finished = time.time()
+            job.status = status
+            job.changed.notify_all()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """HTTP handler; the runner is attached to the server instance."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "Voiz"
+
+    # --- Routing ---
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        path = urlparse(self.path).path.rstrip("/")
+        if path == "/v1/health":
+            self._send_json(
+                200, {"ok": True, "modes": list(SYSTEM_PROMPTS), "scheduler": get_scheduler().stats()}
+            )
+        elif path.startswith("/v1/jobs/") and path.endswith("/events"):
+            self._stream_events(path[len("/v1/jobs/"):-len("/events")])
+        elif path.startswith("/v1/jobs/"):
+            job = self.server.runner.get(path[len("/v1/jobs/"):])
+            if job is None:
+                self._send_json(404, {"error": "Unknown job"})
+            else:
+                self._send_json(200, job.to_dict())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+        path = url.path.rstrip("/")
+        query = parse_qs(url.query)
+        wait = query.get("wait", ["0"])[0] not in ("0", "", "false")
+        lane = query.get("priority", [INTERACTIVE])[0]
+        if lane not in LANES:
+            self._send_json(400, {"error": f"Unknown priority: {lane}", "priorities": list(LANES)})
+            return
+
+        body = self._read_body()
+        if body is None:
+            return
+
+        runner = self.server.runner
+        if path == "/v1/transcriptions":
+            if not body:
+                self._send_json(400, {"error": "Empty audio body"})
+                return
+            job = runner.submit_transcription(body, lane)
+        elif path == "/v1/text":
+            content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type != "application/json":
+                self._send_json(415, {"error": "Content-Type must be application/json"})
+                return
+            try:
+                payload = json.loads(body or b"{}")
+                text, mode = payload["text"], payload["mode"]
+            except (ValueError, KeyError, TypeError):
+                self._send_json(400, {"error": 'Expected JSON {"text": ..., "mode": ...}'})
+                return
+            if mode not in SYSTEM_PROMPTS:
+                self._send_json(400, {"error": f"Unknown mode: {mode}", "modes": list(SYSTEM_PROMPTS)})
+                return
+            job = runner.submit_text(text, mode, lane)
+        else:
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        if wait:
+            with job.changed:
+                job.changed.wait_for(lambda: job.done)
+        self._send_json(200 if wait else 202, job.to_dict())
+
+    # --- Helpers ---
+
+    def _authorized(self) -> bool:
+        if self.server.check_host:
+            host = self.headers.get("Host", "")
+            name = host.rsplit(":", 1)[0] if not host.endswith("]") else host
+            if name.lower() not in ALLOWED_HOSTS:
+                self._send_json(403, {"error": "Host not allowed"})
+                return False
+        sent = self.headers.get("Authorization", "").encode("utf-8")
+        if hmac.compare_digest(sent, f"Bearer {self.server.token}".encode("utf-8")):
+            return True
+        self._send_json(401, {"error": "Missing or wrong bearer token"})
+        return False
+
+    def _read_body(self) -> bytes | None:
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": "Body too large or missing Content-Length"})
+            return None
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, code: int, payload: dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream_events(self, job_id: str) -> None:
+        """Sends transcript deltas as they arrive, then the final state."""
+        job = self.server.runner.get(job_id)
+        if job is None:
+            self._send_json(404, {"error": "Unknown job"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        sent = 0
+        try:
+            while True:
+                with job.changed:
+                    job.changed.wait_for(lambda: job.done or len(job.deltas) > sent, timeout=15)
+                    deltas = job.deltas[sent:]
+                    done = job.done
+                for delta in deltas:
+                    self._send_event("delta", {"delta": delta})
+                sent += len(deltas)
+                if done:
+                    self._send_event(job.status, job.to_dict())
+                    return
+                if not deltas:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_event(self, event: str, payload: dict) -> None:
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def address_string(self) -> str:
+        # Unix sockets have no (host, port) client address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass  # Keep the console quiet; jobs are reported via status calls
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _get_api_key() -> str | None:
+    return os.environ.get("OPENAI_API_KEY") or get_api_key()
+
+
+def token_path() -> str:
+    return os.path.join(app_data_dir(), TOKEN_FILE)
+
+
+def load_token() -> str:
+    """Returns the bearer token: the "daemon_token" setting, else the generated one."""
+    token = get_setting("daemon_token")
+    if token:
+        return token
+    path = token_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except OSError:
+        pass
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    return token
+
+
+def serve() -> None:
+    """Runs the daemon until interrupted."""
+    api_key = _get_api_key()
+    if not api_key:
+        print("  No API key found. Run Voiz once to store it, or set OPENAI_API_KEY.",
+              file=sys.stderr)
+        raise SystemExit(1)
+
+    runner = JobRunner(api_key, workers=int(get_setting("daemon_workers")))
+    token = load_token()
+    servers: list[socketserver.BaseServer] = []
+
+    http_server = ThreadingHTTPServer(("127.0.0.1", int(get_setting("daemon_port"))), Handler)
+    http_server.runner = runner
+    http_server.token = token
+    http_server.check_host = True
+    servers.append(http_server)
+    print(f"  Voiz daemon listening on http://127.0.0.1:{http_server.server_port}")
+    if not get_setting("daemon_token"):
+        print(f"  Bearer token: {token_path()}")
+
+    socket_path = get_setting("daemon_socket")
+    if socket_path and hasattr(socketserver, "UnixStreamServer"):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # Stale socket from a previous run
+        unix_server = _UnixHTTPServer(socket_path, Handler)
+        unix_server.runner = runner
+        unix_server.token = token
+        unix_server.check_host = False  # Not reachable from a browser
+        os.chmod(socket_path, 0o600)
+        servers.append(unix_server)
+        print(f"  Voiz daemon listening on unix:{socket_path}")
+
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    serve()
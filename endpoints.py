@@ -0,0 +1,405 @@
+"""Endpoint pool: several API keys / Azure deployments / local servers with
+latency-based routing.
+
+Every request goes to the healthy endpoint with the best score, which
+combines the observed latency (EWMA), recent error rate, requests in flight
+and the remaining rate limit reported by the server. Endpoints that keep
+failing are taken out of rotation for a cooldown period. Without an
+"endpoints" setting the pool holds a single endpoint using the main API key.
+
+using_pool(pool) replaces the shared pool for the calls made inside the
+block (current thread / task only) -- the library API uses it for injected
+clients (see voizapi.py).
+
+Can be used as a module or as a CLI:
+    python endpoints.py --status
+    python endpoints.py --set-key NAME
+"""
+
+import json
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TypeVar
+
+import openai
+from openai import AzureOpenAI, OpenAI
+
+from config import get_endpoint_key, get_setting, set_endpoint_key
+from jobs import CancelledError, CancelToken, run_cancellable
+from metrics import log_metric
+from spool import is_quota_error, is_transient_error
+
+T = TypeVar("T")
+
+EWMA_ALPHA = 0.3             # Weight of the newest latency / error sample
+INITIAL_LATENCY_S = 1.0      # Optimistic guess for endpoints without samples
+FAILURES_BEFORE_COOLDOWN = 3
+COOLDOWN_S = 30.0            # Doubles per further failure, up to MAX_COOLDOWN_S
+MAX_COOLDOWN_S = 600.0
+AUTH_COOLDOWN_S = 600.0
+MAX_IDLE_CLIENTS = 4         # Warm exclusive clients kept for cancellable calls
+
+# Keys that need no credentials (local OpenAI-compatible servers)
+_NO_KEY = "not-needed"
+
+
+def _parse_reset(value: str) -> float:
+    """Parses OpenAI's x-ratelimit-reset-* durations ("1s", "6m0s", "20ms")."""
+    total = 0.0
+    number = ""
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch.isdigit() or ch == ".":
+            number += ch
+        else:
+            unit = "ms" if value.startswith("ms", i) else ch
+            scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}.get(unit, 0.0)
+            total += float(number or 0) * scale
+            number = ""
+            i += len(unit) - 1
+        i += 1
+    return total
+
+
+class Endpoint:
+    """One API endpoint with its client and health statistics."""
+
+    def __init__(
+        self,
+        name: str,
+        api_key: str,
+        kind: str = "openai",
+        base_url: str | None = None,
+        api_version: str | None = None,
+        models: dict[str, str] | None = None,
+        max_retries: int = 2,
+        client: OpenAI | None = None,
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.base_url = base_url
+        self.api_version = api_version
+        self.api_key = api_key
+        self._models = models or {}
+        self._max_retries = max_retries
+        self._client: OpenAI | None = client
+        self._injected = client is not None  # Caller's client: shared, never closed here
+        self._idle_clients: list[OpenAI] = []
+        self._lock = threading.Lock()
+
+        self.latency_s = INITIAL_LATENCY_S
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.ratelimit_remaining: int | None = None
+        self.ratelimit_reset_at = 0.0
+
+    def model(self, name: str) -> str:
+        """Maps a model name to this endpoint's deployment name (Azure)."""
+        return self._models.get(name, name)
+
+    def client(self) -> OpenAI:
+        """Returns the endpoint's client (created once, connections reused)."""
+        with self._lock:
+            if self._client is None:
+                self._client = self.new_client()
+            return self._client
+
+    def checkout_client(self) -> OpenAI:
+        """Returns a client used by one call only, so closing it aborts just
+        that request. Clients are recycled to keep their connections warm.
+
+        An injected client is shared by all calls; cancelling stops waiting
+        for the request but does not close it."""
+        if self._injected:
+            return self._client
+        with self._lock:
+            if self._idle_clients:
+                return self._idle_clients.pop()
+        return self.new_client()
+
+    def checkin_client(self, client: OpenAI) -> None:
+        if self._injected:
+            return
+        with self._lock:
+            if len(self._idle_clients) < MAX_IDLE_CLIENTS:
+                self._idle_clients.append(client)
+                return
+        client.close()
+
+    def discard_client(self, client: OpenAI) -> None:
+        """Closes a checked-out client (aborts its request) unless injected."""
+        if not self._injected:
+            client.close()
+
+    def new_client(self) -> OpenAI:
+        """Creates a fresh client (own connection pool) for this endpoint."""
+        if self.kind == "azure":
+            return AzureOpenAI(
+                api_key=self.api_key,
+                azure_endpoint=self.base_url,
+                api_version=self.api_version,
+                max_retries=self._max_retries,
+            )
+        return OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=self._max_retries)
+
+    # --- Health ---
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def score(self, now: float) -> float:
+        """Expected cost of sending the next request here (lower is better)."""
+        score = self.latency_s * (1.0 + 4.0 * self.error_rate) * (1 + self.in_flight)
+        if self.ratelimit_remaining is not None and now < self.ratelimit_reset_at:
+            if self.ratelimit_remaining <= 0:
+                score += self.ratelimit_reset_at - now  # Would have to wait
+            elif self.ratelimit_remaining < 5:
+                score *= 2.0  # Keep some headroom for the other endpoints
+        return score
+
+    def observe(self, headers: object) -> None:
+        """Records rate-limit headers of a raw response."""
+        try:
+            remaining = headers.get("x-ratelimit-remaining-requests")
+            reset = headers.get("x-ratelimit-reset-requests")
+        except AttributeError:
+            return
+        if remaining is not None:
+            try:
+                self.ratelimit_remaining = int(remaining)
+            except ValueError:
+                return
+            self.ratelimit_reset_at = time.monotonic() + (_parse_reset(reset) if reset else 60.0)
+
+    def record_success(self, latency_s: float) -> None:
+        self.latency_s += EWMA_ALPHA * (latency_s - self.latency_s)
+        self.error_rate *= 1.0 - EWMA_ALPHA
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+
+    def record_failure(self, exc: BaseException) -> None:
+        now = time.monotonic()
+        self.error_rate += EWMA_ALPHA * (1.0 - self.error_rate)
+        self.consecutive_failures += 1
+        if isinstance(exc, (openai.AuthenticationError, openai.PermissionDeniedError)) or is_quota_error(exc):
+            # Key rejected or out of credit -- waiting for the rate limit won't help
+            self.unhealthy_until = now + AUTH_COOLDOWN_S
+        elif isinstance(exc, openai.RateLimitError):
+            self.ratelimit_remaining = 0
+            self.ratelimit_reset_at = max(self.ratelimit_reset_at, now + COOLDOWN_S)
+            self.unhealthy_until = self.ratelimit_reset_at
+        elif self.consecutive_failures >= FAILURES_BEFORE_COOLDOWN:
+            extra = self.consecutive_failures - FAILURES_BEFORE_COOLDOWN
+            self.unhealthy_until = now + min(COOLDOWN_S * 2 ** extra, MAX_COOLDOWN_S)
+
+
+class EndpointPool:
+    """Routes calls to the best endpoint and fails over on errors.
+
+    Usage:
+        pool = get_pool(api_key)
+        text = pool.call(lambda client, endpoint: ...)
+    """
+
+    def __init__(self, endpoints: list[Endpoint]) -> None:
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.endpoints = endpoints
+        self._lock = threading.Lock()
+
+    def choose(self, exclude: set[str] = frozenset()) -> Endpoint | None:
+        """Returns the best endpoint not in exclude (None if none is left).
+
+        If every candidate is out of rotation, the one that recovers first is
+        probed anyway -- a request is never refused just because all failed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.name not in exclude]
+            if not candidates:
+                return None
+            healthy = [e for e in candidates if e.is_healthy(now)]
+            if healthy:
+                return min(healthy, key=lambda e: e.score(now))
+            return min(candidates, key=lambda e: e.unhealthy_until)
+
+    def call(
+        self,
+        fn: Callable[[OpenAI, Endpoint], T],
+        can_retry: Callable[[], bool] = lambda: True,
+        cancel: CancelToken | None = None,
+    ) -> T:
+        """Runs fn(client, endpoint) on the best endpoint, failing over to
+        the next one on transient, credential or quota errors.
+
+        Args:
+            fn: Performs the request. May call endpoint.observe(headers).
+            can_retry: Checked before failing over (e.g. False once streamed
+                output has been handed to the user).
+            cancel: If given, the call gets its own client, and cancelling
+                the token closes it -- aborting the HTTP request.
+
+        Raises:
+            CancelledError: If the token was cancelled.
+        """
+        tried: set[str] = set()
+        while True:
+            if cancel is not None:
+                cancel.check()
+            endpoint = self.choose(tried)
+            if endpoint is None:
+                raise RuntimeError("No API endpoint available")
+            tried.add(endpoint.name)
+
+            remove_abort = None
+            if cancel is not None:
+                client = endpoint.checkout_client()
+                remove_abort = cancel.on_cancel(lambda: endpoint.discard_client(client))
+            else:
+                client = endpoint.client()
+            with self._lock:
+                endpoint.in_flight += 1
+            t0 = time.perf_counter()
+            try:
+                if cancel is not None:
+                    result = run_cancellable(lambda: fn(client, endpoint), cancel)
+                else:
+                    result = fn(client, endpoint)
+            except Exception as e:
+                latency = time.perf_counter() - t0
+                if remove_abort is not None:
+                    remove_abort()
+                    if cancel.cancelled:
+                        # Aborted by the user -- not the endpoint's fault
+                        with self._lock:
+                            endpoint.in_flight -= 1
+                        raise CancelledError() from e
+                    endpoint.discard_client(client)  # Connection state unknown after an error
+                with self._lock:
+                    endpoint.in_flight -= 1
+                    endpoint.record_failure(e)
+                log_metric(
+                    "endpoint_call", endpoint=endpoint.name, ok=False,
+                    latency_ms=round(latency * 1000), error=type(e).__name__,
+                )
+                # Credential and quota errors are per key: another endpoint may work
+                retryable = is_transient_error(e) or is_quota_error(e) or isinstance(
+                    e, (openai.AuthenticationError, openai.PermissionDeniedError)
+                )
+                if not retryable or not can_retry() or len(tried) >= len(self.endpoints):
+                    raise
+                continue
+
+            latency = time.perf_counter() - t0
+            if remove_abort is not None:
+                remove_abort()
+                if cancel.cancelled:
+                    with self._lock:
+                        endpoint.in_flight -= 1
+                    raise CancelledError()
+                endpoint.checkin_client(client)
+            with self._lock:
+                endpoint.in_flight -= 1
+                endpoint.record_success(latency)
+            log_metric(
+                "endpoint_call", endpoint=endpoint.name, ok=True,
+                latency_ms=round(latency * 1000),
+            )
+            return result
+
+
+# ---------------------------------------------------------------------------
+# Pool construction (from settings)
+# ---------------------------------------------------------------------------
+
+_pool_cache: dict = {"key": None, "pool": None}
+_pool_lock = threading.Lock()
+_pool_override: ContextVar[EndpointPool | None] = ContextVar("voiz_pool", default=None)
+
+
+def _build_endpoints(api_key: str, configured: list[dict]) -> list[Endpoint]:
+    if not configured:
+        return [Endpoint("default", api_key)]
+
+    # With several endpoints, failing over beats the SDK's own retry backoff
+    max_retries = 2 if len(configured) == 1 else 0
+    endpoints = []
+    for spec in configured:
+        name = spec.get("name") or f"endpoint-{len(endpoints) + 1}"
+        key = get_endpoint_key(name)
+        if not key:
+            # The main key is the natural default for plain OpenAI entries;
+            # local servers usually accept anything.
+            key = api_key if not spec.get("base_url") else _NO_KEY
+        endpoints.append(Endpoint(
+            name,
+            key,
+            kind=spec.get("kind", "openai"),
+            base_url=spec.get("base_url"),
+            api_version=spec.get("api_version"),
+            models=spec.get("models"),
+            max_retries=max_retries,
+        ))
+    return endpoints
+
+
+def get_pool(api_key: str) -> EndpointPool:
+    """Returns the shared pool for the current settings (built once)."""
+    override = _pool_override.get()
+    if override is not None:
+        return override
+    configured = get_setting("endpoints") or []
+    cache_key = (api_key, json.dumps(configured, sort_keys=True))
+    with _pool_lock:
+        if _pool_cache["key"] != cache_key:
+            _pool_cache["pool"] = EndpointPool(_build_endpoints(api_key, configured))
+            _pool_cache["key"] = cache_key
+        return _pool_cache["pool"]
+
+
+def pool_for_client(client: OpenAI) -> EndpointPool:
+    """Returns a single-endpoint pool that sends every call to `client`."""
+    return EndpointPool([Endpoint("injected", "", client=client)])
+
+
+@contextmanager
+def using_pool(pool: EndpointPool | None) -> Iterator[None]:
+    """Makes get_pool() return `pool` inside the block (None = no change)."""
+    token = _pool_override.set(pool) if pool is not None else None
+    try:
+        yield
+    finally:
+        if token is not None:
+            _pool_override.reset(token)
+
+
+# ---------------------------------------------------------------------------
+# CLI interface
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    if "--set-key" in sys.argv and sys.argv.index("--set-key") + 1 < len(sys.argv):
+        import getpass
+        name = sys.argv[sys.argv.index("--set-key") + 1]
+        key = getpass.getpass(f"  API key for endpoint '{name}': ").strip()
+        if key:
+            set_endpoint_key(name, key)
+            print("  Key stored.")
+    elif "--status" in sys.argv:
+        configured = get_setting("endpoints") or []
+        if not configured:
+            print("  No endpoints configured -- the main API key is used.")
+        for spec in configured:
+            name = spec.get("name", "?")
+            where = spec.get("base_url") or "api.openai.com"
+            has_key = "key stored" if get_endpoint_key(name) else "no key"
+            print(f"  {name:<16} {spec.get('kind', 'openai'):<7} {where}  ({has_key})")
+    else:
+        print("Usage: python endpoints.py [--status | --set-key NAME]")
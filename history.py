@@ -0,0 +1,249 @@
+"""Local transcript and text-tool history (SQLite + full-text index).
+
+Every transcript and every text-tool result is stored so it can be re-pasted
+or re-run through another mode without a new recording or API call.
+Raw audio is kept only for a limited time (see "history_audio_days").
+
+Can be used as a module (from main.py) or as a CLI:
+    python history.py --list
+    python history.py --search "budget meeting"
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from config import app_data_dir, get_setting
+
+KIND_TRANSCRIPT = "transcript"
+KIND_TOOL = "tool"
+
+PRUNE_INTERVAL_S = 3600  # add() prunes at most this often (the tray app runs for weeks)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    kind    TEXT NOT NULL,
+    mode    TEXT,
+    source  TEXT,
+    text    TEXT NOT NULL,
+    audio   BLOB
+);
+CREATE INDEX IF NOT EXISTS entries_created ON entries(created);
+"""
+
+# External-content FTS5 table kept in sync by triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    text, source, content='entries', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, text, source) VALUES (new.id, new.text, new.source);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, text, source)
+    VALUES ('delete', old.id, old.text, old.source);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE OF text, source ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, text, source)
+    VALUES ('delete', old.id, old.text, old.source);
+    INSERT INTO entries_fts(rowid, text, source) VALUES (new.id, new.text, new.source);
+END;
+"""
+
+_COLUMNS = "id, created, kind, mode, source, text, audio IS NOT NULL"
+_E_COLUMNS = "e.id, e.created, e.kind, e.mode, e.source, e.text, e.audio IS NOT NULL"
+
+
+def default_path() -> str:
+    """Returns the path of the history database."""
+    return os.path.join(app_data_dir(), "history.sqlite3")
+
+
+class HistoryEntry:
+    """A single stored transcript or text-tool result."""
+
+    __slots__ = ("id", "created", "kind", "mode", "source", "text", "has_audio")
+
+    def __init__(
+        self,
+        id: int,
+        created: float,
+        kind: str,
+        mode: str | None,
+        source: str | None,
+        text: str,
+        has_audio: bool,
+    ) -> None:
+        self.id = id
+        self.created = created
+        self.kind = kind
+        self.mode = mode
+        self.source = source
+        self.text = text
+        self.has_audio = bool(has_audio)
+
+    def preview(self, length: int = 40) -> str:
+        """Returns a single-line preview of the text."""
+        if not self.text and self.has_audio:
+            return "(audio only)"
+        line = " ".join(self.text.split())
+        return line[:length] + ("..." if len(line) > length else "")
+
+
+class History:
+    """Thread-safe SQLite history store.
+
+    Usage:
+        history = History()
+        entry_id = history.add(KIND_TRANSCRIPT, "Hello world", audio=wav_bytes)
+        history.recent(10)
+        history.search("hello")
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self._path = path or default_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self._fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 -> fall back to LIKE queries
+            self._fts = False
+        self._conn.commit()
+        self._pruned_at = 0.0
+        self.prune()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def shrink_memory(self) -> None:
+        """Releases SQLite's page cache (used by the idle memory budget)."""
+        with self._lock:
+            self._conn.execute("PRAGMA shrink_memory")
+
+    # --- Writing ---
+
+    def add(
+        self,
+        kind: str,
+        text: str,
+        mode: str | None = None,
+        source: str | None = None,
+        audio: bytes | None = None,
+    ) -> int:
+        """Stores an entry and returns its id."""
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO entries (created, kind, mode, source, text, audio) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (time.time(), kind, mode, source, text, audio),
+            )
+            self._conn.commit()
+            entry_id = cur.lastrowid
+        if time.monotonic() - self._pruned_at >= PRUNE_INTERVAL_S:
+            self.prune()
+        return entry_id
+
+    def prune(self) -> None:
+        """Drops expired audio and entries beyond the configured maximum."""
+        audio_cutoff = time.time() - float(get_setting("history_audio_days")) * 86400
+        max_entries = int(get_setting("history_max_entries"))
+        with self._lock:
+            self._pruned_at = time.monotonic()
+            self._conn.execute(
+                "UPDATE entries SET audio = NULL WHERE audio IS NOT NULL AND created < ?",
+                (audio_cutoff,),
+            )
+            self._conn.execute(
+                "DELETE FROM entries WHERE id NOT IN "
+                "(SELECT id FROM entries ORDER BY id DESC LIMIT ?)",
+                (max_entries,),
+            )
+            self._conn.commit()
+
+    # --- Reading ---
+
+    def get(self, entry_id: int) -> HistoryEntry | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM entries WHERE id = ?", (entry_id,)
+            ).fetchone()
+        return HistoryEntry(*row) if row else None
+
+    def get_audio(self, entry_id: int) -> bytes | None:
+        """Returns the stored WAV bytes, or None if expired / never stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT audio FROM entries WHERE id = ?", (entry_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def latest(self) -> HistoryEntry | None:
+        """Returns the newest entry with text (audio-only entries of cancelled takes are skipped)."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM entries WHERE text != '' ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        return HistoryEntry(*row) if row else None
+
+    def recent(self, limit: int = 10) -> list[HistoryEntry]:
+        """Returns the newest entries first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM entries ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def search(self, query: str, limit: int = 20) -> list[HistoryEntry]:
+        """Full-text search over entry text and source, best matches first."""
+        query = query.strip()
+        if not query:
+            return []
+        with self._lock:
+            if self._fts:
+                # Quote each term so user input is never parsed as FTS syntax
+                terms = " ".join('"' + t.replace('"', '""') + '"' for t in query.split())
+                rows = self._conn.execute(
+                    f"SELECT {_E_COLUMNS} "
+                    "FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid "
+                    "WHERE entries_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (terms, limit),
+                ).fetchall()
+            else:
+                pattern = f"%{query}%"
+                rows = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM entries "
+                    "WHERE text LIKE ? OR source LIKE ? ORDER BY id DESC LIMIT ?",
+                    (pattern, pattern, limit),
+                ).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+
+# ---------------------------------------------------------------------------
+# CLI interface
+# ---------------------------------------------------------------------------
+
+def _print_entries(entries: list[HistoryEntry]) -> None:
+    for e in entries:
+        stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(e.created))
+        label = e.mode or e.kind
+        print(f"  #{e.id:<5} {stamp}  {label:<13} {e.preview(60)}")
+
+
+if __name__ == "__main__":
+    history = History()
+    if "--search" in sys.argv and sys.argv.index("--search") + 1 < len(sys.argv):
+        _print_entries(history.search(sys.argv[sys.argv.index("--search") + 1]))
+    elif "--list" in sys.argv:
+        _print_entries(history.recent(20))
+    else:
+        print('Usage: python history.py [--list | --search "query"]')
@@ -0,0 +1,552 @@
+"""Native global hotkeys: only the app's combinations are registered with the OS.
+
+The pynput listener in main.py sees every keystroke of the whole system and
+runs Python code for each one. The backends here ask the OS for exactly
+the four combinations instead, so ordinary typing never wakes the app:
+
+    Windows   RegisterHotKey + a message loop (exact modifiers, no auto-repeat)
+    X11       XGrabKey on the root window (CapsLock/NumLock variants included),
+              select() on the connection -- no polling
+    macOS     listen-only CGEventTap for key-down events; the callback compares
+              the key code and returns for anything but Space/Esc
+
+All three are loaded with ctypes; no extra packages. start_native() raises
+HotkeyError if the platform has no backend, the display cannot be opened,
+a combination is already taken by another program or (macOS) the app has
+no Accessibility permission -- main.py then falls back to pynput.
+Wayland sessions have no global grab API; use "hotkey_backend": "pynput".
+
+    python hotkeys.py              # Print the combinations as they are pressed
+    xvfb-run python hotkeys.py --selftest   # X11 backend against a virtual display
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import statistics
+import sys
+import threading
+import time
+from collections.abc import Callable
+
+# Actions bound to the combinations
+RECORD = "record"     # Toggle voice recording
+TOOLS = "tools"       # Open the text tools palette
+REPASTE = "repaste"   # Paste the last history entry again
+CANCEL = "cancel"     # Cancel recording / running job
+
+_SECONDARY = "cmd" if sys.platform == "darwin" else "alt"
+
+# action -> (modifiers, key); modifiers must match exactly
+COMBOS: dict[str, tuple[frozenset[str], str]] = {
+    RECORD: (frozenset({"ctrl"}), "space"),
+    TOOLS: (frozenset({"ctrl", _SECONDARY}), "space"),
+    REPASTE: (frozenset({"ctrl", "shift"}), "space"),
+    CANCEL: (frozenset({"ctrl", _SECONDARY}), "esc"),
+}
+
+READY_TIMEOUT_S = 5  # Registration must finish within this time
+
+
+class HotkeyError(Exception):
+    """Raised when the native backend cannot be used on this system."""
+
+
+class HotkeyBackend:
+    """Base class: runs the backend loop in a daemon thread.
+
+    Subclasses implement _serve(report), calling report(None) once the
+    combinations are registered or report("reason") if that failed, and
+    _interrupt() to end the loop from another thread.
+    """
+
+    name = ""
+
+    def __init__(self, bindings: dict[str, Callable[[], None]]) -> None:
+        self._bindings = bindings
+        self._thread: threading.Thread | None = None
+        self.wakeups = 0  # Key events the backend was woken for
+        self.fired = 0    # Of those, matched combinations
+
+    def start(self) -> None:
+        """Registers the combinations; raises HotkeyError if that fails."""
+        ready = threading.Event()
+        result: dict[str, str | None] = {}
+
+        def _report(error: str | None) -> None:
+            result["error"] = error
+            ready.set()
+
+        def _target() -> None:
+            try:
+                self._serve(_report)
+            except Exception as e:
+                if not ready.is_set():
+                    _report(f"{type(e).__name__}: {e}")
+
+        self._thread = threading.Thread(target=_target, name=f"hotkeys-{self.name}", daemon=True)
+        self._thread.start()
+        if not ready.wait(READY_TIMEOUT_S):
+            self.stop()
+            raise HotkeyError(f"{self.name}: registration timed out")
+        if result["error"]:
+            self._thread.join(1)
+            raise HotkeyError(f"{self.name}: {result['error']}")
+
+    def stop(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._interrupt()
+            self._thread.join(2)
+
+    def _fire(self, action: str) -> None:
+        """Runs the bound callback in its own thread (the loop stays responsive)."""
+        self.fired += 1
+        callback = self._bindings.get(action)
+        if callback is not None:
+            threading.Thread(target=callback, daemon=True).start()
+
+    def _serve(self, report: Callable[[str | None], None]) -> None:
+        raise NotImplementedError
+
+    def _interrupt(self) -> None:
+        raise NotImplementedError
+
+
+# ---------------------------------------------------------------------------
+# Windows: RegisterHotKey
+# ---------------------------------------------------------------------------
+
+class WindowsHotkeys(HotkeyBackend):
+    name = "win32"
+
+    _MODS = {"alt": 0x0001, "ctrl": 0x0002, "shift": 0x0004, "cmd": 0x0008}
+    _VK = {"space": 0x20, "esc": 0x1B}
+    MOD_NOREPEAT = 0x4000
+    WM_HOTKEY = 0x0312
+    WM_QUIT = 0x0012
+
+    def __init__(self, bindings: dict[str, Callable[[], None]]) -> None:
+        super().__init__(bindings)
+        self._thread_id = 0
+
+    def _serve(self, report: Callable[[str | None], None]) -> None:
+        from ctypes import wintypes
+
+        user32 = ctypes.WinDLL("user32", use_last_error=True)
+        kernel32 = ctypes.WinDLL("kernel32")
+        user32.RegisterHotKey.argtypes = [wintypes.HWND, ctypes.c_int, wintypes.UINT, wintypes.UINT]
+        user32.UnregisterHotKey.argtypes = [wintypes.HWND, ctypes.c_int]
+        user32.GetMessageW.argtypes = [ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT]
+        self._thread_id = kernel32.GetCurrentThreadId()
+
+        actions: dict[int, str] = {}
+        try:
+            for hotkey_id, (action, (mods, key)) in enumerate(COMBOS.items(), start=1):
+                flags = sum(self._MODS[m] for m in mods) | self.MOD_NOREPEAT
+                if not user32.RegisterHotKey(None, hotkey_id, flags, self._VK[key]):
+                    error = ctypes.get_last_error()
+                    report(f"{'+'.join(sorted(mods))}+{key} is taken (error {error})")
+                    return
+                actions[hotkey_id] = action
+            report(None)
+
+            msg = wintypes.MSG()
+            # Blocks in the kernel until one of our hotkeys or WM_QUIT arrives
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                self.wakeups += 1
+                if msg.message == self.WM_HOTKEY and msg.wParam in actions:
+                    self._fire(actions[msg.wParam])
+        finally:
+            for hotkey_id in actions:
+                user32.UnregisterHotKey(None, hotkey_id)
+
+    def _interrupt(self) -> None:
+        ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+
+
+# ---------------------------------------------------------------------------
+# X11: XGrabKey
+# ---------------------------------------------------------------------------
+
+class _XKeyEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int), ("serial", ctypes.c_ulong), ("send_event", ctypes.c_int),
+        ("display", ctypes.c_void_p), ("window", ctypes.c_ulong), ("root", ctypes.c_ulong),
+        ("subwindow", ctypes.c_ulong), ("time", ctypes.c_ulong),
+        ("x", ctypes.c_int), ("y", ctypes.c_int), ("x_root", ctypes.c_int), ("y_root", ctypes.c_int),
+        ("state", ctypes.c_uint), ("keycode", ctypes.c_uint), ("same_screen", ctypes.c_int),
+    ]
+
+
+class _XEvent(ctypes.Union):
+    _fields_ = [("type", ctypes.c_int), ("xkey", _XKeyEvent), ("pad", ctypes.c_long * 24)]
+
+
+class _XErrorEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int), ("display", ctypes.c_void_p), ("resourceid", ctypes.c_ulong),
+        ("serial", ctypes.c_ulong), ("error_code", ctypes.c_ubyte),
+        ("request_code", ctypes.c_ubyte), ("minor_code", ctypes.c_ubyte),
+    ]
+
+
+_XErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(_XErrorEvent))
+
+
+def _load_xlib() -> ctypes.CDLL:
+    path = ctypes.util.find_library("X11") or "libX11.so.6"
+    try:
+        xlib = ctypes.CDLL(path)
+    except OSError as e:
+        raise HotkeyError(f"x11: libX11 not available ({e})") from e
+    d, ul = ctypes.c_void_p, ctypes.c_ulong
+    for name, restype, argtypes in (
+        ("XOpenDisplay", d, [ctypes.c_char_p]),
+        ("XCloseDisplay", ctypes.c_int, [d]),
+        ("XDefaultRootWindow", ul, [d]),
+        ("XStringToKeysym", ul, [ctypes.c_char_p]),
+        ("XKeysymToKeycode", ctypes.c_ubyte, [d, ul]),
+        ("XGrabKey", ctypes.c_int, [d, ctypes.c_int, ctypes.c_uint, ul, ctypes.c_int, ctypes.c_int, ctypes.c_int]),
+        ("XUngrabKey", ctypes.c_int, [d, ctypes.c_int, ctypes.c_uint, ul]),
+        ("XSync", ctypes.c_int, [d, ctypes.c_int]),
+        ("XFlush", ctypes.c_int, [d]),
+        ("XPending", ctypes.c_int, [d]),
+        ("XNextEvent", ctypes.c_int, [d, ctypes.POINTER(_XEvent)]),
+        ("XConnectionNumber", ctypes.c_int, [d]),
+        ("XSetErrorHandler", d, [d]),
+        ("XkbSetDetectableAutoRepeat", ctypes.c_int, [d, ctypes.c_int, d]),
+    ):
+        function = getattr(xlib, name)
+        function.restype, function.argtypes = restype, argtypes
+    return xlib
+
+
+class X11Hotkeys(HotkeyBackend):
+    name = "x11"
+
+    _MODS = {"shift": 1 << 0, "ctrl": 1 << 2, "alt": 1 << 3, "cmd": 1 << 6}  # Shift, Control, Mod1, Mod4
+    _KEYSYMS = {"space": b"space", "esc": b"Escape"}
+    _LOCKS = (0, 1 << 1, 1 << 4, (1 << 1) | (1 << 4))  # None, CapsLock, NumLock, both
+    KEY_PRESS, KEY_RELEASE = 2, 3
+
+    def __init__(self, bindings: dict[str, Callable[[], None]]) -> None:
+        super().__init__(bindings)
+        self._wake_r: int | None = None  # Self-pipe that wakes select() on stop()
+        self._wake_w: int | None = None
+
+    def start(self) -> None:
+        self._wake_r, self._wake_w = os.pipe()
+        try:
+            super().start()
+        except HotkeyError:
+            self._close_pipe()
+            raise
+
+    def stop(self) -> None:
+        super().stop()
+        self._close_pipe()
+
+    def _close_pipe(self) -> None:
+        """Closes the wake pipe once the loop thread has ended."""
+        if self._thread is not None and self._thread.is_alive():
+            return  # Still in select(); a closed fd number could be reused under it
+        for fd in (self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._wake_r = self._wake_w = None
+
+    def _serve(self, report: Callable[[str | None], None]) -> None:
+        xlib = _load_xlib()
+        display = xlib.XOpenDisplay(None)
+        if not display:
+            report(f"cannot open display {os.environ.get('DISPLAY', '(DISPLAY not set)')!r}")
+            return
+        root = xlib.XDefaultRootWindow(display)
+        grabs: dict[tuple[int, int], str] = {}  # (keycode, modifier mask) -> action
+        try:
+            for action, (mods, key) in COMBOS.items():
+                keycode = xlib.XKeysymToKeycode(display, xlib.XStringToKeysym(self._KEYSYMS[key]))
+                grabs[(keycode, sum(self._MODS[m] for m in mods))] = action
+
+            # A grab held by another client fails asynchronously with BadAccess;
+            # catch it with a temporary handler (the default one exits the process)
+            errors: list[int] = []
+            handler = _XErrorHandler(lambda _d, event: errors.append(event.contents.error_code) or 0)
+            previous = xlib.XSetErrorHandler(ctypes.cast(handler, ctypes.c_void_p))
+            try:
+                for keycode, mask in grabs:
+                    for lock in self._LOCKS:
+                        xlib.XGrabKey(display, keycode, mask | lock, root, 0, 1, 1)  # GrabModeAsync
+                xlib.XSync(display, 0)
+            finally:
+                xlib.XSetErrorHandler(previous)
+            if errors:
+                report(f"key grab refused (X error {errors[0]}) -- combination taken by another program")
+                return
+            # Held keys repeat as KeyPress only (no fake KeyRelease in between)
+            xlib.XkbSetDetectableAutoRepeat(display, 1, None)
+            report(None)
+
+            ignored = ~sum(self._LOCKS[1:3]) & 0xFF
+            held: set[int] = set()
+            event = _XEvent()
+            connection = xlib.XConnectionNumber(display)
+            while True:
+                while xlib.XPending(display):
+                    xlib.XNextEvent(display, ctypes.byref(event))
+                    self.wakeups += 1
+                    if event.type == self.KEY_RELEASE:
+                        held.discard(event.xkey.keycode)
+                    elif event.type == self.KEY_PRESS and event.xkey.keycode not in held:
+                        held.add(event.xkey.keycode)
+                        action = grabs.get((event.xkey.keycode, event.xkey.state & ignored))
+                        if action:
+                            self._fire(action)
+                # Sleeps in the kernel until the X server sends a grabbed key (or stop())
+                readable, _, _ = select.select([connection, self._wake_r], [], [])
+                if self._wake_r in readable:
+                    break
+        finally:
+            for keycode, mask in grabs:
+                for lock in self._LOCKS:
+                    xlib.XUngrabKey(display, keycode, mask | lock, root)
+            xlib.XCloseDisplay(display)
+
+    def _interrupt(self) -> None:
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"x")
+
+
+# ---------------------------------------------------------------------------
+# macOS: CGEventTap
+# ---------------------------------------------------------------------------
+
+_CGEventTapCallBack = ctypes.CFUNCTYPE(
+    ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint32, ctypes.c_void_p, ctypes.c_void_p
+)
+
+
+class MacHotkeys(HotkeyBackend):
+    name = "quartz"
+
+    _MODS = {"shift": 0x20000, "ctrl": 0x40000, "alt": 0x80000, "cmd": 0x100000}
+    _KEYCODES = {"space": 49, "esc": 53}
+    KEY_DOWN = 10
+    TAP_DISABLED = (0xFFFFFFFE, 0xFFFFFFFF)  # By timeout / by user input
+    FIELD_KEYCODE, FIELD_AUTOREPEAT = 9, 8
+
+    def __init__(self, bindings: dict[str, Callable[[], None]]) -> None:
+        super().__init__(bindings)
+        self._loop: ctypes.c_void_p | None = None
+        self._cf: ctypes.CDLL | None = None
+
+    def _serve(self, report: Callable[[str | None], None]) -> None:
+        quartz = ctypes.CDLL("/System/Library/Frameworks/ApplicationServices.framework/ApplicationServices")
+        cf = ctypes.CDLL("/System/Library/Frameworks/CoreFoundation.framework/CoreFoundation")
+        self._cf = cf
+        d = ctypes.c_void_p
+        quartz.CGEventTapCreate.restype = d
+        quartz.CGEventTapCreate.argtypes = [ctypes.c_uint32, ctypes.c_uint32, ctypes.c_uint32,
+                                            ctypes.c_uint64, _CGEventTapCallBack, d]
+        quartz.CGEventTapEnable.argtypes = [d, ctypes.c_bool]
+        quartz.CGEventGetIntegerValueField.restype = ctypes.c_int64
+        quartz.CGEventGetIntegerValueField.argtypes = [d, ctypes.c_uint32]
+        quartz.CGEventGetFlags.restype = ctypes.c_uint64
+        quartz.CGEventGetFlags.argtypes = [d]
+        cf.CFMachPortCreateRunLoopSource.restype = d
+        cf.CFMachPortCreateRunLoopSource.argtypes = [d, d, ctypes.c_long]
+        cf.CFRunLoopGetCurrent.restype = d
+        cf.CFRunLoopAddSource.argtypes = [d, d, d]
+        cf.CFRunLoopStop.argtypes = [d]
+        cf.CFRelease.argtypes = [d]
+
+        combos = {
+            (self._KEYCODES[key], sum(self._MODS[m] for m in mods)): action
+            for action, (mods, key) in COMBOS.items()
+        }
+        space, esc = self._KEYCODES["space"], self._KEYCODES["esc"]
+        all_mods = sum(self._MODS.values())
+        tap_ref: list[ctypes.c_void_p] = []
+
+        def _callback(_proxy: int, event_type: int, event: int, _refcon: int) -> int:
+            if event_type in self.TAP_DISABLED:
+                quartz.CGEventTapEnable(tap_ref[0], True)  # Re-arm after a slow callback
+                return event
+            self.wakeups += 1
+            keycode = quartz.CGEventGetIntegerValueField(event, self.FIELD_KEYCODE)
+            if keycode != space and keycode != esc:
+                return event
+            if quartz.CGEventGetIntegerValueField(event, self.FIELD_AUTOREPEAT):
+                return event
+            action = combos.get((keycode, quartz.CGEventGetFlags(event) & all_mods))
+            if action:
+                self._fire(action)
+            return event
+
+        callback = _CGEventTapCallBack(_callback)  # Referenced until the loop ends
+        # Session tap, head insert, listen-only, key-down events only
+        tap = quartz.CGEventTapCreate(1, 0, 1, 1 << self.KEY_DOWN, callback, None)
+        if not tap:
+            report("event tap refused -- grant Accessibility permission to Voiz")
+            return
+        tap_ref.append(tap)
+        source = cf.CFMachPortCreateRunLoopSource(None, tap, 0)
+        self._loop = cf.CFRunLoopGetCurrent()
+        common_modes = ctypes.c_void_p.in_dll(cf, "kCFRunLoopCommonModes")
+        cf.CFRunLoopAddSource(self._loop, source, common_modes)
+        quartz.CGEventTapEnable(tap, True)
+        report(None)
+        try:
+            cf.CFRunLoopRun()
+        finally:
+            quartz.CGEventTapEnable(tap, False)
+            cf.CFRelease(source)
+            cf.CFRelease(tap)
+
+    def _interrupt(self) -> None:
+        if self._cf is not None and self._loop is not None:
+            self._cf.CFRunLoopStop(self._loop)
+
+
+# ---------------------------------------------------------------------------
+# Selection
+# ---------------------------------------------------------------------------
+
+def start_native(bindings: dict[str, Callable[[], None]]) -> HotkeyBackend:
+    """Registers COMBOS with the OS and returns the running backend.
+
+    Args:
+        bindings: Action (RECORD, TOOLS, REPASTE, CANCEL) -> callback. Each
+            callback runs in its own daemon thread.
+
+    Raises:
+        HotkeyError: If no native backend works here (caller falls back to pynput).
+    """
+    if sys.platform == "win32":
+        backend: HotkeyBackend = WindowsHotkeys(bindings)
+    elif sys.platform == "darwin":
+        backend = MacHotkeys(bindings)
+    elif os.environ.get("DISPLAY"):
+        backend = X11Hotkeys(bindings)
+    else:
+        raise HotkeyError("no X11 display (Wayland sessions need the pynput backend)")
+    backend.start()
+    return backend
+
+
+# ---------------------------------------------------------------------------
+# Self-test (X11, e.g. under Xvfb)
+# ---------------------------------------------------------------------------
+
+def selftest(keystrokes: int = 1000, rounds: int = 5) -> dict:
+    """Types through XTest and checks what the X11 backend saw.
+
+    Sends `keystrokes` ordinary letters plus `rounds` of every combination
+    (and Ctrl+Alt+Shift+Space, which must not match anything). Returns the
+    combinations received, the backend's wakeups and the delivery latency.
+    """
+    xtst_path = ctypes.util.find_library("Xtst") or "libXtst.so.6"
+    try:
+        xtst = ctypes.CDLL(xtst_path)
+    except OSError as e:
+        raise HotkeyError(f"libXtst not available ({e})") from e
+    xtst.XTestFakeKeyEvent.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong]
+    xlib = _load_xlib()
+
+    received: list[tuple[str, float]] = []
+    lock = threading.Lock()
+
+    def _bind(action: str) -> Callable[[], None]:
+        def _record() -> None:
+            with lock:
+                received.append((action, time.perf_counter()))
+        return _record
+
+    backend = X11Hotkeys({action: _bind(action) for action in COMBOS})
+    backend.start()
+    display = xlib.XOpenDisplay(None)
+    keycodes = {
+        name: xlib.XKeysymToKeycode(display, xlib.XStringToKeysym(sym))
+        for name, sym in (("ctrl", b"Control_L"), ("alt", b"Alt_L"), ("shift", b"Shift_L"),
+                          ("cmd", b"Super_L"), ("space", b"space"), ("esc", b"Escape"))
+    }
+    letters = [xlib.XKeysymToKeycode(display, xlib.XStringToKeysym(c.encode())) for c in "etaoinshrdlu"]
+
+    def _tap(codes: list[int]) -> None:
+        for code in codes:
+            xtst.XTestFakeKeyEvent(display, code, 1, 0)
+        for code in reversed(codes):
+            xtst.XTestFakeKeyEvent(display, code, 0, 0)
+        xlib.XFlush(display)
+
+    try:
+        for i in range(keystrokes):
+            _tap([letters[i % len(letters)]])
+        xlib.XSync(display, 0)
+        time.sleep(0.2)
+        typing_wakeups = backend.wakeups
+
+        expected: list[str] = []
+        latencies: list[float] = []
+        for _ in range(rounds):
+            for action, (mods, key) in list(COMBOS.items()) + [("none", (frozenset({"ctrl", "alt", "shift"}), "space"))]:
+                with lock:
+                    before = len(received)
+                sent = time.perf_counter()
+                _tap([keycodes[m] for m in sorted(mods)] + [keycodes[key]])
+                if action == "none":
+                    time.sleep(0.05)
+                    continue
+                expected.append(action)
+                deadline = time.monotonic() + 1.0
+                while time.monotonic() < deadline:
+                    with lock:
+                        if len(received) > before:
+                            latencies.append((received[-1][1] - sent) * 1000)
+                            break
+                    time.sleep(0.0005)
+        time.sleep(0.1)
+    finally:
+        xlib.XCloseDisplay(display)
+        backend.stop()
+
+    got = [action for action, _ in received]
+    return {
+        "keystrokes": keystrokes,
+        "wakeups_while_typing": typing_wakeups,
+        "combos_expected": len(expected),
+        "combos_received": len(got),
+        "correct": got == expected,
+        "latency_p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "latencies_ms": latencies,
+    }
+
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        try:
+            result = selftest()
+        except HotkeyError as e:
+            print(f"  Self-test unavailable: {e}")
+            sys.exit(1)
+        for key, value in result.items():
+            if key != "latencies_ms":
+                print(f"  {key:<22} {value}")
+        sys.exit(0 if result["correct"] and result["wakeups_while_typing"] == 0 else 1)
+
+    def _printer(action: str) -> Callable[[], None]:
+        mods, key = COMBOS[action]
+        return lambda: print(f"  {'+'.join(sorted(mods))}+{key}  ->  {action}", flush=True)
+
+    try:
+        backend = start_native({action: _printer(action) for action in COMBOS})
+    except HotkeyError as e:
+        print(f"  Native hotkeys unavailable: {e}")
+        sys.exit(1)
+    print(f"  Listening with the {backend.name} backend. Ctrl+C to quit.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        backend.stop()
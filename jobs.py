@@ -0,0 +1,105 @@
+"""Cancellation for in-flight jobs.
+
+A CancelToken is passed down to the API call. Cancelling it runs the
+registered callbacks -- closing the HTTP client of the request -- and
+run_cancellable() returns control to the caller at once instead of waiting
+for the server; CancelledError tells callers to drop the result.
+"""
+
+import threading
+from collections.abc import Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class CancelledError(Exception):
+    """Raised when a job was cancelled by the user."""
+
+
+class CancelToken:
+    """Cancellation flag with abort callbacks.
+
+    Usage:
+        token = CancelToken()
+        remove = token.on_cancel(client.close)
+        ...
+        token.cancel()   # From another thread: aborts the request
+    """
+
+    def __init__(self) -> None:
+        self._cancelled = False
+        self._callbacks: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> None:
+        """Marks the job as cancelled and runs all abort callbacks once."""
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Registers an abort callback; returns a function that removes it.
+
+        If the token is already cancelled, the callback runs immediately.
+        """
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+
+                def _remove() -> None:
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+
+                return _remove
+        callback()
+        return lambda: None
+
+    def check(self) -> None:
+        """Raises CancelledError if the job was cancelled."""
+        if self._cancelled:
+            raise CancelledError()
+
+
+def run_cancellable(fn: Callable[[], T], token: CancelToken) -> T:
+    """Runs fn() on a worker thread and waits for it or for the token.
+
+    A blocking socket read cannot be interrupted from another thread, so the
+    caller stops waiting on cancel; the orphaned request fails in the
+    background once its (closed) client notices.
+
+    Raises:
+        CancelledError: If the token was cancelled before fn() returned.
+    """
+    done = threading.Event()
+    outcome: dict[str, object] = {}
+
+    def _target() -> None:
+        try:
+            outcome["result"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    remove = token.on_cancel(done.set)
+    threading.Thread(target=_target, name="voiz-job", daemon=True).start()
+    done.wait()
+    remove()
+    if "error" in outcome:
+        raise outcome["error"]
+    if "result" not in outcome:
+        raise CancelledError()
+    return outcome["result"]
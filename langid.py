@@ -0,0 +1,221 @@
+"""Local language identification (character trigrams, no network).
+
+Each language is a ranked list of its 300 most frequent character trigrams
+(words padded with spaces, lowercase, letters only), built from sample
+business and chat prose and bundled below -- about 8 KB in total. A text is
+scored by how high its trigrams rank in each list; the margin between the
+best and second-best language is the confidence.
+
+Used before the translate modes: if the clipboard is already in the target
+language, the request is skipped (or downgraded to a grammar pass, see the
+"langid_same_language" setting); otherwise the detected source language is
+passed to the model as a hint. Besides English and German, the table knows
+French, Spanish, Italian, Dutch and Portuguese so text in those languages
+is not mistaken for one of the two.
+
+Can be used as a module (from texttools.py) or as a CLI:
+    python langid.py "Kannst du mir den Bericht schicken?"
+"""
+
+import math
+import re
+import sys
+
+MIN_LETTERS = 20       # Shorter texts are not classified
+MIN_CONFIDENCE = 0.2   # Best vs. second-best score margin (0-1)
+SKIP_CONFIDENCE = 0.25  # Margin needed before a request may be skipped entirely
+
+_SEGMENT_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+LANGUAGE_NAMES = {
+    "en": "English",
+    "de": "German",
+    "fr": "French",
+    "es": "Spanish",
+    "it": "Italian",
+    "nl": "Dutch",
+    "pt": "Portuguese",
+}
+
+# Trigrams per language, most frequent first
+_TABLE = {
+    "en": (
+        " th|the|he | we|nd | an|e a|e w|d t|and|ing|re |e t|we | yo|you| to|to |ng |th | wh|"
+        " be|ou | fo|for|ed |on |st |t w| sh|are| ne| wi|wit|ith|thi|hin|t i| is|is | a |oul|"
+        "uld|ld |e s|se |me | ca| of|nk |or | me|n o|ext|xt |s w|le | ha|ut | ar| wo|day|ay |"
+        "d w|sho|ll | mo|of |f t|ne | ti|tim|ime|er |r m| i |ow | up| on|tin|wee|eek|k a|e n|"
+        "nex| st|who| te| re|ink|nt |t t|her|e b|n t|e c| co|lea|eas|end|ers|ar |et |can|an |"
+        "ort|d b|e d|one|y t|h a|use|e o| de|est|at |ce |s c| us|han|r y|our|ur |ge |e i|ted|"
+        "o f|up |g f| fr|ast|ek |d s|t s|ste|h t|am |e h|hav|ave|ve |e p| pr|pro| it|it |a g|"
+        " go|art|g p|oin| bu|ew |wou|o c|ore| si|sig|ign|gn |ont|ct |t c| pl|ple|ase|e u|rs |"
+        "s b| by|by |any|ear|ust| le|let|t m|now|che|hed|a s|hor|rt |all|l t| so| fa|wor|ork|"
+        "hou|be | do|mon|sti|n b| ab|abo|bou|out|in | ot|oth|men|ent|ds |e f|r t|ail|app|o h|"
+        " he|wha|hat|bes|ard|ver|ice|e l|ter|rd |r s|ome|ho |sda|y a|tha|ank|k y|u f|mes|ess|"
+        "ssa|sag|age|i w| wa|wan|ant|nte|fol|oll|llo|low|w u|p o| ou|mee|eet|eti|fro|rom|om |"
+        "m l| la|las|sha|har|tep|eps|ps |hol|ole|tea|eam|m w|e r|rev|evi|vie|iew|ewe|wed|rop|"
+        "opo|pos|osa|sal|al |l a|k i|s a|goo|ood|od |sta|tar|rti| po|poi|int|t b|but|ere|a f|"
+        " fe|few|w t|ngs|gs |d l"
+    ),
+    "de": (
+        "en |er | un|ein| de|der|che|ch | ei|ie |und|ten| wi|nd | di|die|it |eit|n u|den|n s|"
+        "sch|wir|ir |nde| da|te |och|n w|hen|n d|ich| mi| we| te|ng |uns|es |ns |mit|as | an|"
+        "nen|in |r d|sie| bi|tag|ag |e a|nn |st |t s|zei|ung|len|ach|t i| ic| wo|lte|e m| no|"
+        "noc|gen|on |he |d d|ste| sc|t d|am |eil| ha|ang|e d|e w|n k| si|bis| be| ih|re |e n|"
+        "chr|hri|cht|oll|llt|h e|ere|ter|woc|itt|n t|tei|abe|das|s a|nge|t a|n e|s e|ine|n a|"
+        "r e|r u|ers|ist|ann|rze|r g| so| im|im |m b| ze|an | sp|spr|pre|rec|ech|est|uch|lle|"
+        " am| je|t w|sta| vi|vie|iel|ele|dan| fü|für|ür |r i|ihr|hre| na|nac|ht |h w|inm|nma|"
+        "mal|al |ege|tre|fen|ens| vo|von|etz|tzt|r w| me|mel|eld| nä|näc|äch|chs|hst|tte|gan|"
+        "nze|zen|hab|s d|ges| fi|fin|ind| es|n g| gu|gut| au|unk|kt | ab|ber|t e| pa|ar |ge |"
+        "nte|ft |t n|ern|n m|e b|is | fr|fre|rei|g d|ier|ert|n z|wen|enn|was|s u| is|age|e e|"
+        "inf|nfa|fac|bes|hei| ve|ver| ku|her| gr|e t|il |l d|r a|bei|sol|end|de | mo|mon|nat|"
+        "ts | er|edi|sei|d w|n n|enk|r s|and|g m|r z|s b| do|t m| al|all|inz|ite|reu|eue|g u|"
+        " wü| ge|wis|alt|n i|ene|e u|le |ass|ede|ion|hne|d e|ien|man| ka|kan|n j|ner|nst|ank|"
+        "nk |k f|ric|wol|mic|h n|l w|weg|nse|ser|res|s t| tr|ref|eff|ffe|s v|n l| le|let|zte|"
+        "lde|rit|dem|em |m g| ga"
+    ),
+    "fr": (
+        "us | de| le|ous| no|de |es |ons|ns |our|ion|et |er | av|nou| qu|nt |re |r l|que|le |"
+        " vo|tre| et| po|ur |on |e l| la|la | se|t p|s p| pr| à |is |n d|e d|par|les|ave|vec|"
+        "ec |tou| l |e c| un|un |ent| du|du |ser| me|ci |pou|e v|vou|s r| re|ain| pa|pro|s a|"
+        " to|te |qui|e n|tio|n e| pe|ue |est|oin|int| co| en|ce | pl|plu|s d|i p|otr| je|je |"
+        "ven|ir |mai|e e|art|hai|s e| ex|sit|s q| es|st |t d|rt |t m| a |uel|elq|lqu|rio|s m|"
+        "ava|e s| si|con|rie|ez |s c| ch|s à|end|as |ite|t n|t a|e p|nce|ien| te|in |s t|e a|"
+        "lus|uve|s s|eur|mer|erc|rci|r v|vot|mes|age|lai|ais|r n|e r|ine|der|roc|och|cha|éta|"
+        "c t|out|ute|l é| éq|équ|uip|ipe|pe |min|iné|a p|pen|ens|poi| dé| ma|il |ts | ai|eri|"
+        " mo|ier|r a|van|ant|tra|urr|res| jo|jou|r d| ve|ndr|di |cho|se | n |pas| cl|pré|voi|"
+        "cou| ap|app|e b|en |qu |t l| tr|ail|dev|evr|ait|e t|e à|urs|rs |s l| bu|arl| ca|len|"
+        "l a|erv|rvi|vic|ice|ouv|ver|ure|ell|lle| we|nd |ati|n q|u s| ra|ide| ut|uti|til|ili|"
+        "lis|peu|ui |c l|e m|ess|ssa|sag|ge |e j|oul|ula|rev|eve|eni|nir|r s| su|sur|not| ré|"
+        "réu|éun|uni|nio|a s|sem|ema|ne |ern|rni|niè|ièr|ère|rta|tag|ger|nes|s é| ét|tap|ape|"
+        "pes|avo|von|exa|xam|ami|né |é l|rop|opo|pos|osi|iti|nso|son| c |c e|t u|n b| bo|bon|"
+        "n p|dép|épa|s i| il|l y"
+    ),
+    "es": (
+        "os | de|as |el |es |to |de | la| co| el| qu|que| y |mos|ar |est|la |ue |en |s p|ría|"
+        "o d|da | pr|con|sta| es|s e|a a| po|ía | ha| un|ien|ent|nto|tra|ra |na |a p| pa|par|"
+        " al|s d| en|s a|a e|ina|un | se|ión|ón |e l|ada|a y|art|s c|on | to|tod|do |pue|ta |"
+        "ro | no| te|amo|ás |enc|gra|por|men|erí|e n|ues|n d| lo|los|odo|o e|emo|pro|s q|e e|"
+        "s u| bu| pu|alg|nos|tar|ant|nte| fi|l c|ntr|o p|del|o a|a l|rta|l p|ber| a |les|tam|"
+        " má|más|l d|dos|ten| gr|aci|cia|or |r t| me|a h|er |r u|n s|gui| nu|nue| re|a s|sem|"
+        "ema|man|ana|pas|sad|y c|rti|r l|n t|po |o h|s r| cr|cre|n b|bue|uen|unt|ida|per|lgu|"
+        "una|nas|arí|a c| ca|iar| an|tes|mar|ont|pod|me |las|nes|o n| cl|lar|aví|ame|ama|lam|"
+        "ort|o v|va | ah|aho|hor|ora|a m|te |e d|l t|rab|aba|ajo|jo |deb|ebe|fin|ale|den|tro|"
+        "o c|hab|abl|bla| ot|otr|a v| ve| so|dar|ari|rio|s l|can| sa|opi|e t|eng|nga|and|ndo|"
+        "ció|n e| us|ued| at|ia |al |nci|n a|rac|ias| tu|tu |u m|ens|nsa|saj|aje|je |e q|uer|"
+        "hac|ace|cer|seg|egu|uim|imi|mie|str|a r|reu|eun|uni|nió|asa|com|omp|mpa|tir|ir |pró|"
+        "róx|óxi|xim|imo|aso|sos|l e| eq|equ|qui|uip|ipo| he|hem|rev|evi|vis|isa|ado|o l|rop|"
+        "opu|ree|eem|n p|pun|e p|tid| pe|ero|hay|ay |y a|gun|cos|osa|sas|s g| gu|gus|ust|cam|"
+        "amb|mbi|bia|r a|e f|fir"
+    ),
+    "it": (
+        "re |to |are|la |ne |e c| co|mo | de|on |ti |e p|e d| e |con|iam| ch| pe|per| il|il |"
+        "del|amo| la|o c|ro |a n|a s|a e|i p| pa|che|he | di|di |par|i s| fi|i i|ent| tu| un|"
+        " se|o a| al|ra |ett|tti|na |sa |ere| i | pr|oss|ssi|pos|ta |sia|o d|no | po|tro| sa|"
+        "e e|and|fin|el |agg|ggi|gio|o v| vo|o f| fa|lla|tra|ion|one|ell|ima|cor|pro|mi |tut|"
+        "utt|tto|bia| es|ato|o l|a p|pen|ens|e s| si|ia | bu|art|ten|enz|nza|za |a c|ci |alc|"
+        "cos|se |rem|emm|mmo|iar|ntr|o p|sti| in| nu| ve| qu|qua|ndo|do |ora| do| ne| te|ist|"
+        "l a| pi|più|iù |nti| gr|azi|er |r i| me|mes|ess|ssa|io |vo |e u|un |ito|all| no|ost|"
+        "str|set|tim|man|ana| sc|sco|e i|ass|si |n t|po | ab|abb|bbi|o e|nat|sta|nsi|a u|buo|"
+        "uon|nto|rte|a m| ma|ma | ci| so|son|ono|lcu|cun|une|vor|est|i n|ume|eri|i a|ior|orn|"
+        " en|ene|dì |ual|osa| è |chi|hia|sap|ape| or|una|a b|get| st|a a| an|e f|a l|oro|dov|"
+        "ovr|vre|ine|arl|nuo|uov|a t|tem|emp|ica|erc| l |o r| re|in |o t|l d|i d|gli|li |sar|"
+        "lic|ici|n u|oce|ce |ien|gra|raz|zie|ie |l t|tuo|uo |o m|sag|vol|ole|lev|evo|far|n s|"
+        "seg|egu|gui|uit|nos|a r| ri|riu|iun|uni|nio|ors|rsa|ond|ndi|div|ivi|vid|ide|der|ros|"
+        "sim|imi|pas|i c|o i|l g|gru|rup|upp|ppo|esa|sam|ami|min|ina|rop|opo|n b|n p| pu|pun|"
+        "unt|ose|e v|orr|rre| ca"
+    ),
+    "nl": (
+        "en |et | he| we|de | de|het|an |we |n d| me|ten| vo|e v| en|een|oor| te|n w|n h| ee|"
+        "er |voo| je|je |e e|ing|van|n v|e w|nde|met|e h|eke|ken|t m|and|at | be|or |ver|der|"
+        "ng | va|n m|t h|ste|n e|ind|t e| ma| di|ie |nen|te |t d|ete|aan|nd |oet|dan|t v|e b|"
+        "men|n o| op| on| ve| st|ele|le |del|ben| vi|vin|n g|nt |maa|aar|ar | er| zi|ijn|jn |"
+        "die|lle|ere|ren|dat|t t|n k|e m|ag | bi|wer|ers|n a| al|ls | ie|eli| da|lan|nne| ge|"
+        "e g| no|e a|n i|erv|eri|t i| ik|ik | wi|wil|ter|eru|rug|op |rin|ge |wee|eek|ek |gen|"
+        "end|e s|app|pen|hel|e t|len|heb|ebb|bbe|den| go|goe|oed|ed |r e|zij|n p|r d|t w|ont|"
+        "ct | ku|kun|un |me |ijd|dag|bij|erk|rs |s s|als|iet|ets|ts | ni|nie|lij|ijk| is|is |"
+        " la|laa|e d| pl|pla|ann| pr| to|t n| nu|nu |toe|mee|est| zo| aa| kl|kla| mo|moe|e z|"
+        "n n|nog|og |g b|k d|enk|eer|g m|r t|g h|hee|eef|eft|ft |ent|s w| gr|rva| ka|kan|ant|"
+        "ate| sn|sne|nel|kel|ker|geb|ebr|bru|rui|uik|ike|s k|bed|eda|ank|nkt|kt |r j|ber|ric|"
+        "ich|cht|ht |k w|ild|lde| ev|eve|ven|n t|ugk|gko|kom|ome|p o|onz|nze|ze |erg|rga|gad|"
+        "ade|g v|vor|ori|rig|ige|k e|vol|olg|lge|sta|tap|ppe|tea|eam|am |m d|ors|rst|tel|el |"
+        "l b|bek|kek|d u| ui|uit|itg|tga|gan|ang|ngs|gsp|spu|pun|unt|r z| pa|paa|din|nge|ill|"
+        "era|ran|ord|rda|t c| co"
+    ),
+    "pt": (
+        "os | de|ar |da |mos| co|o d|ra | qu|que|to |a e|de | o |ent| e |om | a |ue |do |o p|"
+        "men| se|nto| pa|sta|amo| po| ma| es|est|a s| no|sa |par|r o| os| pr|com|a a|e a|a c|"
+        "o e| do|a m|em |a d|ão |e p|art|s p|s a|tar|s d|es |o c|tra| at|mai|o a|ado| me|eri|"
+        "ia | da|dar|ssa|ana|na |ass| to|tod| an|pro|ost|ta | um|ont|as | al|alg|lgu|uma|isa|"
+        "e m|r a|tes|con|ntr|pod|ode|e o|s n|dos|a n|er |r c|e e|a o|m a|te |alh|ho |tam|a v|"
+        "io |ais|is | te|obr|iga| pe| su|sua|ua |ens|nsa|m q|ria|seg|egu|ime| à |nos|oss|sem|"
+        "ema|man|a p|pas|ada|rti|til|s c|m t|nal|ali|pos| ac|ach|cha|ham|s q| é |um | bo|bom|"
+        "ida|mas|á a|gum|coi|ois| go|gos|arí|ría|íam| mu|uda|nte|ina| en|me |liz|iza|zad|até|"
+        "té |a f| fe|fei|eir|ira|ma |ver| cl|lar|ara|dem|emo|s m| cu|cur|rta| ag|ago|gor|ora|"
+        "e d|lho|dev|eve|no |o f| fi|l d|s e|nda|tro|ro |o o|ame|o q|s f| fa|fal|ala| ou|out|"
+        "utr| ve|rio|s t|ocu|cum|odo|tal|e s| vo| ap|m o| ob|bri|rig|gad|pel|ela|la |sag|age|"
+        "gem|uer|r s|gui|uim|o à|à n|a r| re|reu|eun|uni|niã|ião|sad|ilh|lha|har|pró|róx|óxi|"
+        "xim|imo|sso|sos|oda| eq|equ|qui|uip|ipa|pa |lis|isá|sám|ámo|rop|opo|e é|é u|m b|m p|"
+        "pon|tid|s h| há|há |sas|e g|mud|ant| as|ssi|sin|nar|rat|ato|der|env|nvi|via|iar|r m|"
+        " nú|núm|úme|mer|ero|ros"
+    ),
+}
+
+_NON_LETTERS = re.compile(r"[\W\d_]+")
+
+# trigram -> weight per language: log(N + 1) - log(rank + 1)
+_WEIGHTS: dict[str, dict[str, float]] = {}
+for _lang, _ranked in _TABLE.items():
+    _grams = _ranked.split("|")
+    _top = math.log(len(_grams) + 1)
+    _WEIGHTS[_lang] = {g: _top - math.log(rank + 1) for rank, g in enumerate(_grams)}
+
+
+def _trigrams(text: str) -> list[str]:
+    padded = " " + " ".join(_NON_LETTERS.sub(" ", text.lower()).split()) + " "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def detect(text: str) -> tuple[str | None, float]:
+    """Returns (language code, confidence 0-1), or (None, 0.0) if unsure.
+
+    Only the first 2000 characters are looked at.
+    """
+    sample = text[:2000]
+    if sum(c.isalpha() for c in sample) < MIN_LETTERS:
+        return None, 0.0
+    grams = _trigrams(sample)
+    scores = {
+        lang: sum(weights.get(g, 0.0) for g in grams) / len(grams)
+        for lang, weights in _WEIGHTS.items()
+    }
+    best, second = sorted(scores, key=scores.get, reverse=True)[:2]
+    if scores[best] <= 0:
+        return None, 0.0
+    confidence = (scores[best] - scores[second]) / scores[best]
+    if confidence < MIN_CONFIDENCE:
+        return None, confidence
+    return best, confidence
+
+
+def detect_segments(text: str) -> list[tuple[str | None, float]]:
+    """Detects every sentence / line with at least MIN_LETTERS letters on its own.
+
+    detect() looks at the text as one block, so a short English sentence in
+    a German email is outvoted; checking the parts finds mixed texts.
+    """
+    return [
+        detect(segment) for segment in _SEGMENT_SPLIT.split(text)
+        if sum(c.isalpha() for c in segment) >= MIN_LETTERS
+    ]
+
+
+# ---------------------------------------------------------------------------
+# CLI interface
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        lang, confidence = detect(" ".join(sys.argv[1:]))
+        print(f"  {LANGUAGE_NAMES.get(lang, 'unknown')} ({confidence:.2f})")
+    else:
+        print('Usage: python langid.py "text"')
@@ -0,0 +1,453 @@
+"""Multi-user load generator: replays recorded session traces.
+
+Capture: with "trace_sessions" on, the app appends one anonymized record
+per job to trace.jsonl in the log folder -- the time since app start, the
+audio duration of a take, or the text length and modes picked in the tool
+palette. No text, audio or absolute timestamps are stored.
+
+Replay: N simulated users each replay a session (users beyond the number
+of captured sessions reuse them with a random start offset). Think time
+between jobs is divided by --speed; a user never starts a job before its
+previous one finished, as in the app. Jobs run through the real pipeline
+(voizapi -> transcriber / texttools -> endpoint pool, local model as
+configured) against a built-in fake OpenAI server whose processing time
+and capacity are set on the command line:
+
+    --slots N      requests the server processes at once (0 = unlimited)
+    --rpm N        requests per minute before it answers 429 (0 = unlimited)
+    --base-ms MS   fixed time per request
+    --rtf X        transcription time per second of audio (0.05 = 20x realtime)
+    --char-ms MS   chat completion time per input character
+
+For every user count the report shows throughput, end-to-end latency
+percentiles, how long users were held up by their previous job, and how
+long requests waited for a server slot.
+
+    python loadgen.py --summary                     # What the trace holds
+    python loadgen.py --users 1,5,10,25 --speed 20  # Replay trace.jsonl
+    python loadgen.py --users 10,50 --synthetic --slots 8 --out load.json
+"""
+
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from config import get_setting
+from metrics import log_dir
+
+TRACE_FILE = "trace.jsonl"
+MAX_TRACE_BYTES = 5 * 1024 * 1024  # Rotate to trace.jsonl.1 above 5 MB
+
+_session = uuid.uuid4().hex[:12]  # Random per app start -- not linked to the user
+_started = time.monotonic()
+_trace_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Capture (called by main.py)
+# ---------------------------------------------------------------------------
+
+def trace_path() -> str:
+    return os.path.join(log_dir(), TRACE_FILE)
+
+
+def trace_event(kind: str, **fields) -> None:
+    """Appends one anonymized job record if "trace_sessions" is on. Never raises."""
+    if not get_setting("trace_sessions"):
+        return
+    record = {"session": _session, "t": round(time.monotonic() - _started, 2), "kind": kind, **fields}
+    try:
+        path = trace_path()
+        with _trace_lock:
+            if os.path.exists(path) and os.path.getsize(path) > MAX_TRACE_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+    except OSError:
+        pass
+
+
+def load_sessions(path: str) -> list[list[dict]]:
+    """Reads a trace file into sessions (lists of records ordered by time)."""
+    sessions: dict[str, list[dict]] = {}
+    for name in (path + ".1", path):
+        if not os.path.exists(name):
+            continue
+        with open(name, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("kind") in ("transcribe", "tool"):
+                    sessions.setdefault(record["session"], []).append(record)
+    return [sorted(events, key=lambda e: e["t"]) for events in sessions.values() if events]
+
+
+def synthetic_sessions(count: int = 20, events: int = 40, seed: int = 1) -> list[list[dict]]:
+    """Plausible sessions for sizing without captured traces.
+
+    Mostly dictation (median take 8 s), one job in five a text tool (median
+    400 characters), think time exponential with a 45 s mean.
+    """
+    rng = random.Random(seed)
+    modes = ["email", "slack", "translate_en", "translate_de"]
+    sessions = []
+    for _ in range(count):
+        t = rng.uniform(0, 30)
+        session = []
+        for _ in range(events):
+            if rng.random() < 0.8:
+                session.append({"t": round(t, 2), "kind": "transcribe",
+                                "audio_s": round(min(rng.lognormvariate(2.1, 0.7), 300), 1)})
+            else:
+                picked = [rng.choice(modes)] if rng.random() < 0.8 else rng.sample(modes, 2)
+                session.append({"t": round(t, 2), "kind": "tool", "modes": picked,
+                                "chars": int(min(rng.lognormvariate(6.0, 0.8), 20_000))})
+            t += rng.expovariate(1 / 45)
+        sessions.append(session)
+    return sessions
+
+
+# ---------------------------------------------------------------------------
+# Fake OpenAI server
+# ---------------------------------------------------------------------------
+
+class FakeAPI:
+    """Local stand-in for the OpenAI API with a simple capacity model."""
+
+    def __init__(
+        self,
+        slots: int = 0,
+        rpm: int = 0,
+        base_ms: float = 300.0,
+        rtf: float = 0.05,
+        char_ms: float = 0.5,
+    ) -> None:
+        self.base_ms, self.rtf, self.char_ms, self.rpm = base_ms, rtf, char_ms, rpm
+        self._slots = threading.BoundedSemaphore(slots) if slots > 0 else None
+        self._lock = threading.Lock()
+        self._recent: list[float] = []  # Request times within the last minute (for rpm)
+        self.waits_ms: list[float] = []
+        self.rejected = 0
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                api.handle(self, body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._server.request_queue_size = 256
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.waits_ms = []
+            self.rejected = 0
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle(self, handler: BaseHTTPRequestHandler, body: bytes) -> None:
+        remaining = self._admit()
+        if remaining is None:
+            self._reply(handler, 429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                        {"retry-after-ms": "1000", "x-ratelimit-remaining-requests": "0",
+                         "x-ratelimit-reset-requests": "1s"})
+            return
+        t0 = time.perf_counter()
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            with self._lock:
+                self.waits_ms.append((time.perf_counter() - t0) * 1000)
+            if handler.path.endswith("/audio/transcriptions"):
+                payload = self._transcription(handler, body)
+            else:
+                payload = self._chat(json.loads(body))
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+        headers = {"x-ratelimit-remaining-requests": str(remaining), "x-ratelimit-reset-requests": "1s"}
+        self._reply(handler, 200, payload, headers)
+
+    def _admit(self) -> int | None:
+        """Counts the request against the rpm limit; None = reject (429)."""
+        if self.rpm <= 0:
+            return 10_000
+        now = time.monotonic()
+        with self._lock:
+            self._recent = [t for t in self._recent if now - t < 60]
+            if len(self._recent) >= self.rpm:
+                self.rejected += 1
+                return None
+            self._recent.append(now)
+            return self.rpm - len(self._recent)
+
+    def _transcription(self, handler: BaseHTTPRequestHandler, body: bytes) -> dict:
+        # 16 kHz mono int16 -> seconds; the multipart overhead is negligible
+        audio_s = max(0, len(body) - 44) / 32_000
+        time.sleep((self.base_ms + audio_s * self.rtf * 1000) / 1000)
+        return {"text": f"Transcript of {audio_s:.1f} seconds."}
+
+    def _chat(self, request: dict) -> dict:
+        text = request["messages"][-1]["content"]
+        time.sleep((self.base_ms + len(text) * self.char_ms) / 1000)
+        if request.get("response_format", {}).get("type") == "json_object":
+            document = json.loads(text)
+            if "sentences" in document:
+                content = json.dumps({"translations": [s["text"] for s in document["sentences"]]})
+            else:
+                content = json.dumps({"paragraphs": [
+                    p if isinstance(p, str) else p["text"] for p in document["paragraphs"]
+                ]})
+        else:
+            content = text
+        return {
+            "id": "loadgen", "object": "chat.completion", "created": 0, "model": request["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+        }
+
+    @staticmethod
+    def _reply(handler: BaseHTTPRequestHandler, code: int, payload: dict, headers: dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(code)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+_FILLER = (
+    "Thanks for the update on the rollout. We should check the numbers with the team "
+    "before Friday and send a short summary to everyone involved.\n\n"
+)
+
+
+class Replay:
+    """Replays sessions with N users against a pipeline (voizapi.Voiz)."""
+
+    def __init__(self, voiz, sessions: list[list[dict]], speed: float = 10.0, seed: int = 1) -> None:
+        if not sessions:
+            raise ValueError("No sessions to replay")
+        self._voiz = voiz
+        self._sessions = sessions
+        self._speed = max(speed, 0.001)
+        self._seed = seed
+        self._wavs: dict[float, bytes] = {}
+        self._lock = threading.Lock()
+
+    def run(self, users: int, duration_s: float) -> dict:
+        """Replays `users` users for up to duration_s seconds; returns the stats."""
+        results: list[dict] = []
+        rng = random.Random(self._seed + users)
+        t0 = time.monotonic() + 0.2
+        threads = []
+        for i in range(users):
+            session = self._sessions[i % len(self._sessions)]
+            # Reused sessions start at a random point so users don't move in lockstep
+            start = 0 if i < len(self._sessions) else rng.randrange(len(session))
+            jitter = rng.uniform(0, 1.0)
+            thread = threading.Thread(
+                target=self._user, args=(session[start:], t0 + jitter, duration_s, results),
+                daemon=True,
+            )
+            threads.append(thread)
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self._summarize(users, results, t0)
+
+    def _user(self, events: list[dict], t0: float, duration_s: float, results: list[dict]) -> None:
+        base = events[0]["t"] if events else 0.0
+        for event in events:
+            planned = t0 + (event["t"] - base) / self._speed
+            if planned - t0 > duration_s:
+                break
+            delay = planned - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            started = time.monotonic()
+            ok = True
+            try:
+                self._execute(event)
+            except Exception:
+                ok = False
+            finished = time.monotonic()
+            with self._lock:
+                results.append({
+                    "kind": event["kind"], "ok": ok, "finished": finished,
+                    "latency_ms": (finished - started) * 1000,
+                    "held_ms": max(0.0, started - planned) * 1000,
+                })
+
+    def _execute(self, event: dict) -> None:
+        if event["kind"] == "transcribe":
+            self._voiz.transcribe(self._wav(float(event.get("audio_s", 5.0))))
+            return
+        text = self._text(int(event.get("chars", 300)))
+        modes = event.get("modes") or ["email"]
+        if len(modes) == 1:
+            self._voiz.optimize(text, modes[0])
+            return
+        with ThreadPoolExecutor(max_workers=len(modes)) as pool:  # Fan-out, as in the app
+            for future in [pool.submit(self._voiz.optimize, text, m) for m in modes]:
+                future.result()
+
+    def _wav(self, seconds: float) -> bytes:
+        import soundfile as sf
+
+        key = round(seconds * 2) / 2  # 0.5 s buckets keep the cache small
+        with self._lock:
+            cached = self._wavs.get(key)
+        if cached is None:
+            noise = (np.random.default_rng(0).standard_normal(int(max(key, 0.5) * 16_000)) * 300)
+            buffer = io.BytesIO()
+            sf.write(buffer, noise.astype(np.int16), 16_000, format="WAV", subtype="PCM_16")
+            cached = buffer.getvalue()
+            with self._lock:
+                self._wavs[key] = cached
+        return cached
+
+    @staticmethod
+    def _text(chars: int) -> str:
+        return (_FILLER * (chars // len(_FILLER) + 1))[:max(chars, 1)]
+
+    @staticmethod
+    def _summarize(users: int, results: list[dict], t0: float) -> dict:
+        done = [r for r in results if r["ok"]]
+        latencies = sorted(r["latency_ms"] for r in done)
+        held = sorted(r["held_ms"] for r in results)
+        elapsed = max((r["finished"] for r in results), default=t0) - t0
+
+        def pct(values: list[float], q: float) -> float | None:
+            return round(values[int(round(q * (len(values) - 1)))], 1) if values else None
+
+        return {
+            "users": users,
+            "jobs": len(results),
+            "errors": len(results) - len(done),
+            "throughput_per_min": round(len(done) / elapsed * 60, 1) if elapsed > 0 else 0.0,
+            "p50_ms": round(statistics.median(latencies), 1) if latencies else None,
+            "p95_ms": pct(latencies, 0.95),
+            "p99_ms": pct(latencies, 0.99),
+            "max_ms": round(latencies[-1], 1) if latencies else None,
+            "held_p95_ms": pct(held, 0.95),
+        }
+
+
+# ---------------------------------------------------------------------------
+# CLI interface
+# ---------------------------------------------------------------------------
+
+def _arg_value(flag: str, default: str | None = None) -> str | None:
+    if flag in sys.argv and sys.argv.index(flag) + 1 < len(sys.argv):
+        return sys.argv[sys.argv.index(flag) + 1]
+    return default
+
+
+def _print_summary(sessions: list[list[dict]]) -> None:
+    jobs = [e for s in sessions for e in s]
+    takes = [e["audio_s"] for e in jobs if e["kind"] == "transcribe"]
+    tools = [e for e in jobs if e["kind"] == "tool"]
+    print(f"  {len(sessions)} sessions, {len(jobs)} jobs")
+    if takes:
+        print(f"  Takes:  {len(takes)}, audio median {statistics.median(takes):.1f} s, max {max(takes):.1f} s")
+    if tools:
+        chars = [e["chars"] for e in tools]
+        modes: dict[str, int] = {}
+        for e in tools:
+            for m in e["modes"]:
+                modes[m] = modes.get(m, 0) + 1
+        print(f"  Tools:  {len(tools)}, text median {statistics.median(chars):.0f} chars, modes {modes}")
+
+
+def _print_row(row: dict) -> None:
+    print(
+        f"  {row['users']:>5}  {row['jobs']:>6}  {row['errors']:>6}  {row['throughput_per_min']:>10}  "
+        f"{row['p50_ms']!s:>9}  {row['p95_ms']!s:>9}  {row['p99_ms']!s:>9}  "
+        f"{row['held_p95_ms']!s:>9}  {row['server_wait_p95_ms']!s:>10}  {row['rejected_429']:>5}"
+    )
+
+
+if __name__ == "__main__":
+    trace = _arg_value("--trace", trace_path())
+    sessions = synthetic_sessions() if "--synthetic" in sys.argv else load_sessions(trace)
+
+    if "--summary" in sys.argv:
+        _print_summary(sessions)
+        sys.exit(0)
+    if "--users" not in sys.argv:
+        print(
+            "Usage: python loadgen.py --summary | --users 1,5,10 [--trace FILE | --synthetic] "
+            "[--speed 10] [--duration 60] [--slots 0] [--rpm 0] [--base-ms 300] [--rtf 0.05] "
+            "[--char-ms 0.5] [--out FILE]"
+        )
+        sys.exit(1)
+    if not sessions:
+        print(f"  No sessions in {trace}. Turn on \"trace_sessions\" or use --synthetic.")
+        sys.exit(1)
+
+    from openai import OpenAI
+
+    from voizapi import Voiz
+
+    fake = FakeAPI(
+        slots=int(_arg_value("--slots", "0")),
+        rpm=int(_arg_value("--rpm", "0")),
+        base_ms=float(_arg_value("--base-ms", "300")),
+        rtf=float(_arg_value("--rtf", "0.05")),
+        char_ms=float(_arg_value("--char-ms", "0.5")),
+    )
+    client = OpenAI(api_key="loadgen", base_url=fake.base_url, max_retries=2)
+    replay = Replay(Voiz(client=client), sessions, speed=float(_arg_value("--speed", "10")))
+    duration = float(_arg_value("--duration", "60"))
+
+    print(f"  {len(sessions)} sessions, speed x{_arg_value('--speed', '10')}, {duration:.0f} s per step")
+    print(f"  {'users':>5}  {'jobs':>6}  {'errors':>6}  {'jobs/min':>10}  {'p50 ms':>9}  "
+          f"{'p95 ms':>9}  {'p99 ms':>9}  {'held p95':>9}  {'srv wait95':>10}  {'429s':>5}")
+    rows = []
+    for users in [int(u) for u in _arg_value("--users").split(",")]:
+        fake.reset_stats()
+        row = replay.run(users, duration)
+        waits = sorted(fake.waits_ms)
+        row["server_wait_p95_ms"] = round(waits[int(round(0.95 * (len(waits) - 1)))], 1) if waits else None
+        row["rejected_429"] = fake.rejected
+        rows.append(row)
+        _print_row(row)
+    fake.shutdown()
+
+    if _arg_value("--out"):
+        with open(_arg_value("--out"), "w", encoding="utf-8") as f:
+            json.dump({"speed": float(_arg_value("--speed", "10")), "duration_s": duration,
+                       "sessions": len(sessions), "steps": rows}, f, indent=2)
+        print(f"\n  Results written to {_arg_value('--out')}")
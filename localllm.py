@@ -0,0 +1,172 @@
+"""Local quantized LLM backend for the text tools (llama-cpp-python).
+
+A small instruct model in GGUF format (e.g. a 4-bit Qwen2.5-1.5B-Instruct or
+Llama-3.2-3B-Instruct) runs on the CPU with the same SYSTEM_PROMPTS as the
+API. The model is loaded once and stays resident. Routing rules in the
+settings decide which requests it handles:
+
+    "local_model_path": "C:/models/qwen2.5-1.5b-instruct-q4_k_m.gguf"
+    "local_modes": ["slack", "translate_en", "translate_de"]
+    "local_max_chars": 600       # Longer texts go to the API
+    "local_fallback": true       # Use the local model while the API is down
+
+llama-cpp-python is optional (pip install llama-cpp-python); without it, or
+without a model path, everything goes to the API as before.
+
+Can be used as a module (from texttools.py) or as a CLI:
+    python localllm.py --check
+    python localllm.py --run slack "text to rewrite"
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+from config import get_setting
+from jobs import CancelledError, CancelToken
+from metrics import log_metric
+
+CONTEXT_TOKENS = 4096  # Prompt + answer; text tools inputs are short
+TEMPERATURE = 0.3      # Same as the API requests
+
+_model = None
+_model_path = ""
+_load_lock = threading.Lock()  # Loading happens once
+_run_lock = threading.Lock()   # A llama.cpp context serves one request at a time
+
+
+def is_installed() -> bool:
+    """True if llama-cpp-python can be imported."""
+    return importlib.util.find_spec("llama_cpp") is not None
+
+
+def is_configured() -> bool:
+    """True if a model file is set, exists, and the backend is installed."""
+    path = str(get_setting("local_model_path") or "")
+    return bool(path) and os.path.isfile(path) and is_installed()
+
+
+def should_route_local(text: str, mode: str) -> bool:
+    """Routing rule: short requests in the configured modes run locally."""
+    if mode not in (get_setting("local_modes") or []):
+        return False
+    if len(text) > int(get_setting("local_max_chars")):
+        return False
+    return is_configured()
+
+
+def can_fallback(mode: str) -> bool:
+    """True if the local model may answer for mode while the API is down."""
+    return (
+        bool(get_setting("local_fallback"))
+        and mode in (get_setting("local_modes") or [])
+        and is_configured()
+    )
+
+
+def _get_model():
+    """Returns the resident model, loading it on first use."""
+    global _model, _model_path
+    path = str(get_setting("local_model_path"))
+    with _load_lock:
+        if _model is None or _model_path != path:
+            from llama_cpp import Llama
+
+            t0 = time.perf_counter()
+            _model = Llama(
+                model_path=path,
+                n_ctx=CONTEXT_TOKENS,
+                n_threads=int(get_setting("local_threads")) or None,
+                verbose=False,
+            )
+            _model_path = path
+            log_metric(
+                "local_llm_load", model=os.path.basename(path),
+                load_ms=round((time.perf_counter() - t0) * 1000),
+            )
+        return _model
+
+
+def preload() -> None:
+    """Loads the model in the background so the first request is fast."""
+    if not is_configured():
+        return
+
+    def _load() -> None:
+        try:
+            _get_model()
+        except Exception:
+            pass  # Reported on the first real request
+
+    threading.Thread(target=_load, name="voiz-localllm", daemon=True).start()
+
+
+def complete(
+    system_prompt: str,
+    text: str,
+    cancel: CancelToken | None = None,
+    reason: str = "rule",
+) -> str:
+    """Runs one text-tool request on the local model.
+
+    Tokens are streamed so a cancelled job stops generating after the
+    current token.
+
+    Raises:
+        jobs.CancelledError: If cancelled.
+        Exception: If the model cannot be loaded or fails.
+    """
+    model = _get_model()
+    t0 = time.perf_counter()
+    parts: list[str] = []
+    with _run_lock:
+        if cancel is not None:
+            cancel.check()
+        stream = model.create_chat_completion(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": text},
+            ],
+            temperature=TEMPERATURE,
+            stream=True,
+        )
+        for chunk in stream:
+            if cancel is not None and cancel.cancelled:
+                stream.close()
+                raise CancelledError()
+            parts.append(chunk["choices"][0]["delta"].get("content") or "")
+
+    log_metric(
+        "local_llm", reason=reason, chars=len(text),
+        latency_ms=round((time.perf_counter() - t0) * 1000),
+    )
+    return "".join(parts).strip()
+
+
+# ---------------------------------------------------------------------------
+# CLI interface
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        path = get_setting("local_model_path") or "(not set)"
+        print(f"  llama-cpp-python: {'installed' if is_installed() else 'missing'}")
+        print(f"  Model:            {path}")
+        print(f"  Modes:            {', '.join(get_setting('local_modes') or []) or '-'}")
+        print(f"  Max chars:        {get_setting('local_max_chars')}")
+        if is_configured():
+            t0 = time.perf_counter()
+            _get_model()
+            print(f"  Loaded in {time.perf_counter() - t0:.1f} s")
+    elif "--run" in sys.argv and sys.argv.index("--run") + 2 < len(sys.argv):
+        from texttools import SYSTEM_PROMPTS
+
+        i = sys.argv.index("--run")
+        mode, text = sys.argv[i + 1], sys.argv[i + 2]
+        t0 = time.perf_counter()
+        print(complete(SYSTEM_PROMPTS[mode], text))
+        print(f"\n  ({time.perf_counter() - t0:.2f} s)")
+    else:
+        print('Usage: python localllm.py [--check | --run MODE "text"]')
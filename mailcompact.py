@@ -0,0 +1,298 @@
+"""Local compaction of copied email threads (no network).
+
+People often copy a whole thread into "Optimize for Email". Only the new
+message needs rewriting, but the quoted replies, signatures and legal
+disclaimers below it would otherwise go to the model as input tokens (and
+often come back rewritten as output). compact() removes, in this order:
+
+    history       everything from the first reply header on ("On ... wrote:",
+                  "Am ... schrieb ...:", "-----Original Message-----",
+                  Outlook "From:/Sent:/To:/Subject:" blocks, also in German)
+    quotes        runs of two or more lines with a ">" quote prefix (inline
+                  and bottom quoting; a single "> 5 users" line is content)
+    boilerplate   confidentiality / environment disclaimers, company register
+                  footers and repeated paragraphs -- only at the very end
+    signature     "Sent from my iPhone"-style lines at the end, and a block
+                  of short contact lines that ends the message after the
+                  "-- " delimiter or a closing line ("Best regards,") and
+                  a name
+
+If nothing is left (the clipboard held only a quoted message) the text is
+used unchanged. Optionally the start of the message being replied to is
+kept as short context for the model ("email_compaction": "context").
+
+Token counts are estimates (about four characters per token) -- close
+enough to report savings without a tokenizer dependency.
+
+Can be used as a module (from texttools.py) or as a CLI:
+    python mailcompact.py thread.txt
+"""
+
+import re
+import sys
+
+CHARS_PER_TOKEN = 4          # Rough average for English/German prose
+INPUT_MS_PER_TOKEN = 0.2     # Rough prompt-processing cost per input token (gpt-4o-mini)
+SIGNATURE_MAX_LINES = 10     # Longer blocks after a closing are not treated as a signature
+SIGNATURE_LINE_CHARS = 80    # ... nor blocks with lines longer than this (prose)
+SIGNATURE_NAME_CHARS = 40    # The line after the closing must be a short name
+QUOTE_MIN_LINES = 2          # A single ">" line is more likely content ("> 5 users")
+
+_ATTRIBUTION = re.compile(
+    r"^(On\b.{4,200}\bwrote:|Am\b.{4,200}\bschrieb\b.{0,200}:|Le\b.{4,200}\ba écrit\s?:)$",
+    re.IGNORECASE,
+)
+_SEPARATOR = re.compile(
+    r"^-{2,}\s*(Original Message|Ursprüngliche Nachricht|Forwarded message|"
+    r"Weitergeleitete Nachricht|Message d'origine)\s*-{2,}$",
+    re.IGNORECASE,
+)
+_HEADER_START = re.compile(r"^\*?(From|Von|De)\s?:\*?\s", re.IGNORECASE)
+_HEADER_FIELD = re.compile(
+    r"^\*?(Sent|Date|To|Cc|Subject|Gesendet|Datum|An|Betreff|Envoyé|À|Objet)\s?:\*?", re.IGNORECASE
+)
+_RULE = re.compile(r"^_{10,}$")  # Outlook puts a line of underscores above the header block
+_MOBILE_FOOTER = re.compile(
+    r"^(Sent from my \w+.*|Von meinem \w+.* gesendet|Get Outlook for \w+.*|Outlook für \w+ herunterladen)$",
+    re.IGNORECASE,
+)
+# A whole line that is only a closing ("Thanks," -- not "Thanks for your help.")
+_CLOSING = re.compile(
+    r"^(((best|kind|warm)\s+)?(regards|wishes)|thanks|many thanks|thank you|cheers|"
+    r"((mit\s+)?(freundlichen|besten|vielen|viele|liebe|beste|herzliche)\s+)?grüßen?|gruß|lg|vg)"
+    r"[,.!]?$",
+    re.IGNORECASE,
+)
+_CONTACT = re.compile(
+    r"(\+?\d[\d ()/-]{6,}\d|@|https?://|www\.|\b(tel|phone|mobile|mobil|fax)\b\.?:?|\|)", re.IGNORECASE
+)
+_DISCLAIMER = re.compile(
+    r"(confidential|intended recipient|privileged|vertraulich|nicht der richtige adressat|"
+    r"irrtümlich erhalten|before printing|vor dem ausdrucken|umwelt|"
+    r"geschäftsführer|amtsgericht|registergericht|\bHRB\s?\d+|ust-idnr|vat id|registered office)",
+    re.IGNORECASE,
+)
+_PARAGRAPH_SPLIT = re.compile(r"\n[ \t]*\n\s*")
+_WHITESPACE = re.compile(r"\s+")
+_QUOTE_MARKS = re.compile(r"^\s*(>\s?)+")
+_QUOTE_PREFIX = re.compile(r"^>([ >]|$)")  # "> text", ">> text", ">" -- not ">= 3"
+
+MIN_REPEAT_CHARS = 30  # Shorter repeated paragraphs ("Thanks!") are kept
+
+
+class Compaction:
+    """Result of compact(): the text to send and what was removed.
+
+    Attributes:
+        text: The new content (the input itself if nothing was removed).
+        context: Start of the message being replied to, if requested, else "".
+        removed: Characters removed per category ("history", "quotes",
+            "signature", "boilerplate").
+    """
+
+    def __init__(self, original: str, text: str, context: str, removed: dict[str, int]) -> None:
+        self.original = original
+        self.text = text
+        self.context = context
+        self.removed = removed
+
+    @property
+    def changed(self) -> bool:
+        return self.text != self.original
+
+    @property
+    def tokens_before(self) -> int:
+        return estimate_tokens(self.original)
+
+    @property
+    def tokens_after(self) -> int:
+        return estimate_tokens(self.text) + estimate_tokens(self.context)
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_before - self.tokens_after)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact(text: str, context_chars: int = 0) -> Compaction:
+    """Strips quoted history, signatures and boilerplate from an email.
+
+    Args:
+        text: The copied email or thread.
+        context_chars: If > 0, up to this many characters of the message
+            being replied to are returned as Compaction.context.
+    """
+    removed = {"history": 0, "quotes": 0, "signature": 0, "boilerplate": 0}
+    lines = text.strip().splitlines()
+
+    start = _history_start(lines)
+    history = lines[start:] if start is not None else []
+    lines = lines[:start] if start is not None else lines
+    removed["history"] = _size(history)
+
+    lines, quoted = _strip_quotes(lines)
+    removed["quotes"] = _size(quoted)
+
+    # Disclaimers follow the signature, so they go first (from the end only)
+    body, boilerplate = _strip_trailing_boilerplate("\n".join(lines))
+    removed["boilerplate"] = boilerplate
+
+    lines, signature = _strip_signature(body.splitlines())
+    removed["signature"] = _size(signature)
+    body = "\n".join(lines)
+
+    body = body.strip()
+    if not body or not any(removed.values()):
+        return Compaction(text, text, "", dict.fromkeys(removed, 0))
+    context = _context(history, quoted, context_chars) if context_chars > 0 else ""
+    return Compaction(text, body, context, removed)
+
+
+def _size(lines: list[str]) -> int:
+    return sum(len(line) + 1 for line in lines)
+
+
+def _history_start(lines: list[str]) -> int | None:
+    """Returns the index of the first line of the quoted history, if any."""
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if _SEPARATOR.match(stripped) or _ATTRIBUTION.match(stripped):
+            return i
+        # Clients wrap long attributions: "On Mon, ... John Doe <" / "john@x.com> wrote:"
+        if i + 1 < len(lines) and _ATTRIBUTION.match(f"{stripped} {lines[i + 1].strip()}"):
+            return i
+        if _HEADER_START.match(stripped):
+            fields = sum(1 for following in lines[i + 1:i + 5] if _HEADER_FIELD.match(following.strip()))
+            if fields >= 2:
+                return i - 1 if i > 0 and _RULE.match(lines[i - 1].strip()) else i
+    return None
+
+
+def _strip_quotes(lines: list[str]) -> tuple[list[str], list[str]]:
+    """Removes runs of quoted lines; returns (kept lines, removed lines)."""
+    kept: list[str] = []
+    removed: list[str] = []
+    run: list[str] = []
+    for line in lines + [""]:
+        if _QUOTE_PREFIX.match(line):
+            run.append(line)
+            continue
+        (removed if len(run) >= QUOTE_MIN_LINES else kept).extend(run)
+        run = []
+        kept.append(line)
+    return kept[:-1], removed
+
+
+def _strip_signature(lines: list[str]) -> tuple[list[str], list[str]]:
+    """Removes the signature; returns (kept lines, removed lines).
+
+    Only the end of the message is looked at: mobile footers on the last
+    lines, then the "-- " delimiter or a closing line ("Best regards,")
+    followed by a name line and nothing but short contact lines.
+    """
+    removed: list[str] = []
+    while lines and (not lines[-1].strip() or _MOBILE_FOOTER.match(lines[-1].strip())):
+        if lines[-1].strip():
+            removed.insert(0, lines[-1])
+        lines = lines[:-1]
+
+    tail_start = max(0, len(lines) - SIGNATURE_MAX_LINES - 2)
+    for i in range(len(lines) - 2, tail_start - 1, -1):
+        if lines[i] == "-- " and _is_signature(lines[i + 1:]):
+            return lines[:i], removed + lines[i:]
+    for i in range(len(lines) - 3, tail_start - 1, -1):
+        if not _CLOSING.match(lines[i].strip()):
+            continue
+        if _is_signature(lines[i + 1:]):
+            return lines[:i + 2], removed + lines[i + 2:]
+        break
+    return lines, removed
+
+
+def _is_signature(block: list[str]) -> bool:
+    """A name line followed by nothing but short contact lines."""
+    return bool(block) and _is_name(block[0].strip()) and all(_is_contact_line(line) for line in block[1:])
+
+
+def _is_name(line: str) -> bool:
+    return 0 < len(line) <= SIGNATURE_NAME_CHARS and not _CONTACT.search(line)
+
+
+def _is_contact_line(line: str) -> bool:
+    stripped = line.strip()
+    return 0 < len(stripped) <= SIGNATURE_LINE_CHARS and bool(_CONTACT.search(stripped))
+
+
+def _strip_trailing_boilerplate(body: str) -> tuple[str, int]:
+    """Drops disclaimers and repeated paragraphs at the very end of the message.
+
+    Paragraphs are only removed from the end backwards, so a paragraph in
+    the middle of the message is never touched, whatever it mentions.
+    Returns (body, chars removed).
+    """
+    paragraphs = _PARAGRAPH_SPLIT.split(body.strip())
+    removed = 0
+    while len(paragraphs) > 1:
+        last = paragraphs[-1]
+        normalized = _WHITESPACE.sub(" ", last).strip().lower()
+        earlier = {_WHITESPACE.sub(" ", p).strip().lower() for p in paragraphs[:-1]}
+        repeated = len(normalized) >= MIN_REPEAT_CHARS and normalized in earlier
+        if not (repeated or _is_disclaimer(last)):
+            break
+        removed += len(last) + 2
+        paragraphs.pop()
+    return "\n\n".join(paragraphs), removed
+
+
+def _is_disclaimer(paragraph: str) -> bool:
+    # Short mentions ("this is confidential, please don't forward") are content
+    return len(paragraph) >= 120 and len(_DISCLAIMER.findall(paragraph)) >= 2
+
+
+def _context(history: list[str], quoted: list[str], limit: int) -> str:
+    """First `limit` characters of the message replied to, header line included."""
+    source = [_QUOTE_MARKS.sub("", line).strip() for line in (history or quoted)]
+    source = [line for line in source if not _RULE.match(line) and not _SEPARATOR.match(line)]
+    header = ""
+    if source and _ATTRIBUTION.match(source[0]):
+        header, source = source[0], source[1:]
+    elif len(source) > 1 and _ATTRIBUTION.match(f"{source[0]} {source[1]}"):
+        header, source = f"{source[0]} {source[1]}", source[2:]
+    elif source and _HEADER_START.match(source[0]):
+        header, source = source[0], source[1:]
+        while source and _HEADER_FIELD.match(source[0]):
+            source = source[1:]
+
+    body: list[str] = []
+    for i, line in enumerate(source):
+        if body and _history_start(source[i:i + 5]) == 0:
+            break  # The next, older message
+        body.append(line)
+    text = _WHITESPACE.sub(" ", " ".join(body)).strip()
+    if len(text) > limit:
+        text = text[:limit].rsplit(" ", 1)[0] + " ..."
+    return f"{header} {text}".strip() if text else ""
+
+
+# ---------------------------------------------------------------------------
+# CLI interface
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python mailcompact.py FILE [--context N]")
+        sys.exit(1)
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        source = f.read()
+    chars = int(sys.argv[sys.argv.index("--context") + 1]) if "--context" in sys.argv else 0
+    result = compact(source, chars)
+    print(result.text)
+    if result.context:
+        print(f"\n  Context: {result.context}")
+    print(
+        f"\n  {result.tokens_before} -> {result.tokens_after} tokens (est.), "
+        f"saved {result.tokens_saved}; removed chars: {result.removed}"
+    )
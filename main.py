@@ -5,11 +5,15 @@ Ctrl+Alt+Space: Open tool palette to optimize or translate clipboard text.
 """
 
 import ctypes
+import json
 import os
+import sqlite3
 import subprocess
 import sys
 import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 # ---------------------------------------------------------------------------
@@ -28,14 +32,32 @@ def _set_app_id() -> None:
 
 _set_app_id()
 
+# --mem-report: trace allocations from before the heavy imports below
+if "--mem-report" in sys.argv:
+    import tracemalloc
+    tracemalloc.start(10)
+
 import pyperclip
 from PIL import Image, ImageDraw, ImageFont
 from pynput import keyboard
 import pystray
 
+import hotkeys
+import localllm
+import workers
 from autostart import is_enabled as autostart_is_enabled, toggle as autostart_toggle
-from config import ensure_api_key, prompt_api_key_gui
+from config import ensure_api_key, get_setting, prompt_api_key_gui
+from history import KIND_TOOL, KIND_TRANSCRIPT, History
+from jobs import CancelledError, CancelToken
+from loadgen import trace_event
+from memprofile import MemorySampler, register_trim, write_report
+from metrics import log_metric
+from profiler import get_profiler
 from recorder import Recorder
+from scheduler import BACKGROUND, INTERACTIVE, run as run_scheduled
+from streamupload import StreamingUpload, open_upload
+from spool import KIND_TOOL as SPOOL_TOOL, KIND_TRANSCRIBE as SPOOL_TRANSCRIBE
+from spool import Spool, SpoolDrainer, SpoolJob, is_transient_error
 from texttools import optimize_text
 from transcriber import transcribe
 
@@ -53,9 +75,27 @@ class AppState:
 
     def __init__(self) -> None:
         self.status = self.IDLE
-        self.recorder = Recorder()
+        self.recorder = Recorder(
+            warm=bool(get_setting("warm_microphone")),
+            preroll_ms=int(get_setting("preroll_ms")),
+            idle_release_s=float(get_setting("mic_idle_release_s")),
+            native_rate=bool(get_setting("native_sample_rate")),
+            on_auto_stop=(
+                (lambda take_id: auto_stop_recording(self, take_id))
+                if get_setting("auto_stop") else None
+            ),
+            silence_ms=int(get_setting("auto_stop_silence_ms")),
+            hangover_ms=int(get_setting("vad_hangover_ms")),
+            min_speech_ms=int(get_setting("vad_min_speech_ms")),
+            encoder=_worker_encoder(),
+        )
         self.api_key: str = ""
         self.tray: pystray.Icon | None = None
+        self.history: History | None = _open_history()
+        self.spool: Spool | None = _open_spool()
+        self.spool_drainer: SpoolDrainer | None = None
+        self.job: CancelToken | None = None  # Cancel token of the running job
+        self.upload: StreamingUpload | None = None  # Streaming upload of the current take
         self._lock = threading.Lock()
         self._toggle_lock = threading.Lock()  # Guards toggle_recording
 
@@ -64,11 +104,95 @@ class AppState:
             self.status = status
         self._update_icon()
 
+    def begin_job(self) -> CancelToken:
+        """Enters PROCESSING with a fresh cancel token for the new job."""
+        token = CancelToken()
+        with self._lock:
+            self.job = token
+            self.status = self.PROCESSING
+        self._update_icon()
+        return token
+
+    def finish_job(self, token: CancelToken) -> None:
+        """Returns to IDLE -- unless the job was cancelled and replaced."""
+        with self._lock:
+            if self.job is not token:
+                return
+            self.job = None
+            self.status = self.IDLE
+        self._update_icon()
+
+    def cancel_job(self) -> CancelToken | None:
+        """Aborts the running job (if any) and returns to IDLE at once."""
+        with self._lock:
+            token, self.job = self.job, None
+            if token is not None:
+                self.status = self.IDLE
+        if token is not None:
+            token.cancel()
+            self._update_icon()
+        return token
+
     def _update_icon(self) -> None:
         if self.tray:
             self.tray.icon = create_icon(self.status)
 
 
+def _open_history() -> History | None:
+    """Opens the history database (None if it cannot be opened)."""
+    try:
+        return History()
+    except (sqlite3.Error, OSError):
+        return None
+
+
+def _open_spool() -> Spool | None:
+    """Opens the offline job spool (None if the directory is unusable)."""
+    try:
+        return Spool(
+            max_bytes=int(get_setting("spool_max_mb")) * 1024 * 1024,
+            max_age_s=float(get_setting("spool_max_age_days")) * 86400,
+        )
+    except OSError:
+        return None
+
+
+def _worker_encoder() -> Callable | None:
+    """Returns the worker-pool encoder for the recorder (None = in-process)."""
+    processes = int(get_setting("worker_processes"))
+    if processes <= 0:
+        return None
+    return workers.get_pool(processes).encode_take
+
+
+def _spool_failed_job(state: AppState, kind: str, payload: bytes, **meta) -> bool:
+    """Stores a job that failed for network reasons. Returns True if spooled."""
+    if not state.spool:
+        return False
+    try:
+        state.spool.enqueue(kind, payload, **meta)
+    except OSError:
+        return False
+    if state.spool_drainer:
+        state.spool_drainer.wake()
+    return True
+
+
+def _remember(state: AppState, kind: str, text: str, **fields) -> None:
+    """Stores a result in the history and refreshes the tray submenu."""
+    if not state.history:
+        return
+    try:
+        state.history.add(kind, text, **fields)
+    except sqlite3.Error:
+        return
+    if state.tray:
+        try:
+            state.tray.update_menu()
+        except Exception:
+            pass
+
+
 # ---------------------------------------------------------------------------
 # Icon Generation
 # ---------------------------------------------------------------------------
@@ -205,11 +329,23 @@ def copy_and_paste(text: str) -> None:
         pass
 
 
+def type_text(text: str) -> None:
+    """Types text into the focused app without touching the clipboard.
+
+    Used for incremental paste of streamed transcripts.
+    """
+    try:
+        keyboard.Controller().type(text)
+    except Exception:
+        pass
+
+
 # ---------------------------------------------------------------------------
 # Recording Toggle (Core Logic)
 # ---------------------------------------------------------------------------
 
 MIN_AUDIO_SIZE = 5000  # Minimum size in bytes (~0.15s at 16kHz mono)
+STREAM_NOTIFY_INTERVAL = 1.0  # Seconds between progress notifications while streaming
 
 
 def toggle_recording(state: AppState) -> None:
@@ -224,6 +360,12 @@ def toggle_recording(state: AppState) -> None:
         state._toggle_lock.release()
 
 
+def auto_stop_recording(state: AppState, take_id: int) -> None:
+    """Recorder callback: the speaker has finished -- stop as if Ctrl+Space was pressed."""
+    if state.status == AppState.RECORDING and state.recorder.take_id == take_id:
+        toggle_recording(state)
+
+
 def _toggle_recording_inner(state: AppState) -> None:
     """Internal toggle logic (guarded by _toggle_lock)."""
 
@@ -233,12 +375,16 @@ def _toggle_recording_inner(state: AppState) -> None:
 
     if state.status == AppState.IDLE:
         # --- Start recording ---
+        upload = _open_upload(state)
         try:
-            state.recorder.start()
+            state.recorder.start(tap=upload.feed if upload else None)
+            state.upload = upload
             state.set_status(AppState.RECORDING)
             if state.tray:
                 notify(state.tray, "Voiz", "Recording started...")
         except Exception as e:
+            if upload:
+                upload.abort()
             if state.tray:
                 notify(state.tray, "Voiz - Error", f"Microphone error: {e}")
             state.set_status(AppState.IDLE)
@@ -247,38 +393,110 @@ def _toggle_recording_inner(state: AppState) -> None:
     if state.status == AppState.RECORDING:
         # --- Stop recording + transcribe ---
         audio_bytes = state.recorder.stop()
+        upload, state.upload = state.upload, None
 
         if not audio_bytes or len(audio_bytes) < MIN_AUDIO_SIZE:
+            if upload:
+                upload.abort()
             if state.tray:
                 notify(state.tray, "Voiz", "Recording too short. Please speak longer.")
             state.set_status(AppState.IDLE)
             return
 
-        state.set_status(AppState.PROCESSING)
+        _run_transcription(state, audio_bytes, upload)
 
-        # Run transcription in a separate thread to avoid blocking the UI
-        def _process() -> None:
-            try:
-                text = transcribe(audio_bytes, state.api_key)
-                if text:
-                    copy_and_paste(text)
-                    if state.tray:
-                        # Preview: first 80 characters
-                        preview = text[:80] + ("..." if len(text) > 80 else "")
-                        notify(state.tray, "Voiz - Copied!", preview)
+
+def _open_upload(state: AppState) -> StreamingUpload | None:
+    """Opens the transcription request for a new take ("streaming_upload")."""
+    try:
+        return open_upload(state.api_key, streaming_deltas=True)
+    except Exception as e:
+        log_metric("streaming_upload", ok=False, error=type(e).__name__)
+        return None
+
+
+def _run_transcription(
+    state: AppState,
+    audio_bytes: bytes,
+    upload: StreamingUpload | None = None,
+) -> None:
+    """Transcribes audio in a background thread and pastes the result.
+
+    With a streaming upload the audio is already on the server; the regular
+    upload of audio_bytes is the fallback if that request failed.
+    """
+    token = state.begin_job()
+    trace_event("transcribe", audio_s=round(max(0, len(audio_bytes) - 44) / 32_000, 1))
+
+    incremental = bool(get_setting("incremental_paste"))
+    streamed: list[str] = []
+    last_notify = [0.0]
+
+    def _on_delta(delta: str) -> None:
+        """Receives transcript pieces while the model is still decoding."""
+        streamed.append(delta)
+        if incremental:
+            type_text(delta)
+        elif state.tray and time.monotonic() - last_notify[0] >= STREAM_NOTIFY_INTERVAL:
+            last_notify[0] = time.monotonic()
+            partial = "".join(streamed)
+            preview = ("..." if len(partial) > 80 else "") + partial[-80:]
+            notify(state.tray, "Voiz - Transcribing...", preview)
+
+    # Run transcription in a separate thread to avoid blocking the UI
+    def _process() -> None:
+        try:
+            text = None
+            if upload is not None:
+                try:
+                    text = run_scheduled(
+                        INTERACTIVE, lambda job: upload.finish(job, on_delta=_on_delta), token
+                    )
+                except CancelledError:
+                    raise
+                except Exception:
+                    if streamed:
+                        raise  # Text already reached the user -- a retry would repeat it
+            if text is None:
+                text = run_scheduled(
+                    INTERACTIVE,
+                    lambda job: transcribe(audio_bytes, state.api_key, on_delta=_on_delta, cancel=job),
+                    token,
+                )
+            if state.spool_drainer:
+                state.spool_drainer.wake()  # Connection works -- retry spooled jobs
+            if text:
+                _remember(state, KIND_TRANSCRIPT, text, audio=audio_bytes)
+                if incremental and streamed:
+                    # Already typed -- only put the full text on the clipboard
+                    pyperclip.copy(text)
                 else:
-                    if state.tray:
-                        notify(state.tray, "Voiz", "No speech detected.")
-            except Exception as e:
-                err_msg = str(e)
-                if "auth" in err_msg.lower() or "api key" in err_msg.lower():
-                    err_msg = "Invalid API key. Please update it via the tray menu."
+                    copy_and_paste(text)
+                if state.tray:
+                    # Preview: first 80 characters
+                    preview = text[:80] + ("..." if len(text) > 80 else "")
+                    notify(state.tray, "Voiz - Copied!", preview)
+            else:
+                if state.tray:
+                    notify(state.tray, "Voiz", "No speech detected.")
+        except CancelledError:
+            if get_setting("cancel_keeps_audio"):
+                _remember(state, KIND_TRANSCRIPT, "", audio=audio_bytes)
+        except Exception as e:
+            if is_transient_error(e) and _spool_failed_job(state, SPOOL_TRANSCRIBE, audio_bytes):
                 if state.tray:
-                    notify(state.tray, "Voiz - Error", err_msg)
-            finally:
-                state.set_status(AppState.IDLE)
+                    notify(state.tray, "Voiz - Offline",
+                           "Recording saved. It will be transcribed when the connection is back.")
+                return
+            err_msg = str(e)
+            if "auth" in err_msg.lower() or "api key" in err_msg.lower():
+                err_msg = "Invalid API key. Please update it via the tray menu."
+            if state.tray:
+                notify(state.tray, "Voiz - Error", err_msg)
+        finally:
+            state.finish_job(token)
 
-        threading.Thread(target=_process, daemon=True).start()
+    threading.Thread(target=_process, daemon=True).start()
 
 
 # ---------------------------------------------------------------------------
@@ -295,28 +513,53 @@ MODE_LABELS = {
 _FROZEN = getattr(sys, 'frozen', False)
 
 
-def _show_tool_picker() -> str:
-    """Opens the tool picker popup in a subprocess.
+def _toolpicker_cmd() -> list[str]:
+    """Returns the command that starts the tool picker subprocess.
 
     In PyInstaller mode, calls the .exe with --toolpicker flag.
     In development mode, runs toolpicker.py directly.
-
-    Returns:
-        The selected mode ("email", "slack", "translate_en", ...) or "" if cancelled.
     """
     if _FROZEN:
-        cmd = [sys.executable, "--toolpicker"]
-    else:
-        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "toolpicker.py")
-        cmd = [sys.executable, script]
+        return [sys.executable, "--toolpicker"]
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "toolpicker.py")
+    return [sys.executable, script]
+
+
+def _show_tool_picker() -> list[str]:
+    """Opens the tool picker popup in a subprocess.
 
+    Returns:
+        The selected modes ("email", "slack", "translate_en", ...) in the
+        order they were picked, or [] if cancelled.
+    """
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        result = subprocess.run(_toolpicker_cmd(), capture_output=True, text=True, timeout=30)
         if result.returncode == 0:
-            return result.stdout.strip()
+            return [m for m in result.stdout.strip().split(",") if m]
+    except (subprocess.TimeoutExpired, OSError):
+        pass
+    return []
+
+
+def _show_result_picker(options: list[dict]) -> int | None:
+    """Lets the user choose one of several results (label + text).
+
+    Returns:
+        The index of the chosen result, or None if cancelled.
+    """
+    try:
+        result = subprocess.run(
+            _toolpicker_cmd() + ["--results"],
+            input=json.dumps(options),
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        if result.returncode == 0 and result.stdout.strip().isdigit():
+            return int(result.stdout.strip())
     except (subprocess.TimeoutExpired, OSError):
         pass
-    return ""
+    return None
 
 
 def open_text_tools(state: AppState) -> None:
@@ -326,8 +569,8 @@ def open_text_tools(state: AppState) -> None:
         return
 
     # Show the tool picker (blocks until user selects or cancels)
-    mode = _show_tool_picker()
-    if not mode:
+    modes = _show_tool_picker()
+    if not modes:
         return
 
     # Read current clipboard content
@@ -341,15 +584,29 @@ def open_text_tools(state: AppState) -> None:
             notify(state.tray, "Voiz Tools", "Clipboard is empty.")
         return
 
-    state.set_status(AppState.PROCESSING)
+    trace_event("tool", modes=modes, chars=len(text))
+    if len(modes) == 1:
+        _run_text_tool(state, text, modes[0])
+    else:
+        _run_text_tools_fanout(state, text, modes)
+
+
+def _run_text_tool(state: AppState, text: str, mode: str) -> None:
+    """Runs a text tool in a background thread and pastes the result."""
+    token = state.begin_job()
     label = MODE_LABELS.get(mode, mode)
     if state.tray:
         notify(state.tray, "Voiz Tools", f"Optimizing for {label}...")
 
     def _process() -> None:
         try:
-            result = optimize_text(text, mode, state.api_key)
+            result = run_scheduled(
+                INTERACTIVE, lambda job: optimize_text(text, mode, state.api_key, cancel=job), token
+            )
+            if state.spool_drainer:
+                state.spool_drainer.wake()
             if result:
+                _remember(state, KIND_TOOL, result, mode=mode, source=text)
                 copy_and_paste(result)
                 if state.tray:
                     preview = result[:80] + ("..." if len(result) > 80 else "")
@@ -357,58 +614,308 @@ def open_text_tools(state: AppState) -> None:
             else:
                 if state.tray:
                     notify(state.tray, "Voiz Tools", "No result returned.")
+        except CancelledError:
+            pass
         except Exception as e:
+            if is_transient_error(e) and _spool_failed_job(
+                state, SPOOL_TOOL, text.encode("utf-8"), mode=mode
+            ):
+                if state.tray:
+                    notify(state.tray, "Voiz Tools - Offline",
+                           f"Saved. {label} version will be created when the connection is back.")
+                return
             err_msg = str(e)
             if "auth" in err_msg.lower() or "api key" in err_msg.lower():
                 err_msg = "Invalid API key. Please update it via the tray menu."
             if state.tray:
                 notify(state.tray, "Voiz Tools - Error", err_msg)
         finally:
-            state.set_status(AppState.IDLE)
+            state.finish_job(token)
+
+    threading.Thread(target=_process, daemon=True).start()
+
+
+def _run_text_tools_fanout(state: AppState, text: str, modes: list[str]) -> None:
+    """Runs several text tools concurrently on the same text.
+
+    Total wait is the slowest mode, not the sum. Every result goes to the
+    history; the user then picks which one to paste.
+    """
+    token = state.begin_job()
+    labels = [MODE_LABELS.get(m, m) for m in modes]
+    if state.tray:
+        notify(state.tray, "Voiz Tools", f"Running {', '.join(labels)}...")
+
+    def _process() -> None:
+        results: dict[str, str] = {}
+        errors: list[str] = []
+        try:
+            with ThreadPoolExecutor(max_workers=len(modes), thread_name_prefix="voiz-tool") as pool:
+                futures = {
+                    pool.submit(
+                        run_scheduled,
+                        INTERACTIVE,
+                        lambda job, m=m: optimize_text(text, m, state.api_key, cancel=job),
+                        token,
+                    ): m
+                    for m in modes
+                }
+                for future in as_completed(futures):
+                    mode = futures[future]
+                    try:
+                        result = future.result()
+                    except CancelledError:
+                        continue
+                    except Exception as e:
+                        if is_transient_error(e) and _spool_failed_job(
+                            state, SPOOL_TOOL, text.encode("utf-8"), mode=mode
+                        ):
+                            errors.append(f"{MODE_LABELS.get(mode, mode)}: saved for retry")
+                        else:
+                            errors.append(f"{MODE_LABELS.get(mode, mode)}: {e}")
+                        continue
+                    if result:
+                        results[mode] = result
+                        _remember(state, KIND_TOOL, result, mode=mode, source=text)
+        finally:
+            state.finish_job(token)
+
+        if token.cancelled:
+            return
+        if results and state.spool_drainer:
+            state.spool_drainer.wake()
+        if errors and state.tray:
+            notify(state.tray, "Voiz Tools - Error", "\n".join(errors))
+
+        # Keep the picked order; paste directly if only one succeeded
+        ordered = [m for m in modes if m in results]
+        if not ordered:
+            return
+        if len(ordered) == 1:
+            index = 0
+        else:
+            index = _show_result_picker(
+                [{"label": MODE_LABELS.get(m, m), "text": results[m]} for m in ordered]
+            )
+        if index is None or not 0 <= index < len(ordered):
+            if state.tray:
+                notify(state.tray, "Voiz Tools", "Results saved to history.")
+            return
+        chosen = results[ordered[index]]
+        copy_and_paste(chosen)
+        if state.tray:
+            preview = chosen[:80] + ("..." if len(chosen) > 80 else "")
+            notify(state.tray, f"Voiz Tools - {MODE_LABELS.get(ordered[index], ordered[index])}", preview)
 
     threading.Thread(target=_process, daemon=True).start()
 
 
 # ---------------------------------------------------------------------------
-# Hotkey Listener
+# Cancel (Ctrl+Alt+Esc / tray)
 # ---------------------------------------------------------------------------
 
-def setup_hotkey_listener(state: AppState) -> keyboard.Listener:
-    """Sets up global hotkeys using a raw Listener for exact modifier matching.
+def cancel_current(state: AppState) -> None:
+    """Cancels the current recording or in-flight job and returns to IDLE.
 
-    Windows/Linux:
-        - Ctrl+Space            Toggle voice recording
-        - Ctrl+Alt+Space        Open text tools palette
+    A recording is discarded (or kept in the history with "cancel_keeps_audio").
+    A running request is aborted by closing its HTTP connection.
+    """
+    if state.status == AppState.RECORDING:
+        with state._toggle_lock:
+            if state.status != AppState.RECORDING:
+                return
+            audio_bytes = state.recorder.stop()
+            if state.upload:
+                state.upload.abort()
+                state.upload = None
+            state.set_status(AppState.IDLE)
+        if audio_bytes and get_setting("cancel_keeps_audio"):
+            _remember(state, KIND_TRANSCRIPT, "", audio=audio_bytes)
+        if state.tray:
+            notify(state.tray, "Voiz", "Recording cancelled.")
+        return
+
+    if state.cancel_job() is not None and state.tray:
+        notify(state.tray, "Voiz", "Cancelled.")
+
+
+# ---------------------------------------------------------------------------
+# Offline Spool (retried in the background)
+# ---------------------------------------------------------------------------
+
+def deliver_spooled_job(state: AppState, job: SpoolJob, payload: bytes) -> None:
+    """Runs a spooled job and delivers its result to history / clipboard.
+
+    Raises on failure so the drainer can decide whether to retry. Runs in
+    the background lane: a hotkey job preempts it and it is retried after.
+    """
+    if job.kind == SPOOL_TRANSCRIBE:
+        result = run_scheduled(BACKGROUND, lambda token: transcribe(payload, state.api_key, cancel=token))
+        if result:
+            _remember(state, KIND_TRANSCRIPT, result, audio=payload)
+        title = "Voiz - Recovered transcript"
+    else:
+        mode = job.meta.get("mode", "")
+        source = payload.decode("utf-8")
+        result = run_scheduled(
+            BACKGROUND, lambda token: optimize_text(source, mode, state.api_key, cancel=token)
+        )
+        if result:
+            _remember(state, KIND_TOOL, result, mode=mode, source=source)
+        title = f"Voiz Tools - Recovered {MODE_LABELS.get(mode, mode)}"
+
+    if not result:
+        return
+    if get_setting("spool_delivery") == "clipboard":
+        pyperclip.copy(result)
+        hint = "Copied to clipboard."
+    else:
+        hint = "Saved to history (Ctrl+Shift+Space to paste)."
+    if state.tray:
+        preview = result[:60] + ("..." if len(result) > 60 else "")
+        notify(state.tray, title, f"{hint}\n{preview}")
 
-    macOS (Cmd is more native than Ctrl):
-        - Cmd+Space             Toggle voice recording
-        - Cmd+Option+Space      Open text tools palette
 
-    GlobalHotKeys can't distinguish these because Ctrl+Alt+Space also
-    satisfies Ctrl+Space. A raw Listener with explicit modifier tracking
-    solves this.
+# ---------------------------------------------------------------------------
+# History (Ctrl+Shift+Space / tray submenu)
+# ---------------------------------------------------------------------------
+
+HISTORY_MENU_SIZE = 10
+
+
+def repaste_last(state: AppState) -> None:
+    """Pastes the most recent history entry again (no API call)."""
+    entry = state.history.latest() if state.history else None
+    if not entry or not entry.text:
+        if state.tray:
+            notify(state.tray, "Voiz", "Nothing to paste yet.")
+        return
+    copy_and_paste(entry.text)
+
+
+def copy_history_entry(state: AppState, entry_id: int) -> None:
+    """Tray action: puts a stored entry back on the clipboard."""
+    entry = state.history.get(entry_id) if state.history else None
+    if not entry or not entry.text:
+        return
+    pyperclip.copy(entry.text)
+    if state.tray:
+        notify(state.tray, "Voiz - Copied!", entry.preview(80))
+
+
+def rerun_history_entry(state: AppState, entry_id: int, mode: str) -> None:
+    """Tray action: runs a stored entry through a (different) text tool.
+
+    Tool results are re-run from their original input, transcripts from
+    their text.
+    """
+    if state.status != AppState.IDLE or not state.history:
+        return
+    entry = state.history.get(entry_id)
+    if not entry:
+        return
+    text = entry.source if entry.kind == KIND_TOOL and entry.source else entry.text
+    _run_text_tool(state, text, mode)
+
+
+def retranscribe_history_entry(state: AppState, entry_id: int) -> None:
+    """Tray action: transcribes the stored audio of an entry again."""
+    if state.status != AppState.IDLE or not state.history:
+        return
+    audio_bytes = state.history.get_audio(entry_id)
+    if not audio_bytes:
+        if state.tray:
+            notify(state.tray, "Voiz", "Audio for this entry has expired.")
+        return
+    _run_transcription(state, audio_bytes)
+
+
+def _history_menu_items(state: AppState) -> list[pystray.MenuItem]:
+    """Builds the tray "History" submenu from the newest entries."""
+    entries = state.history.recent(HISTORY_MENU_SIZE) if state.history else []
+    if not entries:
+        return [pystray.MenuItem("No entries yet", None, enabled=False)]
+
+    items = []
+    for entry in entries:
+        def _entry_menu(entry_id: int = entry.id, has_audio: bool = entry.has_audio) -> pystray.Menu:
+            actions = [
+                pystray.MenuItem(
+                    "Copy",
+                    lambda icon, item: copy_history_entry(state, entry_id),
+                    default=True,
+                ),
+                pystray.Menu.SEPARATOR,
+            ]
+            for mode, label in MODE_LABELS.items():
+                actions.append(pystray.MenuItem(
+                    f"Run as {label}",
+                    lambda icon, item, m=mode: threading.Thread(
+                        target=rerun_history_entry, args=(state, entry_id, m), daemon=True
+                    ).start(),
+                ))
+            if has_audio:
+                actions.append(pystray.MenuItem(
+                    "Transcribe again",
+                    lambda icon, item: threading.Thread(
+                        target=retranscribe_history_entry, args=(state, entry_id), daemon=True
+                    ).start(),
+                ))
+            return pystray.Menu(*actions)
+
+        label = MODE_LABELS.get(entry.mode, "Voice") if entry.mode else "Voice"
+        items.append(pystray.MenuItem(f"[{label}] {entry.preview()}", _entry_menu()))
+    return items
+
+
+# ---------------------------------------------------------------------------
+# Hotkey Listener
+# ---------------------------------------------------------------------------
+
+def _normalize_key(key: keyboard.Key | keyboard.KeyCode) -> str:
+    """Returns a stable string identifier for a key."""
+    if isinstance(key, keyboard.Key):
+        name = key.name
+        if name.startswith("ctrl"):
+            return "ctrl"
+        if name.startswith("alt"):
+            return "alt"
+        if name.startswith("cmd"):
+            return "cmd"
+        if name.startswith("shift"):
+            return "shift"
+        return name
+    return str(key)
+
+
+def hotkey_actions(state: AppState) -> dict[str, Callable[[], None]]:
+    """Returns what each hotkey combination does (shared by both backends)."""
+    return {
+        hotkeys.RECORD: lambda: toggle_recording(state),
+        hotkeys.TOOLS: lambda: open_text_tools(state),
+        hotkeys.REPASTE: lambda: repaste_last(state),
+        hotkeys.CANCEL: lambda: cancel_current(state),
+    }
+
+
+def make_hotkey_handlers(state: AppState) -> tuple[
+    Callable[[keyboard.Key | keyboard.KeyCode], None],
+    Callable[[keyboard.Key | keyboard.KeyCode], None],
+]:
+    """Returns the (on_press, on_release) callbacks for the pynput fallback.
+
+    Kept separate from the Listener so the per-keystroke path can be
+    benchmarked without a keyboard hook (see benchmark.py).
     """
     pressed_keys: set = set()
     _IS_MAC = sys.platform == "darwin"
-
-    def _normalize(key: keyboard.Key | keyboard.KeyCode) -> str:
-        """Returns a stable string identifier for a key."""
-        if isinstance(key, keyboard.Key):
-            name = key.name
-            if name.startswith("ctrl"):
-                return "ctrl"
-            if name.startswith("alt"):
-                return "alt"
-            if name.startswith("cmd"):
-                return "cmd"
-            return name
-        return str(key)
+    actions = hotkey_actions(state)
 
     def on_press(key: keyboard.Key | keyboard.KeyCode) -> None:
-        name = _normalize(key)
+        name = _normalize_key(key)
         pressed_keys.add(name)
 
-        if name == "space":
+        if name == "space" or name == "esc":
             if _IS_MAC:
                 # Ctrl+Space = recording, Ctrl+Cmd+Space = text tools
                 primary = "ctrl" in pressed_keys
@@ -417,18 +924,56 @@ def setup_hotkey_listener(state: AppState) -> keyboard.Listener:
                 primary = "ctrl" in pressed_keys
                 secondary = "alt" in pressed_keys
 
-            if primary and secondary:
-                threading.Thread(
-                    target=open_text_tools, args=(state,), daemon=True
-                ).start()
+            if name == "esc":
+                action = hotkeys.CANCEL if primary and secondary else None
+            elif primary and secondary:
+                action = hotkeys.TOOLS
+            elif primary and "shift" in pressed_keys:
+                action = hotkeys.REPASTE
             elif primary and not secondary:
-                threading.Thread(
-                    target=toggle_recording, args=(state,), daemon=True
-                ).start()
+                action = hotkeys.RECORD
+            else:
+                action = None
+            if action:
+                threading.Thread(target=actions[action], daemon=True).start()
 
     def on_release(key: keyboard.Key | keyboard.KeyCode) -> None:
-        pressed_keys.discard(_normalize(key))
+        pressed_keys.discard(_normalize_key(key))
+
+    return on_press, on_release
+
+
+def setup_hotkey_listener(state: AppState) -> keyboard.Listener | hotkeys.HotkeyBackend:
+    """Sets up global hotkeys; both kinds of listener have stop().
+
+    Windows/Linux:
+        - Ctrl+Space            Toggle voice recording
+        - Ctrl+Alt+Space        Open text tools palette
+        - Ctrl+Shift+Space      Paste the last history entry again
+        - Ctrl+Alt+Esc          Cancel recording / running job
+
+    macOS:
+        - Ctrl+Space            Toggle voice recording
+        - Ctrl+Cmd+Space        Open text tools palette
+        - Ctrl+Shift+Space      Paste the last history entry again
+        - Ctrl+Cmd+Esc          Cancel recording / running job
+
+    With "hotkey_backend": "auto" the combinations are registered with the
+    OS (hotkeys.py), so ordinary keystrokes never reach Python. If that is
+    not possible (Wayland, a combination taken by another program, no macOS
+    Accessibility permission) -- or with "pynput" -- a raw pynput Listener
+    with explicit modifier tracking sees every key. GlobalHotKeys can't be
+    used there because Ctrl+Alt+Space also satisfies Ctrl+Space.
+    """
+    if get_setting("hotkey_backend") != "pynput":
+        try:
+            backend = hotkeys.start_native(hotkey_actions(state))
+            log_metric("hotkey_backend", backend=backend.name)
+            return backend
+        except hotkeys.HotkeyError as e:
+            log_metric("hotkey_backend", backend="pynput", error=str(e))
 
+    on_press, on_release = make_hotkey_handlers(state)
     listener = keyboard.Listener(on_press=on_press, on_release=on_release)
     listener.daemon = True
     listener.start()
@@ -454,6 +999,42 @@ def on_toggle_autostart(state: AppState) -> None:
         notify(state.tray, "Voiz", f"Autostart {status}.")
 
 
+def on_memory_report(state: AppState) -> None:
+    """Context menu action: write a tracemalloc snapshot/diff report."""
+    try:
+        path = write_report()
+    except OSError as e:
+        if state.tray:
+            notify(state.tray, "Voiz - Error", f"Memory report failed: {e}")
+        return
+    if state.tray:
+        notify(state.tray, "Voiz - Memory report", path)
+
+
+def start_profiler(state: AppState, seconds: float) -> None:
+    """Samples all threads for `seconds`; the folded-stacks file goes to the log dir."""
+    profiler = get_profiler(float(get_setting("profile_interval_ms")) / 1000)
+
+    def _done(path: str) -> None:
+        if state.tray:
+            notify(state.tray, "Voiz - Profile written", path)
+            state.tray.update_menu()
+
+    profiler.start(seconds, on_done=_done)
+    if state.tray:
+        state.tray.update_menu()
+        notify(state.tray, "Voiz - Profiling", f"Sampling all threads for {seconds:g} s...")
+
+
+def on_toggle_profiler(state: AppState) -> None:
+    """Context menu action: start the profiler, or stop it early."""
+    profiler = get_profiler(float(get_setting("profile_interval_ms")) / 1000)
+    if profiler.is_running:
+        profiler.stop()  # Writes the file and notifies via _done
+    else:
+        start_profiler(state, float(get_setting("profile_seconds")))
+
+
 def on_quit(state: AppState, icon: pystray.Icon) -> None:
     """Context menu action: quit the app."""
     icon.stop()
@@ -462,6 +1043,16 @@ def on_quit(state: AppState, icon: pystray.Icon) -> None:
 def create_tray(state: AppState) -> pystray.Icon:
     """Creates the system tray icon with context menu."""
     menu = pystray.Menu(
+        pystray.MenuItem(
+            "Cancel",
+            lambda icon, item: cancel_current(state),
+            enabled=lambda item: state.status != AppState.IDLE,
+        ),
+        pystray.MenuItem(
+            "History",
+            pystray.Menu(lambda: _history_menu_items(state)),
+        ),
+        pystray.Menu.SEPARATOR,
         pystray.MenuItem(
             "Set API Key",
             lambda icon, item: on_set_api_key(state),
@@ -471,6 +1062,22 @@ def create_tray(state: AppState) -> pystray.Icon:
             lambda icon, item: on_toggle_autostart(state),
             checked=lambda item: autostart_is_enabled(),
         ),
+        pystray.MenuItem(
+            "Diagnostics",
+            pystray.Menu(
+                pystray.MenuItem(
+                    "Memory Report",
+                    lambda icon, item: on_memory_report(state),
+                ),
+                pystray.MenuItem(
+                    lambda item: (
+                        "Stop Profiler" if get_profiler().is_running
+                        else f"Profile CPU ({get_setting('profile_seconds'):g} s)"
+                    ),
+                    lambda icon, item: on_toggle_profiler(state),
+                ),
+            ),
+        ),
         pystray.Menu.SEPARATOR,
         pystray.MenuItem(
             "Quit",
@@ -479,9 +1086,9 @@ def create_tray(state: AppState) -> pystray.Icon:
     )
 
     if sys.platform == "darwin":
-        tooltip = "Voiz (Ctrl+Space: Record | Ctrl+Cmd+Space: Tools)"
+        tooltip = "Voiz (Ctrl+Space: Record | Ctrl+Cmd+Space: Tools | Ctrl+Shift+Space: Paste last)"
     else:
-        tooltip = "Voiz (Ctrl+Space: Record | Ctrl+Alt+Space: Tools)"
+        tooltip = "Voiz (Ctrl+Space: Record | Ctrl+Alt+Space: Tools | Ctrl+Shift+Space: Paste last)"
 
     icon = pystray.Icon(
         name="voiz",
@@ -510,6 +1117,46 @@ def main() -> None:
     # Start hotkey listener
     hotkey_listener = setup_hotkey_listener(state)
 
+    # Idle memory budget: sample RSS and trim buffers/caches while idle
+    register_trim(state.recorder.trim)
+    if state.history:
+        register_trim(state.history.shrink_memory)
+    mem_sampler = MemorySampler(
+        float(get_setting("mem_sample_interval_s")),
+        float(get_setting("mem_idle_budget_mb")),
+        is_idle=lambda: state.status == AppState.IDLE,
+    )
+    mem_sampler.start()
+
+    # Offline spool: retry jobs that failed while the network was down
+    if state.spool:
+        state.spool_drainer = SpoolDrainer(
+            state.spool, lambda job, payload: deliver_spooled_job(state, job, payload)
+        )
+        state.spool_drainer.start()
+
+    # Local text-tool model: load it now rather than on the first request
+    localllm.preload()
+
+    # Worker processes: spawn them now so the first take does not wait
+    if int(get_setting("worker_processes")) > 0:
+        workers.get_pool(int(get_setting("worker_processes"))).start()
+
+    # Warm capture: open the microphone before the first Ctrl+Space
+    try:
+        state.recorder.warm_up()
+    except Exception:
+        pass  # Retried on the first recording
+
+    # --profile SECONDS: sample from startup (tray loop, hotkeys, first takes)
+    if "--profile" in sys.argv:
+        i = sys.argv.index("--profile")
+        try:
+            seconds = float(sys.argv[i + 1])
+        except (IndexError, ValueError):
+            seconds = float(get_setting("profile_seconds"))
+        start_profiler(state, seconds)
+
     # Create and run system tray (blocks)
     tray = create_tray(state)
     state.tray = tray
@@ -520,8 +1167,16 @@ def main() -> None:
         pass
     finally:
         hotkey_listener.stop()
+        mem_sampler.stop()
+        get_profiler().stop()
+        if state.spool_drainer:
+            state.spool_drainer.stop()
         if state.recorder.is_recording:
             state.recorder.stop()
+        if state.upload:
+            state.upload.abort()
+        state.recorder.close()
+        workers.get_pool().shutdown()
 
 
 if __name__ == "__main__":
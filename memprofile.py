@@ -0,0 +1,219 @@
+"""Memory instrumentation: tracemalloc reports, RSS sampling, idle trimming.
+
+- write_report() takes a tracemalloc snapshot and writes the top allocation
+  sites plus the growth since the previous report to the log directory.
+- MemorySampler logs the resident set size to the metrics log and, while the
+  app is idle and above its budget, runs the registered trim callbacks.
+"""
+
+import ctypes
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from metrics import log_dir, log_metric
+
+TRACE_FRAMES = 10  # Stack depth stored per allocation
+
+_trim_callbacks: list[Callable[[], None]] = []
+_last_snapshot: list[tracemalloc.Snapshot | None] = [None]
+_report_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Resident set size
+# ---------------------------------------------------------------------------
+
+def rss_bytes() -> int:
+    """Returns the current resident set size of this process (0 if unknown).
+
+    On Windows this is the private bytes (committed memory): the working set
+    shrinks whenever the OS trims it, so it says little about what the app
+    holds. On macOS only the peak RSS is available without extra dependencies.
+    """
+    try:
+        if sys.platform == "win32":
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(
+                handle, ctypes.byref(counters), counters.cb
+            ):
+                return counters.PagefileUsage
+            return 0
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # bytes on macOS
+    except (OSError, ValueError, AttributeError, ImportError):
+        return 0
+
+
+def release_freed_memory() -> None:
+    """Hands freed heap pages back to the OS where the platform allows it.
+
+    Only glibc's malloc_trim() actually returns memory. The working set is
+    deliberately not emptied on Windows: that frees nothing, the pages just
+    fault back in on the next hotkey press.
+    """
+    try:
+        if sys.platform.startswith("linux"):
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Trimming
+# ---------------------------------------------------------------------------
+
+def register_trim(callback: Callable[[], None]) -> None:
+    """Registers a callback that drops caches/buffers when memory is trimmed."""
+    _trim_callbacks.append(callback)
+
+
+def trim() -> None:
+    """Runs all trim callbacks, collects garbage and releases freed pages."""
+    for callback in list(_trim_callbacks):
+        try:
+            callback()
+        except Exception:
+            pass
+    gc.collect()
+    release_freed_memory()
+
+
+# ---------------------------------------------------------------------------
+# tracemalloc reports
+# ---------------------------------------------------------------------------
+
+def start_tracing() -> None:
+    """Starts tracemalloc (no-op if already running)."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+
+def write_report(limit: int = 25) -> str:
+    """Writes a memory report to the log directory and returns its path.
+
+    The first call (when tracing was not yet running) starts tracemalloc and
+    records a baseline; later calls show the top allocation sites and the
+    growth since the previous report.
+    """
+    with _report_lock:
+        lines = [
+            f"Voiz memory report -- {time.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"RSS: {rss_bytes() / 1024 / 1024:.1f} MB",
+            f"GC objects: {len(gc.get_objects())}",
+            "",
+        ]
+
+        if not tracemalloc.is_tracing():
+            start_tracing()
+            _last_snapshot[0] = _take_snapshot()
+            lines.append("tracemalloc started -- create another report to see growth.")
+            lines.append("(Start Voiz with --mem-report to include import-time allocations.)")
+        else:
+            snapshot = _take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append(f"Traced: {current / 1024 / 1024:.1f} MB (peak {peak / 1024 / 1024:.1f} MB)")
+            lines.append("")
+            lines.append(f"Top {limit} allocation sites:")
+            for stat in snapshot.statistics("lineno")[:limit]:
+                lines.append(f"  {stat}")
+
+            previous = _last_snapshot[0]
+            if previous is not None:
+                lines.append("")
+                lines.append(f"Top {limit} changes since previous report:")
+                for stat in snapshot.compare_to(previous, "lineno")[:limit]:
+                    lines.append(f"  {stat}")
+            _last_snapshot[0] = snapshot
+
+        path = os.path.join(log_dir(), f"mem-report-{time.strftime('%Y%m%d-%H%M%S')}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+
+# ---------------------------------------------------------------------------
+# RSS sampler with idle budget
+# ---------------------------------------------------------------------------
+
+class MemorySampler:
+    """Background thread that logs RSS and enforces the idle memory budget.
+
+    Usage:
+        sampler = MemorySampler(600, 150, is_idle=lambda: state.status == "idle")
+        sampler.start()
+    """
+
+    def __init__(
+        self,
+        interval_s: float,
+        budget_mb: float,
+        is_idle: Callable[[], bool],
+    ) -> None:
+        self._interval_s = interval_s
+        self._budget_bytes = budget_mb * 1024 * 1024
+        self._is_idle = is_idle
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._interval_s <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="voiz-mem-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def sample(self) -> None:
+        """Logs one RSS sample and trims if idle and over budget."""
+        rss = rss_bytes()
+        idle = self._is_idle()
+        log_metric("rss", rss_mb=round(rss / 1024 / 1024, 1), idle=idle)
+        if idle and self._budget_bytes > 0 and rss > self._budget_bytes:
+            trim()
+            after = rss_bytes()
+            log_metric(
+                "mem_trim",
+                before_mb=round(rss / 1024 / 1024, 1),
+                after_mb=round(after / 1024 / 1024, 1),
+            )
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_s):
+            try:
+                self.sample()
+            except Exception:
+                pass
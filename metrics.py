@@ -0,0 +1,39 @@
+"""Local metrics log (JSON lines in the Voiz log directory).
+
+Nothing is sent anywhere; the file is for diagnosing slowdowns and growth
+over long uptimes. It is rotated once it exceeds MAX_BYTES.
+"""
+
+import json
+import os
+import threading
+import time
+
+from config import app_data_dir
+
+METRICS_FILE = "metrics.log"
+MAX_BYTES = 5 * 1024 * 1024  # Rotate to metrics.log.1 above 5 MB
+
+_lock = threading.Lock()
+
+
+def log_dir() -> str:
+    """Returns (and creates) the directory for logs and diagnostic reports."""
+    path = os.path.join(app_data_dir(), "logs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def log_metric(event: str, **fields) -> None:
+    """Appends one metrics record. Never raises."""
+    record = {"ts": round(time.time(), 3), "event": event, **fields}
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    try:
+        path = os.path.join(log_dir(), METRICS_FILE)
+        with _lock:
+            if os.path.exists(path) and os.path.getsize(path) > MAX_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+    except OSError:
+        pass
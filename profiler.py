@@ -0,0 +1,197 @@
+"""On-demand sampling profiler for the running app (all threads).
+
+A background thread snapshots every thread's stack with
+sys._current_frames() at a fixed interval and counts identical stacks.
+Nothing is traced or hooked, so the app runs at full speed between samples
+and there is no cost at all while the profiler is stopped -- it is safe to
+ship enabled.
+
+The result is written to the log directory in the "folded stacks" format
+(one "thread;outer;...;inner count" line per stack), which flamegraph.pl,
+speedscope (https://www.speedscope.app) and inferno read directly. Samples
+are wall-clock: a thread blocked in a socket read or a lock shows up there.
+
+Can be used as a module (tray -> Diagnostics, voiz.exe --profile SECONDS)
+or as a CLI on a written file:
+    python profiler.py --top profile-20250101-120000.folded
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+
+from metrics import log_dir, log_metric
+
+MAX_SECONDS = 600   # Upper bound for one profiling window
+MAX_DEPTH = 200     # Deeper stacks are cut at the outer end
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads until stopped or the window ends.
+
+    Usage:
+        profiler = SamplingProfiler(interval_s=0.01)
+        profiler.start(30, on_done=lambda path: print(path))
+        ...
+        path = profiler.stop()   # Or let the window run out
+    """
+
+    def __init__(self, interval_s: float = 0.01) -> None:
+        self._interval = max(0.001, interval_s)
+        self._stacks: Counter[str] = Counter()
+        self._labels: dict = {}  # code object -> frame label (cached)
+        self._samples = 0
+        self._started = 0.0
+        self._path: str | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._on_done: Callable[[str], None] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def start(
+        self,
+        seconds: float,
+        on_done: Callable[[str], None] | None = None,
+    ) -> None:
+        """Starts sampling for up to `seconds`; on_done(path) gets the file."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stacks = Counter()
+            self._labels = {}
+            self._samples = 0
+            self._path = None
+            self._on_done = on_done
+            self._stop.clear()
+            self._started = time.perf_counter()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(min(float(seconds), MAX_SECONDS),),
+                name="voiz-profiler",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> str | None:
+        """Stops sampling early and returns the written file (None if idle)."""
+        with self._lock:
+            thread = self._thread
+        if thread is None:
+            return None
+        self._stop.set()
+        if thread is not threading.current_thread():
+            thread.join()
+        return self._path
+
+    # --- Sampling ---
+
+    def _run(self, seconds: float) -> None:
+        own = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        next_at = time.perf_counter()
+        while not self._stop.is_set() and time.perf_counter() < deadline:
+            self._sample(own)
+            next_at += self._interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_at = time.perf_counter()  # Fell behind -- don't burst
+
+        path = None
+        try:
+            path = self._write()
+        except OSError:
+            pass
+        self._path = path
+        with self._lock:
+            self._thread = None
+        if self._on_done is not None and path:
+            self._on_done(path)
+
+    def _sample(self, own_ident: int) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        labels = self._labels
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack: list[str] = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            stack.reverse()
+            self._stacks[";".join(stack)] += 1
+        self._samples += 1
+
+    # --- Output ---
+
+    def _write(self) -> str:
+        """Writes the folded stacks to the log directory and returns the path."""
+        duration = time.perf_counter() - self._started
+        path = os.path.join(log_dir(), time.strftime("profile-%Y%m%d-%H%M%S.folded"))
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self._stacks.items()):
+                f.write(f"{stack} {count}\n")
+        log_metric(
+            "profile", samples=self._samples, stacks=len(self._stacks),
+            duration_s=round(duration, 1), path=os.path.basename(path),
+        )
+        return path
+
+
+# ---------------------------------------------------------------------------
+# Shared instance (tray / --profile)
+# ---------------------------------------------------------------------------
+
+_profiler: SamplingProfiler | None = None
+
+
+def get_profiler(interval_s: float = 0.01) -> SamplingProfiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler(interval_s)
+    return _profiler
+
+
+# ---------------------------------------------------------------------------
+# CLI interface
+# ---------------------------------------------------------------------------
+
+def _print_top(path: str, limit: int = 25) -> None:
+    """Prints the functions with the most samples at the top of the stack."""
+    own: Counter[str] = Counter()
+    total = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if not stack:
+                continue
+            frames = stack.split(";")
+            own[frames[-1] if len(frames) > 1 else frames[0]] += int(count)
+            total += int(count)
+    print(f"  {total} samples")
+    for label, count in own.most_common(limit):
+        print(f"  {count / total * 100:5.1f}%  {label}")
+
+
+if __name__ == "__main__":
+    if "--top" in sys.argv and sys.argv.index("--top") + 1 < len(sys.argv):
+        _print_top(sys.argv[sys.argv.index("--top") + 1])
+    else:
+        print("Usage: python profiler.py --top FILE.folded")
@@ -1,14 +1,47 @@
-"""Audio recording with sounddevice (16kHz, mono, WAV)."""
+"""Audio recording with sounddevice (16kHz, mono, WAV).
+
+Optional warm-capture mode keeps the input stream open between takes and
+fills a small circular pre-roll buffer, so start() is instant and the take
+includes the audio from just before the hotkey was pressed. The device is
+released after a configurable idle period.
+
+Optional native-rate capture opens the device at its own sample rate and
+channel count; a worker thread converts the take to 16 kHz mono in chunks
+while recording (see resample.py), so the audio callback stays a plain copy.
+The same path is used as a fallback when the device refuses 16 kHz.
+
+Optional auto-stop runs a streaming VAD over the callback blocks (see
+vad.py); once the speaker has finished, on_auto_stop(take_id) is called
+from a helper thread so the caller can end the take as if the hotkey had
+been pressed.
+
+Optional encoder: stop() hands the raw blocks and the capture rate to
+encoder(frames, rate) instead of converting and encoding here -- used to
+move that work to a worker process (see workers.py). No conversion thread
+runs during the take in that case.
+
+Optional tap: start(tap=fn) calls fn(block, rate) from the audio callback
+with every block of the take (pre-roll first), as captured -- used to
+stream the audio to the server while recording (see streamupload.py). The
+tap must only queue the block.
+"""
 
 import io
 import threading
+from collections import deque
+from collections.abc import Callable
+
 import numpy as np
 import sounddevice as sd
 import soundfile as sf
 
+from resample import StreamResampler
+from vad import EnergyVAD
+
 SAMPLE_RATE = 16_000  # 16 kHz - optimal for speech
 CHANNELS = 1  # Mono
 DTYPE = "int16"
+CONVERT_INTERVAL_S = 0.25  # Native-rate mode: resample pending blocks this often
 
 
 class Recorder:
@@ -19,32 +52,122 @@ class Recorder:
         recorder.start()   # Start recording
         ...
         audio_bytes = recorder.stop()  # Stop recording, returns WAV bytes
+
+    Warm capture:
+        recorder = Recorder(warm=True, preroll_ms=300, idle_release_s=300)
+        recorder.warm_up()  # Open the device ahead of the first take
+
+    Native-rate capture:
+        recorder = Recorder(native_rate=True)  # stop() still returns 16 kHz mono
+
+    Auto-stop:
+        recorder = Recorder(on_auto_stop=lambda take_id: ..., silence_ms=1200)
+
+    Out-of-process encoding:
+        recorder = Recorder(encoder=workers.get_pool().encode_take)
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        warm: bool = False,
+        preroll_ms: int = 300,
+        idle_release_s: float = 300.0,
+        native_rate: bool = False,
+        on_auto_stop: Callable[[int], None] | None = None,
+        silence_ms: int = 1200,
+        hangover_ms: int = 300,
+        min_speech_ms: int = 500,
+        encoder: Callable[[list[np.ndarray], int], bytes] | None = None,
+    ) -> None:
         self._frames: list[np.ndarray] = []
         self._stream: sd.InputStream | None = None
-        self._lock = threading.Lock()
+        self._lock = threading.Lock()      # Guards start/stop/stream lifecycle
+        self._buf_lock = threading.Lock()  # Guards buffers shared with the callback
         self._recording = False
 
+        self._warm = warm
+        self._idle_release_s = idle_release_s
+        self._idle_timer: threading.Timer | None = None
+        self._preroll: deque[np.ndarray] = deque()
+        self._preroll_len = 0
+        self._preroll_ms = preroll_ms
+        self._preroll_max = SAMPLE_RATE * preroll_ms // 1000 if warm else 0
+
+        # Capture format of the open stream; converted when not 16 kHz mono
+        self._native = native_rate
+        self._rate = SAMPLE_RATE
+        self._channels = CHANNELS
+        self._resampler: StreamResampler | None = None
+        self._converted: list[np.ndarray] = []
+        self._convert_stop = threading.Event()
+        self._convert_thread: threading.Thread | None = None
+
+        # End-of-speech detection (None = manual stop only)
+        self._on_auto_stop = on_auto_stop
+        self._vad_params = (silence_ms, hangover_ms, min_speech_ms)
+        self._vad: EnergyVAD | None = None
+        self._take_id = 0
+
+        # Raw blocks + capture rate -> 16 kHz mono WAV bytes (None = in this thread)
+        self._encoder = encoder
+        self._tap: Callable[[np.ndarray, int], None] | None = None  # Current take only
+
     @property
     def is_recording(self) -> bool:
         return self._recording
 
-    def start(self) -> None:
-        """Starts audio recording."""
+    @property
+    def take_id(self) -> int:
+        """Increases with every start(); identifies the take for auto-stop."""
+        return self._take_id
+
+    @property
+    def is_open(self) -> bool:
+        """True while the input device is held open (recording or warm)."""
+        return self._stream is not None
+
+    def warm_up(self) -> None:
+        """Opens the input stream ahead of time (warm mode only)."""
+        if not self._warm:
+            return
+        with self._lock:
+            if self._stream is None:
+                self._open_stream()
+            if not self._recording:
+                self._schedule_release()
+
+    def start(self, tap: Callable[[np.ndarray, int], None] | None = None) -> None:
+        """Starts audio recording.
+
+        Args:
+            tap: Optional fn(block, rate) receiving the take's blocks as they
+                are captured (called from the audio callback).
+        """
         with self._lock:
             if self._recording:
                 return
-            self._frames = []
-            self._stream = sd.InputStream(
-                samplerate=SAMPLE_RATE,
-                channels=CHANNELS,
-                dtype=DTYPE,
-                callback=self._audio_callback,
-            )
-            self._stream.start()
-            self._recording = True
+            self._cancel_release()
+            with self._buf_lock:
+                self._frames = self._take_preroll()
+                self._tap = tap
+                if tap is not None:
+                    for block in self._frames:
+                        tap(block, self._rate)
+                self._take_id += 1
+                self._vad = None
+                self._recording = True
+            if self._stream is None:
+                try:
+                    self._open_stream()
+                except Exception:
+                    self._recording = False
+                    self._tap = None
+                    raise
+            if self._on_auto_stop is not None:
+                with self._buf_lock:
+                    self._vad = EnergyVAD(self._rate, *self._vad_params)
+            if self._resampler is not None and self._encoder is None:
+                self._start_converter()
 
     def stop(self) -> bytes | None:
         """Stops recording and returns the WAV data as bytes.
@@ -56,17 +179,36 @@ class Recorder:
             if not self._recording or self._stream is None:
                 return None
 
-            self._stream.stop()
-            self._stream.close()
-            self._stream = None
-            self._recording = False
+            if self._warm:
+                # Keep the device open; the callback goes back to pre-roll
+                with self._buf_lock:
+                    self._recording = False
+                    self._tap = None
+                    frames = self._frames
+                    self._frames = []
+                self._schedule_release()
+            else:
+                self._close_stream()
+                with self._buf_lock:
+                    self._recording = False
+                    self._tap = None
+                    frames = self._frames
+                    self._frames = []
 
-            if not self._frames:
+            rate = self._rate
+            if self._resampler is not None and self._encoder is None:
+                frames = self._finish_conversion(frames)
+
+            frames = [f for f in frames if len(f)]
+            if not frames:
                 return None
 
-            # Concatenate all frames
-            audio_data = np.concatenate(self._frames, axis=0)
-            self._frames = []
+        if self._encoder is not None:
+            # Conversion and encoding happen in the encoder (worker process)
+            return self._encoder(frames, rate)
+
+        # Concatenate all frames
+        audio_data = np.concatenate(frames, axis=0)
 
         # Convert to WAV bytes (in-memory)
         buffer = io.BytesIO()
@@ -74,6 +216,152 @@ class Recorder:
         buffer.seek(0)
         return buffer.read()
 
+    def close(self) -> None:
+        """Releases the input device and drops all buffered audio."""
+        with self._lock:
+            self._cancel_release()
+            self._stop_converter()
+            self._close_stream()
+            with self._buf_lock:
+                self._recording = False
+                self._tap = None
+                self._frames = []
+                self._preroll.clear()
+                self._preroll_len = 0
+            self._converted = []
+            if self._resampler is not None:
+                self._resampler.reset()
+
+    def trim(self) -> None:
+        """Drops idle buffers (pre-roll) so their memory can be reclaimed."""
+        with self._lock:
+            if self._recording:
+                return
+            with self._buf_lock:
+                self._frames = []
+                self._preroll.clear()
+                self._preroll_len = 0
+
+    # --- Stream lifecycle ---
+
+    def _open_stream(self) -> None:
+        rate, channels = self._device_format() if self._native else (SAMPLE_RATE, CHANNELS)
+        try:
+            stream = sd.InputStream(
+                samplerate=rate,
+                channels=channels,
+                dtype=DTYPE,
+                callback=self._audio_callback,
+            )
+        except sd.PortAudioError:
+            if self._native:
+                raise
+            # Device refuses 16 kHz mono -> capture natively and convert
+            rate, channels = self._device_format()
+            stream = sd.InputStream(
+                samplerate=rate,
+                channels=channels,
+                dtype=DTYPE,
+                callback=self._audio_callback,
+            )
+
+        self._rate, self._channels = rate, channels
+        if (rate, channels) == (SAMPLE_RATE, CHANNELS):
+            self._resampler = None
+        elif self._resampler is None or self._resampler.in_rate != rate:
+            self._resampler = StreamResampler(rate, SAMPLE_RATE)
+        with self._buf_lock:
+            if self._warm:
+                self._preroll_max = rate * self._preroll_ms // 1000
+        stream.start()
+        self._stream = stream
+
+    @staticmethod
+    def _device_format() -> tuple[int, int]:
+        """Returns the default input device's native rate and channels (max 2)."""
+        info = sd.query_devices(kind="input")
+        channels = max(1, min(2, int(info["max_input_channels"])))
+        return int(info["default_samplerate"]), channels
+
+    def _close_stream(self) -> None:
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def _schedule_release(self) -> None:
+        """Closes the warm stream after idle_release_s without a new take."""
+        self._cancel_release()
+        if self._idle_release_s <= 0:
+            return  # Never release
+        self._idle_timer = threading.Timer(self._idle_release_s, self._release_idle)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _cancel_release(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _release_idle(self) -> None:
+        with self._lock:
+            if self._recording:
+                return
+            self._idle_timer = None
+            self._close_stream()
+            with self._buf_lock:
+                self._preroll.clear()
+                self._preroll_len = 0
+
+    # --- Native-rate conversion (worker thread) ---
+
+    def _start_converter(self) -> None:
+        self._converted = []
+        self._convert_stop.clear()
+        self._convert_thread = threading.Thread(
+            target=self._convert_loop, name="voiz-resample", daemon=True
+        )
+        self._convert_thread.start()
+
+    def _stop_converter(self) -> None:
+        if self._convert_thread is not None:
+            self._convert_stop.set()
+            self._convert_thread.join()
+            self._convert_thread = None
+
+    def _convert_loop(self) -> None:
+        """Resamples the blocks collected so far, every CONVERT_INTERVAL_S."""
+        while not self._convert_stop.wait(CONVERT_INTERVAL_S):
+            with self._buf_lock:
+                if not self._recording:
+                    return
+                pending, self._frames = self._frames, []
+            for block in pending:
+                self._converted.append(self._resampler.process(block))
+
+    def _finish_conversion(self, frames: list[np.ndarray]) -> list[np.ndarray]:
+        """Converts the remaining blocks and returns the whole take at 16 kHz."""
+        self._stop_converter()
+        converted, self._converted = self._converted, []
+        for block in frames:
+            converted.append(self._resampler.process(block))
+        converted.append(self._resampler.flush())
+        return [c for c in converted if len(c)]
+
+    # --- Buffers ---
+
+    def _take_preroll(self) -> list[np.ndarray]:
+        """Returns the last preroll_ms of audio and empties the ring buffer.
+
+        Caller must hold _buf_lock.
+        """
+        if not self._preroll:
+            return []
+        audio = np.concatenate(self._preroll, axis=0)[-self._preroll_max:]
+        self._preroll.clear()
+        self._preroll_len = 0
+        return [audio]
+
     def _audio_callback(
         self,
         indata: np.ndarray,
@@ -81,5 +369,21 @@ class Recorder:
         time_info: object,
         status: sd.CallbackFlags,
     ) -> None:
-        """Audio stream callback -- collects frames."""
-        self._frames.append(indata.copy())
+        """Audio stream callback -- collects frames (or pre-roll when idle)."""
+        with self._buf_lock:
+            if self._recording:
+                block = indata.copy()
+                self._frames.append(block)
+                if self._tap is not None:
+                    self._tap(block, self._rate)
+                if self._vad is not None and self._vad.update(indata):
+                    # stop() closes this stream -- never call back from here
+                    threading.Thread(
+                        target=self._on_auto_stop, args=(self._take_id,), daemon=True
+                    ).start()
+            elif self._preroll_max > 0:
+                self._preroll.append(indata.copy())
+                self._preroll_len += len(indata)
+                # Drop whole blocks while the rest still covers the pre-roll
+                while self._preroll_len - len(self._preroll[0]) >= self._preroll_max:
+                    self._preroll_len -= len(self._preroll.popleft())
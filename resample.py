@@ -0,0 +1,136 @@
+"""Streaming polyphase resampler (device rate -> 16 kHz mono).
+
+Many USB and Bluetooth microphones do not offer 16 kHz natively. Instead of
+letting PortAudio resample (or fail to open the stream), the recorder can
+capture at the device's own rate and convert here: multi-channel blocks are
+mixed down to mono, then passed through a Kaiser-windowed sinc filter bank
+split into polyphase branches, so only the output samples that are kept get
+computed. State carries over between blocks, so chunks can be fed as they
+arrive.
+
+Usage:
+    resampler = StreamResampler(48_000, 16_000)
+    out = resampler.process(block)   # int16 (frames x channels) -> int16 mono
+    ...
+    out = resampler.flush()          # Remaining samples at the end of a take
+"""
+
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+ATTENUATION_DB = 80.0   # Stopband attenuation of the anti-aliasing filter
+TRANSITION = 0.1        # Transition band as a fraction of the lower rate
+PASSBAND = 0.9          # Cutoff as a fraction of the lower rate's Nyquist
+
+
+def downmix(block: np.ndarray) -> np.ndarray:
+    """Returns a (frames x channels) or 1-D int16/float block as mono float32."""
+    data = np.asarray(block)
+    if data.dtype == np.int16:
+        data = data.astype(np.float32) / 32768.0
+    else:
+        data = data.astype(np.float32, copy=False)
+    if data.ndim == 2:
+        data = data[:, 0] if data.shape[1] == 1 else data.mean(axis=1, dtype=np.float32)
+    return data
+
+
+def design_filter(up: int, down: int) -> np.ndarray:
+    """Returns the polyphase filter bank for an up/down rational ratio.
+
+    Row p holds the taps of phase p in reverse order, so a dot product with
+    the newest input samples (oldest first) yields one output sample.
+    """
+    ratio = max(up, down) / up  # Filter span in input samples per tap group
+    taps_per_phase = int(np.ceil(
+        (ATTENUATION_DB - 8) / (2.285 * 2 * np.pi * TRANSITION) * ratio
+    ))
+    n = taps_per_phase * up
+    n -= 1 - n % 2  # Odd length -> the delay is a whole sample
+    cutoff = PASSBAND * 0.5 / max(up, down)  # Cycles per upsampled sample
+    beta = 0.1102 * (ATTENUATION_DB - 8.7)
+    t = np.arange(n) - (n - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, beta)
+    h *= up / h.sum()  # Unity DC gain after zero-stuffing by `up`
+    h = np.append(h, np.zeros(taps_per_phase * up - n))
+    bank = h.reshape(taps_per_phase, up).T  # bank[p, j] = h[p + j * up]
+    return np.ascontiguousarray(bank[:, ::-1], dtype=np.float32)
+
+
+class StreamResampler:
+    """Converts a block stream from in_rate to out_rate (mono int16 output).
+
+    Not thread-safe; feed it from a single worker thread.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int = 16_000) -> None:
+        in_rate, out_rate = int(in_rate), int(out_rate)
+        g = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self._up = out_rate // g
+        self._down = in_rate // g
+        self._bank = design_filter(self._up, self._down)
+        self._taps = self._bank.shape[1]
+        # Center the filter so output sample 0 lines up with input sample 0
+        self._offset = (self._taps * self._up - 1) // 2
+        self._history = np.zeros(self._taps - 1, dtype=np.float32)
+        self._n_in = 0    # Input samples consumed so far
+        self._n_out = 0   # Output samples produced so far
+
+    @property
+    def passthrough(self) -> bool:
+        return self._up == self._down
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Resamples the next block; returns the int16 samples ready so far."""
+        return _to_int16(self._process(downmix(block)))
+
+    def flush(self) -> np.ndarray:
+        """Returns the samples still held back by the filter delay.
+
+        The total output length matches the input duration; the resampler
+        starts over afterwards.
+        """
+        total = -(-self._n_in * self._up // self._down)  # ceil
+        pending = total - self._n_out
+        tail = np.zeros(0, dtype=np.float32)
+        if pending > 0 and not self.passthrough:
+            zeros = np.zeros(self._taps + self._offset // self._up + 1, dtype=np.float32)
+            tail = self._process(zeros)[:pending]
+        self.reset()
+        return _to_int16(tail)
+
+    def reset(self) -> None:
+        self._history[:] = 0
+        self._n_in = 0
+        self._n_out = 0
+
+    def _process(self, samples: np.ndarray) -> np.ndarray:
+        if self.passthrough:
+            self._n_in += len(samples)
+            self._n_out += len(samples)
+            return samples
+        base = self._n_in
+        buf = np.concatenate((self._history, samples))
+        self._n_in += len(samples)
+        self._history = buf[len(buf) - (self._taps - 1):].copy()
+
+        # Upsampled positions of every output whose newest input has arrived
+        first = self._offset + self._n_out * self._down
+        last = self._n_in * self._up  # Exclusive
+        if first >= last:
+            return np.zeros(0, dtype=np.float32)
+        positions = np.arange(first, last, self._down)
+        inputs, phases = np.divmod(positions, self._up)
+        self._n_out += len(positions)
+
+        # Window ending at each input sample: buf[i - taps + 1 : i + 1]
+        windows = sliding_window_view(buf, self._taps)[inputs - base]
+        return np.einsum("ij,ij->i", windows, self._bank[phases])
+
+
+def _to_int16(samples: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(samples * 32768.0), -32768, 32767).astype(np.int16)
@@ -0,0 +1,305 @@
+"""Priority scheduler for API jobs (transcribe / optimize_text).
+
+Every API job runs in one of three lanes, in priority order:
+
+    interactive   hotkey jobs (Ctrl+Space, text tools) -- the user is waiting
+    speculative   work whose result may be thrown away (prefetch, previews)
+    background    spool retries, bulk jobs submitted to the daemon
+
+A job waits for a slot ("scheduler_max_concurrency" jobs run at once) and,
+if "scheduler_rate_per_min" is set, for a request from the per-minute
+budget. Waiting interactive jobs always go first; in addition
+"scheduler_interactive_slots" slots and the "scheduler_rate_reserve" share
+of the budget are never handed to the other lanes, so a Ctrl+Space does not
+queue behind a burst of retries. If an interactive job still finds every
+slot busy, the newest lower-lane job is preempted: its request is aborted
+through its CancelToken. Preempted speculative jobs end with
+CancelledError; preempted background jobs are queued again and retried.
+
+Queue wait per lane goes to the metrics log ("queue_wait") and stats().
+
+Can be used as a module (main.py, daemon.py) or as a CLI on the metrics log:
+    python scheduler.py --stats
+"""
+
+import itertools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import TypeVar
+
+from config import get_setting
+from jobs import CancelledError, CancelToken
+from metrics import METRICS_FILE, log_dir, log_metric
+
+T = TypeVar("T")
+
+INTERACTIVE = "interactive"
+SPECULATIVE = "speculative"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, SPECULATIVE, BACKGROUND)  # Highest priority first
+
+WAIT_SAMPLES = 200  # Recent queue waits kept per lane for stats()
+
+
+class _Ticket:
+    """One job's place in a lane queue, then in the running set."""
+
+    def __init__(self, lane: str, seq: int) -> None:
+        self.lane = lane
+        self.seq = seq
+        self.token = CancelToken()  # Cancelled on preemption
+        self.preempted = False
+
+
+class Scheduler:
+    """Lane-based admission for blocking API calls.
+
+    Usage:
+        scheduler = Scheduler(max_concurrency=4, interactive_slots=1)
+        text = scheduler.run(INTERACTIVE, lambda token: transcribe(wav, key, cancel=token), cancel)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        interactive_slots: int = 1,
+        rate_per_min: float = 0.0,
+        rate_reserve: float = 0.2,
+        preempt: bool = True,
+    ) -> None:
+        self._max = max(1, max_concurrency)
+        # At least one slot stays usable by the lower lanes
+        self._reserved = max(0, min(interactive_slots, self._max - 1))
+        self._rate = max(0.0, rate_per_min)
+        self._rate_reserve = min(max(rate_reserve, 0.0), 1.0) * self._rate
+        self._tokens = self._rate  # Bucket holds one minute's budget
+        self._refilled = time.monotonic()
+        self._preempt = preempt
+
+        self._cond = threading.Condition()  # RLock: cancel callbacks may re-enter
+        self._waiting: dict[str, deque[_Ticket]] = {lane: deque() for lane in LANES}
+        self._running: list[_Ticket] = []
+        self._seq = itertools.count()
+        self._waits: dict[str, deque[float]] = {lane: deque(maxlen=WAIT_SAMPLES) for lane in LANES}
+        self._done = dict.fromkeys(LANES, 0)
+        self._preempted = dict.fromkeys(LANES, 0)
+
+    def run(
+        self,
+        lane: str,
+        fn: Callable[[CancelToken], T],
+        cancel: CancelToken | None = None,
+    ) -> T:
+        """Waits for a slot in `lane`, then returns fn(token).
+
+        `token` is cancelled when the caller's `cancel` is, or when the job
+        is preempted -- pass it on to transcribe() / optimize_text().
+
+        Raises:
+            CancelledError: If cancelled (or, outside the background lane,
+                preempted) before fn() finished.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+        queued = time.monotonic()
+        requeues = 0
+        while True:
+            ticket = self._acquire(lane, cancel, front=requeues > 0)
+            wait_ms = (time.monotonic() - queued) * 1000
+            if requeues == 0:
+                with self._cond:
+                    self._waits[lane].append(wait_ms)
+            log_metric("queue_wait", lane=lane, wait_ms=round(wait_ms, 1), requeues=requeues)
+
+            remove = cancel.on_cancel(ticket.token.cancel) if cancel else (lambda: None)
+            try:
+                return fn(ticket.token)
+            except Exception as e:
+                if not ticket.preempted or (cancel is not None and cancel.cancelled):
+                    raise
+                if lane != BACKGROUND:
+                    raise CancelledError() from e
+                requeues += 1  # Retried as soon as the interactive burst is over
+            finally:
+                remove()
+                self._release(ticket)
+
+    def stats(self) -> dict[str, dict]:
+        """Returns per-lane queue length, running jobs, totals and wait times."""
+        with self._cond:
+            result = {}
+            for lane in LANES:
+                waits = sorted(self._waits[lane])
+                p95 = waits[int(round(0.95 * (len(waits) - 1)))] if waits else None
+                result[lane] = {
+                    "waiting": len(self._waiting[lane]),
+                    "running": sum(1 for t in self._running if t.lane == lane),
+                    "done": self._done[lane],
+                    "preempted": self._preempted[lane],
+                    "wait_p50_ms": round(statistics.median(waits), 1) if waits else None,
+                    "wait_p95_ms": round(p95, 1) if waits else None,
+                }
+            return result
+
+    # --- Admission ---
+
+    def _acquire(self, lane: str, cancel: CancelToken | None, front: bool) -> _Ticket:
+        ticket = _Ticket(lane, next(self._seq))
+        with self._cond:
+            queue = self._waiting[lane]
+            if front:
+                queue.appendleft(ticket)
+            else:
+                queue.append(ticket)
+            remove = cancel.on_cancel(self._wake) if cancel else (lambda: None)
+            try:
+                while True:
+                    if cancel is not None and cancel.cancelled:
+                        raise CancelledError()
+                    delay = self._admit_delay(ticket)
+                    if delay == 0:
+                        queue.remove(ticket)
+                        self._running.append(ticket)
+                        if self._rate:
+                            self._tokens -= 1
+                        self._cond.notify_all()  # The next ticket may fit as well
+                        return ticket
+                    if lane == INTERACTIVE and self._preempt and len(self._running) >= self._max:
+                        self._preempt_one()
+                    self._cond.wait(delay)
+            except BaseException:
+                if ticket in queue:
+                    queue.remove(ticket)
+                self._cond.notify_all()
+                raise
+            finally:
+                remove()
+
+    def _admit_delay(self, ticket: _Ticket) -> float | None:
+        """Returns 0 if the ticket may start now, else how long to wait (None = until woken).
+
+        Caller holds the lock.
+        """
+        lane = ticket.lane
+        for higher in LANES[:LANES.index(lane)]:
+            if self._waiting[higher]:
+                return None
+        if self._waiting[lane][0] is not ticket:
+            return None
+        limit = self._max if lane == INTERACTIVE else self._max - self._reserved
+        if len(self._running) >= limit:
+            return None
+        if self._rate:
+            now = time.monotonic()
+            self._tokens = min(self._rate, self._tokens + (now - self._refilled) * self._rate / 60)
+            self._refilled = now
+            needed = 1.0 if lane == INTERACTIVE else 1.0 + self._rate_reserve
+            if self._tokens < needed:
+                return (needed - self._tokens) * 60 / self._rate
+        return 0
+
+    def _preempt_one(self) -> None:
+        """Aborts the newest lower-lane job, unless one is already on its way out.
+
+        Caller holds the lock.
+        """
+        pending = sum(1 for t in self._running if t.preempted)
+        if pending >= len(self._waiting[INTERACTIVE]):
+            return
+        victims = [t for t in self._running if t.lane != INTERACTIVE and not t.preempted]
+        if not victims:
+            return
+        victim = max(victims, key=lambda t: (LANES.index(t.lane), t.seq))
+        victim.preempted = True
+        self._preempted[victim.lane] += 1
+        log_metric("preempt", lane=victim.lane)
+        victim.token.cancel()
+
+    def _release(self, ticket: _Ticket) -> None:
+        with self._cond:
+            self._running.remove(ticket)
+            if not ticket.preempted:
+                self._done[ticket.lane] += 1
+            self._cond.notify_all()
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+
+# ---------------------------------------------------------------------------
+# Shared instance
+# ---------------------------------------------------------------------------
+
+_scheduler: Scheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """Returns the process-wide scheduler (configured from the settings)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(
+                max_concurrency=int(get_setting("scheduler_max_concurrency")),
+                interactive_slots=int(get_setting("scheduler_interactive_slots")),
+                rate_per_min=float(get_setting("scheduler_rate_per_min")),
+                rate_reserve=float(get_setting("scheduler_rate_reserve")),
+                preempt=bool(get_setting("scheduler_preempt")),
+            )
+        return _scheduler
+
+
+def run(lane: str, fn: Callable[[CancelToken], T], cancel: CancelToken | None = None) -> T:
+    """Runs fn(token) on the shared scheduler (see Scheduler.run)."""
+    return get_scheduler().run(lane, fn, cancel)
+
+
+# ---------------------------------------------------------------------------
+# CLI interface
+# ---------------------------------------------------------------------------
+
+def _print_waits() -> None:
+    """Summarizes the queue_wait records of the metrics log per lane."""
+    waits: dict[str, list[float]] = {lane: [] for lane in LANES}
+    preempted = dict.fromkeys(LANES, 0)
+    path = os.path.join(log_dir(), METRICS_FILE)
+    for name in (path + ".1", path):
+        if not os.path.exists(name):
+            continue
+        with open(name, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                lane = record.get("lane")
+                if lane not in waits:
+                    continue
+                if record.get("event") == "queue_wait" and not record.get("requeues"):
+                    waits[lane].append(float(record["wait_ms"]))
+                elif record.get("event") == "preempt":
+                    preempted[lane] += 1
+    for lane in LANES:
+        values = sorted(waits[lane])
+        if not values:
+            print(f"  {lane:<12} no jobs")
+            continue
+        p95 = values[int(round(0.95 * (len(values) - 1)))]
+        print(
+            f"  {lane:<12} {len(values):5d} jobs  wait median {statistics.median(values):8.1f} ms  "
+            f"p95 {p95:8.1f} ms  max {values[-1]:8.1f} ms  preempted {preempted[lane]}"
+        )
+
+
+if __name__ == "__main__":
+    if "--stats" in sys.argv:
+        _print_waits()
+    else:
+        print("Usage: python scheduler.py --stats")
@@ -0,0 +1,280 @@
+"""Durable on-disk spool for transcription / text-tool jobs that failed
+because of the network, plus a background drainer that retries them.
+
+Each job is two files in the spool directory:
+    <id>.bin    Payload (WAV bytes or UTF-8 text)
+    <id>.json   Metadata -- written last, so its presence marks a complete job
+
+Both are written to a temp file, fsynced and atomically renamed, so a crash
+never leaves a half-written job behind. Jobs are retried oldest first; the
+spool is capped by total size and age.
+"""
+
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+
+import openai
+
+from config import app_data_dir
+from metrics import log_metric
+
+KIND_TRANSCRIBE = "transcribe"
+KIND_TOOL = "tool"
+
+ORPHAN_GRACE_S = 3600  # Payloads without metadata older than this are removed
+
+# Errors worth retrying later; everything else (auth, bad request) is final
+_TRANSIENT_ERRORS = (
+    openai.APIConnectionError,   # Includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+    ConnectionError,
+    TimeoutError,
+)
+# 429s that no retry fixes: the account is out of credit, not rate limited
+_QUOTA_CODES = ("insufficient_quota", "billing_hard_limit_reached")
+
+
+def is_quota_error(exc: BaseException) -> bool:
+    """Returns True for a 429 caused by exhausted quota or billing limits."""
+    return isinstance(exc, openai.RateLimitError) and (
+        exc.code in _QUOTA_CODES or exc.type in _QUOTA_CODES
+    )
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Returns True if a failed job should be spooled and retried."""
+    return isinstance(exc, _TRANSIENT_ERRORS) and not is_quota_error(exc)
+
+
+def default_path() -> str:
+    return os.path.join(app_data_dir(), "spool")
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Writes data via temp file + fsync + rename (crash-safe)."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _fsync_dir(path: str) -> None:
+    """Persists the directory entry of a rename (no-op on Windows)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SpoolJob:
+    """Metadata of a spooled job."""
+
+    __slots__ = ("id", "kind", "created", "attempts", "meta")
+
+    def __init__(self, id: str, kind: str, created: float, attempts: int, meta: dict) -> None:
+        self.id = id
+        self.kind = kind
+        self.created = created
+        self.attempts = attempts
+        self.meta = meta
+
+
+class Spool:
+    """Directory-backed FIFO of failed jobs.
+
+    Usage:
+        spool = Spool(max_bytes=200 * 1024 * 1024, max_age_s=7 * 86400)
+        spool.enqueue(KIND_TRANSCRIBE, wav_bytes)
+        for job in spool.jobs():
+            payload = spool.load_payload(job)
+            ...
+            spool.remove(job.id)
+    """
+
+    def __init__(self, path: str | None = None, max_bytes: int = 0, max_age_s: float = 0) -> None:
+        self._path = path or default_path()
+        self._max_bytes = max_bytes
+        self._max_age_s = max_age_s
+        self._lock = threading.Lock()
+        os.makedirs(self._path, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self.jobs())
+
+    def enqueue(self, kind: str, payload: bytes, **meta) -> str:
+        """Durably stores a job and returns its id."""
+        job_id = f"{time.time_ns():020d}-{kind}"
+        record = {"kind": kind, "created": time.time(), "attempts": 0, "meta": meta}
+        with self._lock:
+            _write_atomic(self._file(job_id, ".bin"), payload)
+            _write_atomic(self._file(job_id, ".json"), json.dumps(record).encode("utf-8"))
+            _fsync_dir(self._path)
+        self.enforce_limits()
+        log_metric("spool_enqueue", kind=kind, bytes=len(payload))
+        return job_id
+
+    def jobs(self) -> list[SpoolJob]:
+        """Returns all complete jobs, oldest first."""
+        result = []
+        with self._lock:
+            names = sorted(n for n in os.listdir(self._path) if n.endswith(".json"))
+            for name in names:
+                job_id = name[:-len(".json")]
+                try:
+                    with open(self._file(job_id, ".json"), "r", encoding="utf-8") as f:
+                        record = json.load(f)
+                    result.append(SpoolJob(
+                        job_id, record["kind"], record["created"],
+                        record.get("attempts", 0), record.get("meta", {}),
+                    ))
+                except (OSError, ValueError, KeyError):
+                    continue
+        return result
+
+    def load_payload(self, job: SpoolJob) -> bytes:
+        with open(self._file(job.id, ".bin"), "rb") as f:
+            return f.read()
+
+    def mark_attempt(self, job: SpoolJob) -> None:
+        """Increments the attempt counter of a job."""
+        job.attempts += 1
+        record = {"kind": job.kind, "created": job.created, "attempts": job.attempts, "meta": job.meta}
+        with self._lock:
+            _write_atomic(self._file(job.id, ".json"), json.dumps(record).encode("utf-8"))
+
+    def remove(self, job_id: str) -> None:
+        # Metadata first: a leftover payload is an orphan, never a broken job
+        with self._lock:
+            for ext in (".json", ".bin"):
+                try:
+                    os.remove(self._file(job_id, ext))
+                except FileNotFoundError:
+                    pass
+
+    def enforce_limits(self) -> None:
+        """Drops jobs older than max_age_s and the oldest jobs above max_bytes."""
+        now = time.time()
+        jobs = self.jobs()
+        for job in list(jobs):
+            if self._max_age_s and now - job.created > self._max_age_s:
+                self.remove(job.id)
+                jobs.remove(job)
+                log_metric("spool_drop", reason="age", kind=job.kind)
+
+        if self._max_bytes:
+            sizes = {}
+            for job in jobs:
+                try:
+                    sizes[job.id] = os.path.getsize(self._file(job.id, ".bin"))
+                except OSError:
+                    sizes[job.id] = 0
+            total = sum(sizes.values())
+            while jobs and total > self._max_bytes:
+                job = jobs.pop(0)
+                total -= sizes[job.id]
+                self.remove(job.id)
+                log_metric("spool_drop", reason="size", kind=job.kind)
+
+        # Payloads and temp files left behind by a crash
+        with self._lock:
+            for name in os.listdir(self._path):
+                path = os.path.join(self._path, name)
+                stem = name.split(".", 1)[0]
+                orphan = name.endswith(".tmp") or (
+                    name.endswith(".bin") and not os.path.exists(self._file(stem, ".json"))
+                )
+                try:
+                    if orphan and now - os.path.getmtime(path) > ORPHAN_GRACE_S:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    def _file(self, job_id: str, ext: str) -> str:
+        return os.path.join(self._path, job_id + ext)
+
+
+class SpoolDrainer:
+    """Background thread that retries spooled jobs in order.
+
+    The handler performs the job and delivers its result. If it raises a
+    transient error, the drainer backs off (doubling up to MAX_BACKOFF_S)
+    and retries the same job later; wake() retries immediately, e.g. after
+    another request just succeeded. Non-transient errors drop the job.
+    """
+
+    MIN_BACKOFF_S = 5.0
+    MAX_BACKOFF_S = 300.0
+
+    def __init__(self, spool: Spool, handler: Callable[[SpoolJob, bytes], None]) -> None:
+        self._spool = spool
+        self._handler = handler
+        self._wake = threading.Event()
+        self._stopped = False
+        self._backoff = self.MIN_BACKOFF_S
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="voiz-spool", daemon=True)
+            self._thread.start()
+
+    def wake(self) -> None:
+        """Retries pending jobs now (connection is likely back)."""
+        self._backoff = self.MIN_BACKOFF_S
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            delay = self._drain_once()
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def _drain_once(self) -> float | None:
+        """Processes jobs until the spool is empty or a job must wait.
+
+        Returns the time to wait before the next pass (None = until woken).
+        """
+        self._spool.enforce_limits()
+        for job in self._spool.jobs():
+            if self._stopped:
+                return None
+            try:
+                payload = self._spool.load_payload(job)
+            except OSError:
+                self._spool.remove(job.id)
+                continue
+
+            self._spool.mark_attempt(job)
+            try:
+                self._handler(job, payload)
+            except Exception as e:
+                if is_transient_error(e):
+                    delay = self._backoff
+                    self._backoff = min(self._backoff * 2, self.MAX_BACKOFF_S)
+                    return delay
+                log_metric("spool_drop", reason="error", kind=job.kind, error=type(e).__name__)
+                self._spool.remove(job.id)
+                continue
+
+            log_metric(
+                "spool_delivered",
+                kind=job.kind,
+                attempts=job.attempts,
+                age_s=round(time.time() - job.created, 1),
+            )
+            self._spool.remove(job.id)
+            self._backoff = self.MIN_BACKOFF_S
+        return None
@@ -0,0 +1,413 @@
+"""Streaming transcription upload: the request is sent while you speak.
+
+With "streaming_upload" on, Ctrl+Space opens the transcription request at
+once. The multipart body goes out with chunked transfer encoding: the form
+fields and a WAV header first, then the audio as the Recorder delivers it
+(converted to 16 kHz mono on the upload thread, never in the audio
+callback), and the closing boundary on the second press. After the key
+press only the server's processing time is left.
+
+The WAV header is written before the length is known, so its RIFF and data
+sizes are 0xFFFFFFFF ("until the end of the stream"), which ffmpeg-based
+decoders accept. The request is made with http.client because the SDK
+needs the whole file up front. Azure endpoints are not supported; those
+takes use the regular upload. If the streamed request fails for any
+reason, the caller falls back to the regular upload of the recorded WAV.
+
+Can be used as a module (main.py) or as a CLI, e.g. against the built-in
+stand-in server that accepts chunked multipart uploads:
+    python streamupload.py --fake-server 8766
+    python streamupload.py --send memo.wav --url http://127.0.0.1:8766/v1 [--realtime]
+"""
+
+import http.client
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from config import get_setting
+from endpoints import get_pool
+from jobs import CancelledError, CancelToken
+from metrics import log_metric
+from resample import StreamResampler
+from transcriber import supports_streaming
+from vocabulary import apply_vocabulary, prompt_hint
+
+SAMPLE_RATE = 16_000
+CONNECT_TIMEOUT_S = 10.0
+RESPONSE_TIMEOUT_S = 120.0  # Server processing after the last chunk
+
+_END = object()  # Queue marker: the take is over
+
+
+class UploadError(Exception):
+    """The server rejected the streamed upload (non-200 response)."""
+
+
+def wav_stream_header(rate: int = SAMPLE_RATE) -> bytes:
+    """WAV header for 16-bit mono PCM of unknown length."""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 0xFFFFFFFF, b"WAVE",
+        b"fmt ", 16, 1, 1, rate, rate * 2, 2, 16,
+        b"data", 0xFFFFFFFF,
+    )
+
+
+class StreamingUpload:
+    """One transcription request whose audio is sent while it is recorded.
+
+    Usage:
+        upload = StreamingUpload(base_url, api_key, "whisper-1")
+        upload.start()
+        recorder.start(tap=upload.feed)
+        ...
+        recorder.stop()
+        text = upload.finish()   # Only server processing time left
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str,
+        prompt: str = "",
+        stream: bool = False,
+    ) -> None:
+        url = urlsplit(base_url.rstrip("/") + "/audio/transcriptions")
+        self._https = url.scheme == "https"
+        self._host = url.hostname or "localhost"
+        self._port = url.port
+        self._path = url.path
+        self._api_key = api_key
+        self._fields = {"model": model}
+        if prompt:
+            self._fields["prompt"] = prompt
+        if stream:
+            self._fields["stream"] = "true"
+        self._stream = stream
+        self._boundary = "voiz-" + uuid.uuid4().hex
+
+        self._queue: queue.Queue = queue.Queue()
+        self._resampler: StreamResampler | None = None
+        self._conn: http.client.HTTPConnection | None = None
+        self._thread: threading.Thread | None = None
+        self._done = threading.Event()
+        self._failed = False
+        self._aborted = False
+        self._result: str | None = None
+        self._error: BaseException | None = None
+        self._on_delta: Callable[[str], None] | None = None
+        self._sent = 0
+        self._finished_at = 0.0
+
+    def start(self) -> None:
+        """Connects and sends the request headers on a background thread."""
+        self._thread = threading.Thread(target=self._run, name="voiz-upload", daemon=True)
+        self._thread.start()
+
+    def feed(self, block: np.ndarray, rate: int) -> None:
+        """Recorder tap: queues one block (frames x channels, int16). Cheap."""
+        if not self._failed:
+            self._queue.put((block, rate))
+
+    def finish(
+        self,
+        cancel: CancelToken | None = None,
+        on_delta: Callable[[str], None] | None = None,
+    ) -> str:
+        """Ends the body and returns the transcript (vocabulary applied).
+
+        Raises:
+            jobs.CancelledError: If cancelled.
+            Exception: If the upload failed -- fall back to a regular request.
+        """
+        self._on_delta = on_delta
+        self._finished_at = time.perf_counter()
+        self._queue.put(_END)
+        remove = cancel.on_cancel(self.abort) if cancel is not None else (lambda: None)
+        try:
+            self._done.wait()
+        finally:
+            remove()
+        if cancel is not None and cancel.cancelled:
+            raise CancelledError()
+        if self._error is not None:
+            raise self._error
+        return apply_vocabulary(self._result or "")
+
+    def abort(self) -> None:
+        """Drops the request (take discarded or cancelled)."""
+        self._aborted = True
+        self._failed = True
+        self._queue.put(_END)
+        conn = self._conn
+        if conn is not None and conn.sock is not None:
+            try:
+                conn.sock.shutdown(2)  # Wakes a blocked send/recv at once
+            except OSError:
+                pass
+
+    # --- Request ---
+
+    def _run(self) -> None:
+        conn_class = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        conn = conn_class(self._host, self._port, timeout=CONNECT_TIMEOUT_S)
+        self._conn = conn
+        try:
+            conn.request(
+                "POST",
+                self._path,
+                body=self._body(),
+                headers={
+                    "Authorization": f"Bearer {self._api_key}",
+                    "Content-Type": f"multipart/form-data; boundary={self._boundary}",
+                    "Accept": "text/event-stream" if self._stream else "application/json",
+                },
+                encode_chunked=True,
+            )
+            conn.sock.settimeout(RESPONSE_TIMEOUT_S)
+            response = conn.getresponse()
+            if response.status != 200:
+                detail = response.read(300).decode("utf-8", "replace")
+                raise UploadError(f"HTTP {response.status}: {detail}")
+            if self._stream:
+                self._result = self._read_events(response)
+            else:
+                self._result = json.loads(response.read())["text"].strip()
+            log_metric(
+                "streaming_upload", ok=True, kb=self._sent // 1024,
+                tail_ms=round((time.perf_counter() - self._finished_at) * 1000),
+            )
+        except BaseException as e:
+            self._failed = True
+            self._error = CancelledError() if self._aborted else e
+            if not self._aborted:
+                log_metric("streaming_upload", ok=False, kb=self._sent // 1024, error=type(e).__name__)
+        finally:
+            conn.close()
+            self._done.set()
+
+    def _body(self) -> Iterator[bytes]:
+        """Multipart body; blocks on the queue until the take ends."""
+        head = "".join(
+            f"--{self._boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n"
+            for name, value in self._fields.items()
+        )
+        head += (
+            f"--{self._boundary}\r\n"
+            "Content-Disposition: form-data; name=\"file\"; filename=\"recording.wav\"\r\n"
+            "Content-Type: audio/wav\r\n\r\n"
+        )
+        yield head.encode("utf-8") + wav_stream_header()
+
+        ended = False
+        while not ended:
+            items = [self._queue.get()]
+            while True:  # Everything that arrived meanwhile goes in one chunk
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            pcm: list[bytes] = []
+            for item in items:
+                if item is _END:
+                    ended = True
+                    break
+                pcm.append(self._convert(*item))
+            if self._aborted:
+                raise CancelledError()
+            data = b"".join(pcm)
+            if data:
+                self._sent += len(data)
+                yield data
+
+        if self._resampler is not None:
+            yield self._resampler.flush().astype("<i2", copy=False).tobytes()
+        yield f"\r\n--{self._boundary}--\r\n".encode("utf-8")
+
+    def _convert(self, block: np.ndarray, rate: int) -> bytes:
+        if rate == SAMPLE_RATE and (block.ndim == 1 or block.shape[1] == 1):
+            return block.astype("<i2", copy=False).tobytes()
+        if self._resampler is None or self._resampler.in_rate != rate:
+            self._resampler = StreamResampler(rate, SAMPLE_RATE)
+        return self._resampler.process(block).astype("<i2", copy=False).tobytes()
+
+    def _read_events(self, response: http.client.HTTPResponse) -> str:
+        """Reads a streamed transcript (server-sent events)."""
+        parts: list[str] = []
+        final_text: str | None = None
+        for raw in response:
+            line = raw.decode("utf-8").strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            event = json.loads(data)
+            if event.get("type") == "transcript.text.delta":
+                delta = event["delta"] if parts else event["delta"].lstrip()
+                if delta:
+                    parts.append(delta)
+                    if self._on_delta is not None:
+                        self._on_delta(delta)
+            elif event.get("type") == "transcript.text.done":
+                final_text = event["text"]
+        return (final_text if final_text is not None else "".join(parts)).strip()
+
+
+def open_upload(api_key: str, streaming_deltas: bool = False) -> StreamingUpload | None:
+    """Starts a streaming upload on the best endpoint (None if not enabled/possible)."""
+    if not get_setting("streaming_upload"):
+        return None
+    endpoint = get_pool(api_key).choose()
+    if endpoint is None or endpoint.kind == "azure":
+        return None
+    model = endpoint.model(get_setting("transcription_model"))
+    upload = StreamingUpload(
+        str(endpoint.client().base_url),
+        endpoint.api_key,
+        model,
+        prompt=prompt_hint(),
+        stream=streaming_deltas and supports_streaming(model),
+    )
+    upload.start()
+    return upload
+
+
+# ---------------------------------------------------------------------------
+# Stand-in server (chunked multipart uploads) and CLI
+# ---------------------------------------------------------------------------
+
+class _FakeTranscriptionHandler(BaseHTTPRequestHandler):
+    """Accepts POST /v1/audio/transcriptions with a chunked multipart body.
+
+    Replies with a summary of what arrived instead of a transcript:
+    "<seconds> s of audio in <chunks> chunks".
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        if not self.path.endswith("/audio/transcriptions"):
+            self._reply(404, {"error": "Not found"})
+            return
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            try:
+                body, chunks = self._read_chunked()
+            except ValueError:  # Client aborted mid-body
+                self.close_connection = True
+                return
+        else:
+            body, chunks = self.rfile.read(int(self.headers.get("Content-Length", 0))), 1
+        boundary = self.headers.get_param("boundary", header="Content-Type")
+        fields, audio = _parse_multipart(body, boundary or "")
+        if not audio.startswith(b"RIFF") or "model" not in fields:
+            self._reply(400, {"error": "Expected a model field and a WAV file part"})
+            return
+        seconds = (len(audio) - 44) / (SAMPLE_RATE * 2)
+        text = f"{seconds:.1f} s of audio in {chunks} chunks"
+        if fields.get("stream") == "true":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for word in text.split(" "):
+                event = {"type": "transcript.text.delta", "delta": " " + word}
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            done = {"type": "transcript.text.done", "text": text}
+            self.wfile.write(f"data: {json.dumps(done)}\n\n".encode("utf-8"))
+            self.close_connection = True
+            return
+        self._reply(200, {"text": text})
+
+    def _read_chunked(self) -> tuple[bytes, int]:
+        data: list[bytes] = []
+        while True:
+            size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+            if size == 0:
+                self.rfile.readline()
+                return b"".join(data), len(data)
+            data.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    def _reply(self, code: int, payload: dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def _parse_multipart(body: bytes, boundary: str) -> tuple[dict[str, str], bytes]:
+    """Returns the text fields and the file part of a multipart body."""
+    fields: dict[str, str] = {}
+    audio = b""
+    for part in body.split(b"--" + boundary.encode("utf-8")):
+        head, _, content = part.partition(b"\r\n\r\n")
+        if b"Content-Disposition" not in head:
+            continue
+        content = content[:-2] if content.endswith(b"\r\n") else content
+        name = head.split(b'name="', 1)[1].split(b'"', 1)[0].decode("utf-8")
+        if b"filename=" in head:
+            audio = content
+        else:
+            fields[name] = content.decode("utf-8")
+    return fields, audio
+
+
+def serve_fake(port: int = 0) -> ThreadingHTTPServer:
+    """Starts the stand-in server on 127.0.0.1 in a thread and returns it."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _FakeTranscriptionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _send_file(path: str, url: str, realtime: bool) -> None:
+    """Streams a WAV file as if it were being recorded, then prints the result."""
+    import soundfile as sf
+
+    audio, rate = sf.read(path, dtype="int16", always_2d=True)
+    upload = StreamingUpload(url, os.environ.get("OPENAI_API_KEY", "not-needed"), "whisper-1")
+    upload.start()
+    block = rate * 32 // 1000
+    for i in range(0, len(audio), block):
+        upload.feed(audio[i:i + block], rate)
+        if realtime:
+            time.sleep(block / rate)
+    t0 = time.perf_counter()
+    text = upload.finish()
+    print(f"  {text}")
+    print(f"  After the last block: {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    if "--fake-server" in sys.argv:
+        i = sys.argv.index("--fake-server")
+        port = int(sys.argv[i + 1]) if i + 1 < len(sys.argv) else 8766
+        fake = serve_fake(port)
+        print(f"  Stand-in server on http://127.0.0.1:{fake.server_port}/v1 (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            fake.shutdown()
+    elif "--send" in sys.argv and sys.argv.index("--send") + 1 < len(sys.argv):
+        i = sys.argv.index("--send")
+        url = sys.argv[sys.argv.index("--url") + 1] if "--url" in sys.argv else "http://127.0.0.1:8766/v1"
+        _send_file(sys.argv[i + 1], url, "--realtime" in sys.argv)
+    else:
+        print("Usage: python streamupload.py --fake-server [PORT] | --send FILE.wav [--url URL] [--realtime]")
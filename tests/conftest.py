@@ -0,0 +1,75 @@
+"""Shared pytest setup: import path, isolated app data folder, settings."""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep settings, history and logs of the test run out of the real app folder
+_DATA_DIR = tempfile.mkdtemp(prefix="voiz-tests-")
+os.environ["XDG_DATA_HOME"] = _DATA_DIR
+os.environ["APPDATA"] = _DATA_DIR
+os.environ.setdefault("PYTHON_KEYRING_BACKEND", "keyring.backends.null.Keyring")
+
+
+@pytest.fixture
+def settings():
+    """Writes settings.json for one test: settings(transcription_model=...)."""
+    import config
+
+    path = config.settings_path()
+
+    def _write(**values: object) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(values, f)
+        config._settings_cache["mtime"] = None
+
+    yield _write
+    if os.path.exists(path):
+        os.remove(path)
+    config._settings_cache["mtime"] = None
+
+
+class _ErrorHandler(BaseHTTPRequestHandler):
+    """Answers every POST with the server's (status, error body)."""
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status, error = self.server.reply
+        payload = json.dumps({"error": error}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def api_error():
+    """Returns the exception the SDK raises for a given HTTP error reply."""
+    from openai import OpenAI
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ErrorHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OpenAI(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+
+    def _raise(status: int, code: str, type: str = "") -> Exception:
+        server.reply = (status, {"message": "stub", "code": code, "type": type or code})
+        try:
+            client.chat.completions.create(model="gpt-4o-mini", messages=[])
+        except Exception as e:
+            return e
+        raise AssertionError("the stub server did not fail the request")
+
+    yield _raise
+    server.shutdown()
+    server.server_close()
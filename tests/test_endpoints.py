@@ -0,0 +1,50 @@
+"""Failover and cooldown of the endpoint pool."""
+
+import time
+from collections.abc import Callable
+
+import openai
+import pytest
+
+from endpoints import AUTH_COOLDOWN_S, COOLDOWN_S, Endpoint, EndpointPool
+
+
+def _pool_failing_first(error: Exception) -> tuple[EndpointPool, list[str], Callable]:
+    pool = EndpointPool([Endpoint("first", "key-1"), Endpoint("second", "key-2")])
+    pool.endpoints[1].latency_s = 10.0  # Make "first" the preferred endpoint
+    calls: list[str] = []
+
+    def _call(client, endpoint):
+        calls.append(endpoint.name)
+        if endpoint.name == "first":
+            raise error
+        return "ok"
+
+    return pool, calls, _call
+
+
+def test_quota_error_fails_over_and_benches_the_key(api_error):
+    pool, calls, call = _pool_failing_first(api_error(429, "insufficient_quota"))
+
+    assert pool.call(call) == "ok"
+    assert calls == ["first", "second"]
+    first = pool.endpoints[0]
+    assert first.unhealthy_until - time.monotonic() > AUTH_COOLDOWN_S - 5
+
+
+def test_rate_limit_gets_the_short_cooldown(api_error):
+    pool, calls, call = _pool_failing_first(api_error(429, "rate_limit_exceeded", "requests"))
+
+    assert pool.call(call) == "ok"
+    assert pool.endpoints[0].unhealthy_until - time.monotonic() <= COOLDOWN_S
+
+
+def test_quota_error_on_the_last_endpoint_is_raised(api_error):
+    error = api_error(429, "insufficient_quota")
+    pool = EndpointPool([Endpoint("only", "key")])
+
+    def _call(client, endpoint):
+        raise error
+
+    with pytest.raises(openai.RateLimitError):
+        pool.call(_call)
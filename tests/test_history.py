@@ -0,0 +1,85 @@
+"""History store: insert/search, latest, pruning and the LIKE fallback."""
+
+import time
+
+import pytest
+
+import history
+from history import KIND_TOOL, KIND_TRANSCRIPT, History
+
+
+@pytest.fixture
+def store(tmp_path):
+    h = History(str(tmp_path / "history.sqlite3"))
+    yield h
+    h.close()
+
+
+def test_add_and_search(store):
+    first = store.add(KIND_TRANSCRIPT, "Budget meeting moved to Thursday")
+    store.add(KIND_TOOL, "Lunch order for the team", mode="slack", source="lunch orders")
+    store.add(KIND_TRANSCRIPT, "Unrelated note")
+
+    assert [e.id for e in store.search("budget thursday")] == [first]
+    assert [e.mode for e in store.search("lunch")] == ["slack"]
+    assert store.search('quote " and (parens)') == []  # Never parsed as FTS syntax
+    assert store.search("   ") == []
+
+
+def test_latest_skips_audio_only_entries(store):
+    text_id = store.add(KIND_TRANSCRIPT, "Last real transcript")
+    store.add(KIND_TRANSCRIPT, "", audio=b"RIFF")  # Cancelled take kept as audio
+
+    assert store.latest().id == text_id
+    assert store.recent(1)[0].preview() == "(audio only)"
+
+
+def test_prune_keeps_the_newest_entries(store, settings):
+    settings(history_max_entries=3)
+    old = store.add(KIND_TRANSCRIPT, "old take", audio=b"RIFF")
+    ids = [store.add(KIND_TRANSCRIPT, f"entry {i}", audio=b"RIFF") for i in range(3)]
+
+    store.prune()
+
+    assert [e.id for e in store.recent(10)] == ids[::-1]
+    assert store.get(old) is None
+    assert store.get_audio(ids[0]) == b"RIFF"
+    assert store.search("old") == []  # The full-text index follows deletions
+
+
+def test_prune_drops_expired_audio_but_keeps_text(store, settings):
+    settings(history_audio_days=3)
+    entry_id = store.add(KIND_TRANSCRIPT, "kept text", audio=b"RIFF")
+    store._conn.execute("UPDATE entries SET created = ? WHERE id = ?", (time.time() - 4 * 86400, entry_id))
+
+    store.prune()
+
+    assert store.get_audio(entry_id) is None
+    assert store.get(entry_id).text == "kept text"
+
+
+def test_add_prunes_once_the_interval_has_passed(store, settings, monkeypatch):
+    settings(history_max_entries=2)
+    for i in range(4):
+        store.add(KIND_TRANSCRIPT, f"entry {i}")
+    assert len(store.recent(10)) == 4  # Pruned at startup; not again within the interval
+
+    monkeypatch.setattr(history, "PRUNE_INTERVAL_S", 0)
+    store.add(KIND_TRANSCRIPT, "entry 4")
+
+    assert [e.text for e in store.recent(10)] == ["entry 4", "entry 3"]
+
+
+def test_search_falls_back_to_like_without_fts5(tmp_path, monkeypatch):
+    # A module that does not exist fails like a SQLite build without FTS5
+    monkeypatch.setattr(history, "_FTS_SCHEMA", "CREATE VIRTUAL TABLE entries_fts USING no_such_module(text);")
+    store = History(str(tmp_path / "plain.sqlite3"))
+    try:
+        assert not store._fts
+        entry_id = store.add(KIND_TOOL, "Quarterly numbers", source="Q3 report draft")
+
+        assert [e.id for e in store.search("numbers")] == [entry_id]
+        assert [e.id for e in store.search("report")] == [entry_id]
+        assert store.search("missing") == []
+    finally:
+        store.close()
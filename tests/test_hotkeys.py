@@ -0,0 +1,98 @@
+"""Native X11 hotkey backend, driven through XTest on a virtual display.
+
+Runs under an existing X server ($DISPLAY, e.g. `xvfb-run python -m pytest`)
+or starts Xvfb itself; skipped when neither is available. The descriptor
+check for a failed start only needs libX11.
+"""
+
+import ctypes.util
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+import hotkeys
+
+needs_x11 = pytest.mark.skipif(
+    not sys.platform.startswith("linux")
+    or not (os.environ.get("DISPLAY") or shutil.which("Xvfb"))
+    or not ctypes.util.find_library("Xtst"),
+    reason="needs Linux with libXtst and an X server or Xvfb",
+)
+
+
+@pytest.fixture
+def display(monkeypatch):
+    if os.environ.get("DISPLAY"):
+        yield os.environ["DISPLAY"]
+        return
+    name = f":{90 + os.getpid() % 100}"
+    xvfb = subprocess.Popen(
+        ["Xvfb", name, "-screen", "0", "640x480x24", "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    socket = f"/tmp/.X11-unix/X{name[1:]}"
+    deadline = time.monotonic() + 10
+    while not os.path.exists(socket) and xvfb.poll() is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    if not os.path.exists(socket):
+        xvfb.kill()
+        pytest.skip("Xvfb did not start")
+    monkeypatch.setenv("DISPLAY", name)
+    yield name
+    xvfb.terminate()
+    xvfb.wait()
+
+
+@needs_x11
+def test_x11_backend_fires_only_bound_combinations(display):
+    result = hotkeys.selftest(keystrokes=500, rounds=3)
+
+    assert result["correct"], result
+    assert result["combos_received"] == result["combos_expected"] == 3 * len(hotkeys.COMBOS)
+
+
+@needs_x11
+def test_x11_backend_stays_asleep_while_typing(display):
+    result = hotkeys.selftest(keystrokes=1000, rounds=1)
+
+    assert result["wakeups_while_typing"] == 0
+    assert result["latency_p50_ms"] is not None and result["latency_p50_ms"] < 50
+
+
+def _open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+@pytest.mark.skipif(
+    not os.path.isdir("/proc/self/fd") or not ctypes.util.find_library("X11"),
+    reason="needs Linux with libX11",
+)
+def test_failed_x11_start_closes_the_wake_pipe(monkeypatch):
+    monkeypatch.delenv("DISPLAY", raising=False)
+    before = _open_fds()
+
+    for _ in range(3):
+        with pytest.raises(hotkeys.HotkeyError):
+            hotkeys.X11Hotkeys({}).start()
+
+    assert _open_fds() == before
+
+
+@needs_x11
+def test_x11_restart_does_not_leak_descriptors(display):
+    backend = hotkeys.X11Hotkeys({})
+    backend.start()
+    backend.stop()
+    before = _open_fds()
+
+    for _ in range(5):
+        backend = hotkeys.X11Hotkeys({})
+        backend.start()
+        backend.stop()
+
+    assert _open_fds() == before
@@ -0,0 +1,105 @@
+"""Email thread compaction: what is removed, and what must be kept."""
+
+from mailcompact import compact
+
+
+def test_reply_history_is_removed():
+    result = compact(
+        "Sounds good, see you Monday.\n\n"
+        "On Fri, 3 May 2024 at 10:12, Bob Miller <bob@example.com> wrote:\n"
+        "> Shall we meet on Monday?\n"
+    )
+
+    assert result.text == "Sounds good, see you Monday."
+    assert result.removed["history"] > 0
+
+
+def test_outlook_header_block_is_removed():
+    result = compact(
+        "Approved.\n\n"
+        "From: Bob Miller\nSent: Friday, May 3, 2024 10:12\nTo: Anna\nSubject: Budget\n\n"
+        "Please approve the budget."
+    )
+
+    assert result.text == "Approved."
+
+
+def test_inline_quote_run_is_removed():
+    result = compact("Replies inline:\n\n> Can you send the file?\n> And the slides?\n\nBoth attached.")
+
+    assert "Can you send" not in result.text
+    assert "Both attached." in result.text
+    assert result.removed["quotes"] > 0
+
+
+def test_single_angle_bracket_lines_are_content():
+    text = "Status update:\n> 5 users affected\n>= 3 retries per job\nFix is rolling out."
+
+    result = compact(text)
+
+    assert result.text == text
+    assert not result.changed
+
+
+def test_signature_after_closing_is_removed():
+    result = compact(
+        "The report is attached.\n\nBest regards,\nAnna Schmidt\n+49 30 1234567\nanna@example.com"
+    )
+
+    assert result.text == "The report is attached.\n\nBest regards,\nAnna Schmidt"
+    assert result.removed["signature"] > 0
+
+
+def test_signature_delimiter_is_removed():
+    result = compact("The report is attached.\n\n-- \nAnna Schmidt\n+49 30 1234567\nwww.example.com")
+
+    assert result.text == "The report is attached."
+
+
+def test_double_dash_in_body_keeps_the_rest():
+    text = "Hi team,\n\nNotes below\n--\nAgenda: item one\nItem two\n\nBest regards,\nAnna"
+
+    result = compact(text)
+
+    assert result.text == text
+    assert result.removed["signature"] == 0
+
+
+def test_delimiter_before_prose_is_not_a_signature():
+    text = "Hi,\n\nsee below\n-- \nWe still need to decide on the venue for the offsite.\n\nThanks"
+
+    assert compact(text).text == text
+
+
+def test_mobile_footer_is_removed_only_at_the_end():
+    result = compact("Quick note.\nSent from my iPhone\nMore content after it.\n\nSent from my iPhone")
+
+    assert result.text == "Quick note.\nSent from my iPhone\nMore content after it."
+
+
+def test_trailing_disclaimer_is_removed():
+    disclaimer = (
+        "This e-mail is confidential and may be privileged. If you are not the intended "
+        "recipient, please notify the sender and delete it. Please consider the environment."
+    )
+
+    result = compact(f"See you tomorrow.\n\n{disclaimer}")
+
+    assert result.text == "See you tomorrow."
+    assert result.removed["boilerplate"] > 0
+
+
+def test_confidential_paragraph_in_the_middle_is_kept():
+    middle = (
+        "The numbers below are confidential until the announcement, and the intended "
+        "recipient list is short, so please do not forward this message to anyone else."
+    )
+    text = f"Hi Bob,\n\n{middle}\n\nRevenue grew by 12 percent."
+
+    assert compact(text).text == text
+
+
+def test_only_quoted_text_is_returned_unchanged():
+    text = "> first quoted line\n> second quoted line"
+
+    assert compact(text).text == text
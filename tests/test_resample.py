@@ -0,0 +1,89 @@
+"""Resampler quality (SNR, alias rejection) and output length."""
+
+import numpy as np
+import pytest
+
+from resample import StreamResampler, downmix
+
+OUT_RATE = 16_000
+EDGE = OUT_RATE // 10  # Skip the filter's start-up and tail
+
+
+def _tones(rate: int, seconds: float) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return 0.3 * np.sin(2 * np.pi * 440 * t) + 0.2 * np.sin(2 * np.pi * 3000 * t)
+
+
+def _stereo(signal: np.ndarray) -> np.ndarray:
+    return np.repeat((signal * 32767).astype(np.int16)[:, None], 2, axis=1)
+
+
+def _convert(resampler: StreamResampler, audio: np.ndarray, block: int) -> np.ndarray:
+    out = [resampler.process(audio[i:i + block]) for i in range(0, len(audio), block)]
+    out.append(resampler.flush())
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize("rate", [22_050, 44_100, 48_000, 96_000])
+def test_snr_against_ideal_signal(rate):
+    converted = _convert(StreamResampler(rate, OUT_RATE), _stereo(_tones(rate, 2)), rate // 100)
+
+    converted = converted.astype(np.float64) / 32767
+    ideal = _tones(OUT_RATE, len(converted) / OUT_RATE)[:len(converted)]
+    error = converted[EDGE:-EDGE] - ideal[EDGE:-EDGE]
+    snr_db = 10 * np.log10(np.sum(ideal[EDGE:-EDGE] ** 2) / np.sum(error ** 2))
+    assert snr_db > 70
+
+
+@pytest.mark.parametrize("rate", [44_100, 48_000])
+def test_tone_above_nyquist_does_not_fold_back(rate):
+    t = np.arange(rate) / rate
+    tone = (0.5 * np.sin(2 * np.pi * 10_000 * t) * 32767).astype(np.int16)
+
+    folded = _convert(StreamResampler(rate, OUT_RATE), tone, rate // 100)[EDGE:-EDGE]
+
+    level = np.sqrt(np.mean((folded.astype(np.float64) / 32767) ** 2)) / (0.5 / np.sqrt(2))
+    assert 20 * np.log10(max(level, 1e-12)) < -70
+
+
+@pytest.mark.parametrize("rate", [8_000, 11_025, 44_100, 48_000, 96_000])
+@pytest.mark.parametrize("frames", [1, 441, 4_799, 48_000])
+def test_output_length_matches_input_duration(rate, frames):
+    audio = _stereo(_tones(rate, frames / rate))
+
+    converted = _convert(StreamResampler(rate, OUT_RATE), audio, 160)
+
+    assert len(converted) == -(-frames * OUT_RATE // rate)  # ceil
+
+
+def test_block_size_does_not_change_output():
+    audio = _stereo(_tones(48_000, 0.5))
+
+    whole = _convert(StreamResampler(48_000, OUT_RATE), audio, len(audio))
+    blocks = _convert(StreamResampler(48_000, OUT_RATE), audio, 37)
+
+    np.testing.assert_array_equal(whole, blocks)
+
+
+def test_flush_starts_over():
+    resampler = StreamResampler(44_100, OUT_RATE)
+    audio = _stereo(_tones(44_100, 0.25))
+
+    first = _convert(resampler, audio, 441)
+    second = _convert(resampler, audio, 441)
+
+    np.testing.assert_array_equal(first, second)
+
+
+def test_16k_mono_passes_through():
+    audio = (_tones(OUT_RATE, 0.5) * 32767).astype(np.int16)[:, None]
+    resampler = StreamResampler(OUT_RATE, OUT_RATE)
+
+    assert resampler.passthrough
+    np.testing.assert_array_equal(_convert(resampler, audio, 512), audio[:, 0])
+
+
+def test_downmix_averages_channels():
+    block = np.array([[1000, 3000], [-2000, 0]], dtype=np.int16)
+
+    np.testing.assert_allclose(downmix(block), np.array([2000, -1000]) / 32768.0)
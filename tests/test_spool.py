@@ -0,0 +1,29 @@
+"""Which failures are spooled for a later retry."""
+
+import openai
+
+from spool import is_quota_error, is_transient_error
+
+
+def test_rate_limit_is_transient(api_error):
+    error = api_error(429, "rate_limit_exceeded", "requests")
+
+    assert isinstance(error, openai.RateLimitError)
+    assert is_transient_error(error)
+    assert not is_quota_error(error)
+
+
+def test_exhausted_quota_is_permanent(api_error):
+    error = api_error(429, "insufficient_quota")
+
+    assert isinstance(error, openai.RateLimitError)
+    assert is_quota_error(error)
+    assert not is_transient_error(error)
+
+
+def test_server_error_is_transient(api_error):
+    assert is_transient_error(api_error(503, "server_error"))
+
+
+def test_bad_request_is_permanent(api_error):
+    assert not is_transient_error(api_error(400, "invalid_request_error"))
@@ -0,0 +1,81 @@
+"""Chunked streaming upload against the built-in stand-in server."""
+
+import time
+
+import numpy as np
+import pytest
+
+from jobs import CancelledError, CancelToken
+from streamupload import SAMPLE_RATE, StreamingUpload, serve_fake
+
+
+@pytest.fixture
+def base_url():
+    server = serve_fake()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def _feed(upload: StreamingUpload, rate: int, channels: int, seconds: float, blocks: int) -> None:
+    frames = int(rate * seconds) // blocks
+    block = np.full((frames, channels), 1000, dtype=np.int16)
+    for _ in range(blocks):
+        upload.feed(block, rate)
+        time.sleep(0.02)  # Let the upload thread send each block as its own chunk
+
+
+def test_audio_is_sent_in_chunks_while_recording(base_url):
+    upload = StreamingUpload(base_url, "test", "whisper-1")
+    upload.start()
+    _feed(upload, SAMPLE_RATE, 1, 1.0, blocks=10)
+
+    text = upload.finish()
+
+    seconds, chunks = text.split(" s of audio in ")
+    assert seconds == "1.0"
+    assert int(chunks.split()[0]) >= 5  # Header, several audio chunks, closing boundary
+
+
+def test_device_rate_is_converted_to_16k_mono(base_url):
+    upload = StreamingUpload(base_url, "test", "whisper-1")
+    upload.start()
+    _feed(upload, 48_000, 2, 2.0, blocks=20)
+
+    assert upload.finish().startswith("2.0 s of audio")
+
+
+def test_streamed_transcript_passes_deltas(base_url):
+    upload = StreamingUpload(base_url, "test", "gpt-4o-mini-transcribe", stream=True)
+    upload.start()
+    _feed(upload, SAMPLE_RATE, 1, 0.5, blocks=5)
+    deltas: list[str] = []
+
+    text = upload.finish(on_delta=deltas.append)
+
+    assert text.startswith("0.5 s of audio in")
+    assert "".join(deltas) == text
+
+
+def test_cancel_aborts_the_request(base_url):
+    upload = StreamingUpload(base_url, "test", "whisper-1")
+    upload.start()
+    _feed(upload, SAMPLE_RATE, 1, 0.2, blocks=2)
+    token = CancelToken()
+    token.cancel()
+
+    with pytest.raises(CancelledError):
+        upload.finish(cancel=token)
+
+
+def test_unreachable_server_raises_for_fallback():
+    server = serve_fake()
+    url = f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+    server.server_close()
+    upload = StreamingUpload(url, "test", "whisper-1")
+    upload.start()
+    _feed(upload, SAMPLE_RATE, 1, 0.1, blocks=1)
+
+    with pytest.raises(OSError):
+        upload.finish()
@@ -0,0 +1,44 @@
+"""Text tools: language check and translation memory (model calls stubbed)."""
+
+import pytest
+
+import texttools
+from transmem import get_memory
+
+ENGLISH = (
+    "The quarterly report is ready for review. Please send me your comments "
+    "by Friday so that we can finalize the numbers next week."
+)
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    """Replaces the API call; records the messages and echoes the text."""
+    calls: list[list[dict]] = []
+
+    def _chat(api_key, messages, cancel=None, **kwargs):
+        calls.append(messages)
+        return messages[-1]["content"]
+
+    monkeypatch.setattr(texttools, "_chat", _chat)
+    return calls
+
+
+def test_same_language_proofread_bypasses_translation_memory(chat, settings):
+    settings(translation_memory=True, langid_same_language="proofread")
+    memory = get_memory()
+    memory.clear()
+
+    result = texttools.optimize_text(ENGLISH, "translate_en", "test")
+
+    assert result == ENGLISH
+    assert len(chat) == 1
+    assert chat[0][0]["content"] == texttools.PROOFREAD_PROMPT
+    assert memory.stats() == {}
+
+
+def test_same_language_skip_makes_no_call(chat, settings):
+    settings(langid_same_language="skip")
+
+    assert texttools.optimize_text(ENGLISH, "translate_en", "test") == ENGLISH
+    assert chat == []
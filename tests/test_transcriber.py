@@ -0,0 +1,87 @@
+"""Transcript streaming (server-sent events) against a local stub server."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openai import OpenAI
+
+import transcriber
+from endpoints import pool_for_client, using_pool
+
+DELTAS = [" Hello", " world,", " this is", " streamed."]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Answers /v1/audio/transcriptions like the OpenAI API."""
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append(body)
+        if b'name="stream"' in body:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for delta in DELTAS:
+                self._event({"type": "transcript.text.delta", "delta": delta})
+            if self.server.send_done:
+                self._event({"type": "transcript.text.done", "text": "".join(DELTAS)})
+            return
+        payload = json.dumps({"text": "".join(DELTAS)}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _event(self, event: dict) -> None:
+        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.requests = []
+    server.send_done = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OpenAI(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+    with using_pool(pool_for_client(client)):
+        yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_streaming_model_passes_deltas_in_order(stub, settings):
+    settings(transcription_model="gpt-4o-mini-transcribe")
+    deltas: list[str] = []
+
+    text = transcriber.transcribe(b"RIFF", "test", on_delta=deltas.append)
+
+    assert deltas == ["Hello"] + DELTAS[1:]  # Leading space of the first piece dropped
+    assert text == "Hello world, this is streamed."
+    assert b'name="stream"' in stub.requests[0]
+
+
+def test_stream_without_done_event_joins_deltas(stub, settings):
+    settings(transcription_model="gpt-4o-transcribe")
+    stub.send_done = False
+
+    text = transcriber.transcribe(b"RIFF", "test", on_delta=lambda delta: None)
+
+    assert text == "Hello world, this is streamed."
+
+
+def test_whisper_uses_blocking_call(stub, settings):
+    settings(transcription_model="whisper-1")
+    deltas: list[str] = []
+
+    text = transcriber.transcribe(b"RIFF", "test", on_delta=deltas.append)
+
+    assert deltas == []
+    assert text == "Hello world, this is streamed."
+    assert b'name="stream"' not in stub.requests[0]
@@ -1,11 +1,53 @@
 """OpenAI-based text optimization (Email, Slack, Translate).
 
 Takes text from the clipboard, processes it with GPT, and returns the result.
+Requests are routed through the endpoint pool (see endpoints.py). Short
+requests in the configured modes can run on a local model instead, which
+also answers while the API is unreachable (see localllm.py).
+
+Incremental mode: longer texts are processed paragraph by paragraph and each
+result is cached per (mode, paragraph hash). When the same text comes back
+with a few edited paragraphs, only those are sent (with their neighbours as
+context) and the rest is reassembled from the cache.
+
+Language check: before a translate mode goes out, the source language is
+identified locally (see langid.py). Text already in the target language is
+proofread (or, with "skip", returned as-is when every sentence agrees);
+otherwise the language is passed as a hint.
+
+Translation memory: the translate modes can reuse stored sentence
+translations (see transmem.py). Known sentences are not sent at all, near
+duplicates are sent with the old translation as an edit hint.
+
+Email compaction (optional): before email mode goes out, quoted replies,
+signatures and disclaimers are stripped locally (see mailcompact.py), optionally
+keeping the start of the message replied to as context.
 """
 
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
 from openai import OpenAI
 
+import localllm
+from config import get_setting
+from endpoints import Endpoint, get_pool
+from jobs import CancelledError, CancelToken
+from langid import LANGUAGE_NAMES, SKIP_CONFIDENCE, detect as detect_language, detect_segments
+from mailcompact import INPUT_MS_PER_TOKEN, compact as compact_email
+from memprofile import register_trim
+from metrics import log_metric
+from spool import is_transient_error
+from transmem import get_memory, split_sentences
+
 MODEL = "gpt-4o-mini"
+TRANSLATE_MODES = ("translate_en", "translate_de")
+TARGET_LANGUAGES = {"translate_en": "en", "translate_de": "de"}
+PARAGRAPH_CACHE_SIZE = 2000  # (mode, paragraph) results kept for incremental mode
 
 SYSTEM_PROMPTS = {
     "email": (
@@ -42,35 +84,365 @@ SYSTEM_PROMPTS = {
     ),
 }
 
+# Downgraded request when the text is already in the target language
+PROOFREAD_PROMPT = (
+    "You are a careful proofreader. "
+    "Fix grammar, spelling and punctuation in the user's text and improve clarity "
+    "where needed, with as few changes as possible. "
+    "Keep the original language, tone and formatting -- do NOT translate. "
+    "Return ONLY the corrected text, nothing else."
+)
+
+INCREMENTAL_INSTRUCTIONS = (
+    "\n\nThe input is a JSON object whose \"paragraphs\" list holds paragraphs "
+    "of one document. Apply the instructions above to each paragraph's \"text\" "
+    "so the document reads consistently. \"index\" is the paragraph's position "
+    "in the document (0-based) and \"total\" the number of paragraphs in it. "
+    "\"before\" and \"after\", if present, are the neighbouring paragraphs -- "
+    "context only, do not rewrite or repeat them. If the instructions ask for "
+    "a greeting or closing, put the greeting only into the paragraph with index "
+    "0 and the closing only into the one with index total-1; never add them to "
+    "any other paragraph. Return a JSON object {\"paragraphs\": [...]} with "
+    "exactly one rewritten string per input paragraph, in the same order. "
+    "Do not merge, split, add or drop paragraphs."
+)
+
+TRANSLATION_MEMORY_INSTRUCTIONS = (
+    "\n\nThe input is a JSON object whose \"sentences\" list holds sentences "
+    "of one text, in order. Translate each \"text\". If \"similar_source\" and "
+    "\"similar_translation\" are given, they are an earlier sentence and its "
+    "approved translation: edit that translation as little as needed so it "
+    "matches \"text\", keeping its wording and terminology. Return a JSON object "
+    "{\"translations\": [...]} with exactly one translated string per input "
+    "sentence, in the same order."
+)
+
+_PARAGRAPH_SPLIT = re.compile(r"\n[ \t]*\n\s*")
+
+_paragraph_cache: OrderedDict[tuple[str, str], str] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _clear_paragraph_cache() -> None:
+    with _cache_lock:
+        _paragraph_cache.clear()
+
+
+register_trim(_clear_paragraph_cache)
 
-def optimize_text(text: str, mode: str, api_key: str) -> str:
+
+def _chat(
+    api_key: str,
+    messages: list[dict],
+    cancel: CancelToken | None = None,
+    **kwargs,
+) -> str:
+    """Sends a chat completion through the endpoint pool."""
+
+    def _call(client: OpenAI, endpoint: Endpoint) -> str:
+        raw = client.chat.completions.with_raw_response.create(
+            model=endpoint.model(MODEL),
+            messages=messages,
+            temperature=0.3,
+            **kwargs,
+        )
+        endpoint.observe(raw.headers)
+        return raw.parse().choices[0].message.content.strip()
+
+    return get_pool(api_key).call(_call, cancel=cancel)
+
+
+def optimize_text(
+    text: str,
+    mode: str,
+    api_key: str,
+    cancel: CancelToken | None = None,
+) -> str:
     """Optimizes or translates text using OpenAI GPT.
 
     Args:
         text: The input text to process.
         mode: One of "email", "slack", "translate_en", "translate_de".
         api_key: OpenAI API key.
+        cancel: Optional token; cancelling it aborts the HTTP request.
 
     Returns:
         The processed text.
 
     Raises:
         ValueError: If mode is unknown.
+        jobs.CancelledError: If cancelled.
         Exception: On API or network errors.
     """
     system_prompt = SYSTEM_PROMPTS.get(mode)
     if not system_prompt:
         raise ValueError(f"Unknown mode: {mode}. Use: {list(SYSTEM_PROMPTS.keys())}")
 
-    client = OpenAI(api_key=api_key)
+    if mode == "email":
+        text, system_prompt = _compact_email(text, system_prompt)
+
+    if mode in TRANSLATE_MODES:
+        system_prompt = _language_check(text, mode, system_prompt)
+        if system_prompt is None:
+            return text  # Already in the target language
+
+    if localllm.should_route_local(text, mode):
+        try:
+            return localllm.complete(system_prompt, text, cancel)
+        except CancelledError:
+            raise
+        except Exception as e:
+            log_metric("local_llm_error", mode=mode, error=type(e).__name__)
+
+    try:
+        return _optimize_api(text, mode, system_prompt, api_key, cancel)
+    except Exception as e:
+        if not is_transient_error(e) or not localllm.can_fallback(mode):
+            raise
+        return localllm.complete(system_prompt, text, cancel, reason="fallback")
+
+
+def _language_check(text: str, mode: str, system_prompt: str) -> str | None:
+    """Adapts a translate request to the locally detected source language.
+
+    Returns the system prompt to use, or None if the request can be skipped
+    because the text is already in the target language. Skipping needs a
+    confident result that every sentence agrees with; a text with any
+    sentence in another language is translated as a whole, and an uncertain
+    one gets the proofreading pass.
+    """
+    action = get_setting("langid_same_language")
+    if action == "off":
+        return system_prompt
+    language, confidence = detect_language(text)
+    if language is None:
+        return system_prompt
+
+    if language == TARGET_LANGUAGES[mode]:
+        segments = detect_segments(text)
+        if any(lang not in (None, language) for lang, _ in segments):
+            log_metric("langid", mode=mode, language=language, action="mixed")
+            return system_prompt + " The text mixes languages; translate every part of it."
+        certain = confidence >= SKIP_CONFIDENCE and all(lang == language for lang, _ in segments)
+        if action == "skip" and certain:
+            log_metric("langid", mode=mode, language=language, action="skip")
+            return None
+        log_metric("langid", mode=mode, language=language, action="proofread")
+        return PROOFREAD_PROMPT
+
+    log_metric("langid", mode=mode, language=language, action="hint")
+    return system_prompt + f" The text appears to be in {LANGUAGE_NAMES[language]}."
 
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": text},
-        ],
-        temperature=0.3,
+
+def _compact_email(text: str, system_prompt: str) -> tuple[str, str]:
+    """Strips quoted history, signatures and boilerplate before email mode.
+
+    Returns the text and system prompt to use. With "email_compaction" set
+    to "context", the start of the message replied to is added to the
+    system prompt as background.
+    """
+    setting = get_setting("email_compaction")
+    if setting == "off":
+        return text, system_prompt
+    t0 = time.perf_counter()
+    context_chars = int(get_setting("email_context_chars")) if setting == "context" else 0
+    result = compact_email(text, context_chars)
+    if not result.changed:
+        return text, system_prompt
+    log_metric(
+        "email_compaction",
+        tokens_before=result.tokens_before,
+        tokens_after=result.tokens_after,
+        tokens_saved=result.tokens_saved,
+        compact_ms=round((time.perf_counter() - t0) * 1000, 2),
+        saved_ms_est=round(result.tokens_saved * INPUT_MS_PER_TOKEN, 1),
+        **{f"{kind}_chars": chars for kind, chars in result.removed.items()},
     )
+    if result.context:
+        system_prompt += (
+            " The text is a reply. For context only (do not rewrite or quote it), "
+            f"the message being replied to begins: \"{result.context}\""
+        )
+    return result.text, system_prompt
+
+
+def _optimize_api(
+    text: str,
+    mode: str,
+    system_prompt: str,
+    api_key: str,
+    cancel: CancelToken | None = None,
+) -> str:
+    # A proofreading pass (text already in the target language) is no
+    # translation: it must neither use nor fill the translation memory
+    translating = mode in TRANSLATE_MODES and system_prompt is not PROOFREAD_PROMPT
+    if translating and get_setting("translation_memory"):
+        result = _translate_with_memory(text, mode, system_prompt, api_key, cancel)
+        if result is not None:
+            return result
+
+    if get_setting("incremental_optimize"):
+        paragraphs = split_paragraphs(text)
+        if len(paragraphs) >= int(get_setting("incremental_min_paragraphs")):
+            result = _optimize_incremental(paragraphs, mode, system_prompt, api_key, cancel)
+            if result is not None:
+                return result
+
+    return _chat(api_key, [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": text},
+    ], cancel=cancel)
+
+
+# ---------------------------------------------------------------------------
+# Incremental (paragraph-level) optimization
+# ---------------------------------------------------------------------------
+
+def split_paragraphs(text: str) -> list[str]:
+    """Splits text at blank lines into non-empty paragraphs."""
+    return [p.strip() for p in _PARAGRAPH_SPLIT.split(text.strip()) if p.strip()]
+
+
+def _paragraph_key(mode: str, paragraph: str, index: int, total: int) -> tuple[str, str]:
+    """Cache key; in email mode the role matters (greeting first, closing last)."""
+    digest = hashlib.sha1(paragraph.encode("utf-8")).hexdigest()
+    if mode != "email":
+        return mode, digest
+    if total == 1:
+        role = "only"
+    else:
+        role = "first" if index == 0 else "last" if index == total - 1 else "middle"
+    return f"{mode}:{role}", digest
+
+
+def _optimize_incremental(
+    paragraphs: list[str],
+    mode: str,
+    system_prompt: str,
+    api_key: str,
+    cancel: CancelToken | None = None,
+) -> str | None:
+    """Processes only paragraphs without a cached result.
 
-    return response.choices[0].message.content.strip()
+    Returns the reassembled text, or None if the model did not return one
+    result per paragraph (the caller then falls back to a normal request).
+    """
+    total = len(paragraphs)
+    keys = [_paragraph_key(mode, p, i, total) for i, p in enumerate(paragraphs)]
+    with _cache_lock:
+        outputs = [_paragraph_cache.get(k) for k in keys]
+        for key, output in zip(keys, outputs):
+            if output is not None:
+                _paragraph_cache.move_to_end(key)
+
+    missing = [i for i, output in enumerate(outputs) if output is None]
+    if missing:
+        if len(missing) == len(paragraphs):
+            # First pass: the whole document is the context
+            items = [{"text": p, "index": i, "total": total} for i, p in enumerate(paragraphs)]
+        else:
+            items = [
+                {
+                    "text": paragraphs[i],
+                    "index": i,
+                    "total": total,
+                    # Already-rewritten neighbours keep tone and terms consistent
+                    "before": (outputs[i - 1] or paragraphs[i - 1]) if i > 0 else "",
+                    "after": paragraphs[i + 1] if i + 1 < len(paragraphs) else "",
+                }
+                for i in missing
+            ]
+
+        reply = _chat(
+            api_key,
+            [
+                {"role": "system", "content": system_prompt + INCREMENTAL_INSTRUCTIONS},
+                {"role": "user", "content": json.dumps({"paragraphs": items}, ensure_ascii=False)},
+            ],
+            cancel=cancel,
+            response_format={"type": "json_object"},
+        )
+        try:
+            rewritten = json.loads(reply)["paragraphs"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        if not isinstance(rewritten, list) or len(rewritten) != len(missing):
+            return None
+
+        with _cache_lock:
+            for i, output in zip(missing, rewritten):
+                outputs[i] = str(output).strip()
+                _paragraph_cache[keys[i]] = outputs[i]
+            while len(_paragraph_cache) > PARAGRAPH_CACHE_SIZE:
+                _paragraph_cache.popitem(last=False)
+
+    log_metric("incremental_optimize", mode=mode, paragraphs=len(paragraphs), sent=len(missing))
+    return "\n\n".join(outputs)
+
+
+# ---------------------------------------------------------------------------
+# Translation memory (translate modes)
+# ---------------------------------------------------------------------------
+
+def _translate_with_memory(
+    text: str,
+    mode: str,
+    system_prompt: str,
+    api_key: str,
+    cancel: CancelToken | None = None,
+) -> str | None:
+    """Translates only the sentences the memory does not know verbatim.
+
+    Returns the reassembled text, or None if the memory is unavailable or
+    the model did not return one translation per sentence (the caller then
+    falls back to a normal request).
+    """
+    memory = get_memory()
+    if memory is None:
+        return None
+
+    parts = split_sentences(text)
+    items: list[dict] = []
+    pending: list[int] = []  # Indices into parts, one per item
+    exact = fuzzy = 0
+    for i in range(0, len(parts), 2):  # Even indices are sentences
+        sentence = parts[i]
+        if not sentence.strip():
+            continue
+        kind, found = memory.lookup(mode, sentence)
+        if kind == "exact":
+            parts[i] = found
+            exact += 1
+            continue
+        item = {"text": sentence}
+        if kind == "fuzzy":
+            item["similar_source"], item["similar_translation"] = found
+            fuzzy += 1
+        items.append(item)
+        pending.append(i)
+
+    if items:
+        reply = _chat(
+            api_key,
+            [
+                {"role": "system", "content": system_prompt + TRANSLATION_MEMORY_INSTRUCTIONS},
+                {"role": "user", "content": json.dumps({"sentences": items}, ensure_ascii=False)},
+            ],
+            cancel=cancel,
+            response_format={"type": "json_object"},
+        )
+        try:
+            translations = json.loads(reply)["translations"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        if not isinstance(translations, list) or len(translations) != len(items):
+            return None
+        for i, item, translation in zip(pending, items, translations):
+            parts[i] = str(translation).strip()
+            memory.store(mode, item["text"], parts[i])
+
+    log_metric(
+        "translation_memory", mode=mode, exact=exact, fuzzy=fuzzy,
+        new=len(items) - fuzzy,
+    )
+    return "".join(parts).strip()
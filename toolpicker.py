@@ -1,36 +1,58 @@
 """Tool picker popup -- runs as a subprocess to avoid tkinter/pystray conflicts.
 
 Shows a small always-on-top window with tool options.
-Prints the selected mode to stdout and exits.
+Prints the selected mode(s) to stdout and exits.
+
+Click runs a single tool. Ctrl+click (or Shift+click) marks several tools,
+Enter runs all marked tools at once -- the modes are printed comma-separated.
 
 Usage (as subprocess):
     result = subprocess.run([sys.executable, "toolpicker.py"], capture_output=True, text=True)
-    mode = result.stdout.strip()  # "email", "slack", "translate", or ""
+    modes = result.stdout.strip().split(",")  # ["email", "slack"], or [""] if cancelled
+
+Result chooser (--results): reads a JSON list of {"label", "text"} from stdin,
+shows the previews and prints the index of the chosen result.
 """
 
+import json
 import tkinter as tk
 import sys
 
+# --- Styling ---
+BG = "#1e1e2e"
+FG = "#cdd6f4"
+MUTED = "#6c7086"
+HOVER_BG = "#313244"
+SELECTED_BG = "#45475a"
+FONT_TITLE = ("Segoe UI", 11, "bold")
+FONT_BTN = ("Segoe UI", 10)
+FONT_SHORTCUT = ("Segoe UI", 8)
+
+
+def _set_bg(widget: tk.Widget, color: str) -> None:
+    """Recursively sets the background of a widget and its children
+    (accent bars keep their color)."""
+    if getattr(widget, "is_accent", False):
+        return
+    try:
+        widget.configure(bg=color)
+        for child in widget.winfo_children():
+            _set_bg(child, color)
+    except tk.TclError:
+        pass
 
-def main() -> None:
+
+def _create_window(title: str, hint: str) -> tuple[tk.Tk, tk.Frame]:
+    """Creates the borderless popup with title bar; returns (root, body)."""
     root = tk.Tk()
-    root.title("Voiz Tools")
+    root.title(title)
     root.attributes("-topmost", True)
     root.resizable(False, False)
 
     # Remove window decorations for a cleaner look, keep close button feel
     root.overrideredirect(True)
 
-    selected = {"mode": ""}
-
-    def select(mode: str) -> None:
-        selected["mode"] = mode
-        root.destroy()
-
-    def on_escape(_event: object = None) -> None:
-        root.destroy()
-
-    root.bind("<Escape>", on_escape)
+    root.bind("<Escape>", lambda _: root.destroy())
     # Also close if window loses focus
     root.bind("<FocusOut>", lambda _: root.after(100, _check_focus))
 
@@ -41,96 +63,82 @@ def main() -> None:
         except tk.TclError:
             pass
 
-    # --- Styling ---
-    bg = "#1e1e2e"
-    fg = "#cdd6f4"
-    accent_email = "#89b4fa"
-    accent_slack = "#a6e3a1"
-    accent_translate = "#f9e2af"
-    hover_bg = "#313244"
-    font_title = ("Segoe UI", 11, "bold")
-    font_btn = ("Segoe UI", 10)
-    font_shortcut = ("Segoe UI", 8)
-
-    root.configure(bg=bg)
+    root.configure(bg=BG)
 
     # Title bar
-    title_frame = tk.Frame(root, bg=bg, padx=16, pady=10)
+    title_frame = tk.Frame(root, bg=BG, padx=16, pady=10)
     title_frame.pack(fill="x")
 
     tk.Label(
-        title_frame, text="Voiz Tools", font=font_title,
-        bg=bg, fg=fg,
+        title_frame, text=title, font=FONT_TITLE,
+        bg=BG, fg=FG,
     ).pack(side="left")
 
     tk.Label(
-        title_frame, text="ESC to close", font=font_shortcut,
-        bg=bg, fg="#6c7086",
+        title_frame, text=hint, font=FONT_SHORTCUT,
+        bg=BG, fg=MUTED,
     ).pack(side="right")
 
     # Separator
-    tk.Frame(root, bg="#313244", height=1).pack(fill="x", padx=12)
+    tk.Frame(root, bg=HOVER_BG, height=1).pack(fill="x", padx=12)
 
     # Button container
-    btn_frame = tk.Frame(root, bg=bg, padx=12, pady=8)
-    btn_frame.pack(fill="x")
+    body = tk.Frame(root, bg=BG, padx=12, pady=8)
+    body.pack(fill="x")
+    return root, body
+
+
+def _add_row(
+    parent: tk.Frame,
+    label: str,
+    description: str,
+    accent: str,
+    on_click,
+    background: dict[tk.Frame, str],
+) -> tk.Frame:
+    """Adds a clickable row (accent bar, label, description).
+
+    on_click receives the Tk event. background maps each row to its resting
+    color so hover can restore it (it changes when a row is marked).
+    """
+    frame = tk.Frame(parent, bg=BG, cursor="hand2")
+    frame.pack(fill="x", pady=3)
+    background[frame] = BG
+
+    # Accent bar on the left
+    accent_bar = tk.Frame(frame, bg=accent, width=3)
+    accent_bar.is_accent = True
+    accent_bar.pack(side="left", fill="y", padx=(0, 10))
+
+    text_frame = tk.Frame(frame, bg=BG)
+    text_frame.pack(side="left", fill="x", expand=True, pady=6)
 
-    accent_translate_de = "#cba6f7"
+    tk.Label(
+        text_frame, text=label, font=FONT_BTN,
+        bg=BG, fg=FG, anchor="w", justify="left",
+    ).pack(fill="x")
 
-    buttons = [
-        ("email", "\u2709  Optimize for Email", accent_email,
-         "Formal, polite, proper paragraphs"),
-        ("slack", "\u26a1  Optimize for Slack", accent_slack,
-         "Direct, casual, chat-friendly"),
-        ("translate_en", "\U0001f310  Translate to English", accent_translate,
-         "Translate clipboard text to English"),
-        ("translate_de", "\U0001f1e9\U0001f1ea  Translate to German", accent_translate_de,
-         "Translate clipboard text to German"),
-    ]
+    tk.Label(
+        text_frame, text=description, font=FONT_SHORTCUT,
+        bg=BG, fg=MUTED, anchor="w", justify="left",
+    ).pack(fill="x")
 
-    for mode, label, accent, description in buttons:
-        frame = tk.Frame(btn_frame, bg=bg, cursor="hand2")
-        frame.pack(fill="x", pady=3)
-
-        # Accent bar on the left
-        tk.Frame(frame, bg=accent, width=3).pack(side="left", fill="y", padx=(0, 10))
-
-        text_frame = tk.Frame(frame, bg=bg)
-        text_frame.pack(side="left", fill="x", expand=True, pady=6)
-
-        tk.Label(
-            text_frame, text=label, font=font_btn,
-            bg=bg, fg=fg, anchor="w",
-        ).pack(fill="x")
-
-        tk.Label(
-            text_frame, text=description, font=font_shortcut,
-            bg=bg, fg="#6c7086", anchor="w",
-        ).pack(fill="x")
-
-        # Make entire row clickable
-        def _bind_click(widget: tk.Widget, m: str = mode) -> None:
-            widget.bind("<Button-1>", lambda _: select(m))
-            for child in widget.winfo_children():
-                _bind_click(child, m)
-
-        def _bind_hover(widget: tk.Widget, f: tk.Frame = frame) -> None:
-            widget.bind("<Enter>", lambda _: _set_bg(f, hover_bg))
-            widget.bind("<Leave>", lambda _: _set_bg(f, bg))
-
-        def _set_bg(widget: tk.Widget, color: str) -> None:
-            try:
-                widget.configure(bg=color)
-                for child in widget.winfo_children():
-                    _set_bg(child, color)
-            except tk.TclError:
-                pass
-
-        _bind_click(frame)
-        _bind_hover(frame)
+    # Make entire row clickable
+    def _bind(widget: tk.Widget) -> None:
+        widget.bind("<Button-1>", on_click)
+        widget.bind("<Enter>", lambda _: _set_bg(frame, HOVER_BG))
+        widget.bind("<Leave>", lambda _: _set_bg(frame, background[frame]))
+        for child in widget.winfo_children():
+            _bind(child)
+
+    _bind(frame)
+    return frame
 
+
+def _show(root: tk.Tk) -> None:
+    """Centers the window, rounds its corners and runs the event loop."""
     # Bottom padding
-    tk.Frame(root, bg=bg, height=6).pack()
+    tk.Frame(root, bg=BG, height=6).pack()
 
     # --- Center on screen ---
     root.update_idletasks()
@@ -155,9 +163,119 @@ def main() -> None:
     root.focus_force()
     root.mainloop()
 
-    # Output the selected mode
-    if selected["mode"]:
-        print(selected["mode"], end="")
+
+# Tk event state bits for Shift and Control
+_SHIFT_MASK = 0x0001
+_CONTROL_MASK = 0x0004
+
+
+def pick_tools() -> None:
+    """Shows the tool palette and prints the chosen mode(s)."""
+    root, btn_frame = _create_window("Voiz Tools", "Ctrl+click: several | ESC to close")
+
+    accent_email = "#89b4fa"
+    accent_slack = "#a6e3a1"
+    accent_translate = "#f9e2af"
+    accent_translate_de = "#cba6f7"
+
+    buttons = [
+        ("email", "\u2709  Optimize for Email", accent_email,
+         "Formal, polite, proper paragraphs"),
+        ("slack", "\u26a1  Optimize for Slack", accent_slack,
+         "Direct, casual, chat-friendly"),
+        ("translate_en", "\U0001f310  Translate to English", accent_translate,
+         "Translate clipboard text to English"),
+        ("translate_de", "\U0001f1e9\U0001f1ea  Translate to German", accent_translate_de,
+         "Translate clipboard text to German"),
+    ]
+
+    marked: list[str] = []  # Keeps click order
+    result = {"modes": []}
+    background: dict[tk.Frame, str] = {}
+    rows: dict[str, tk.Frame] = {}
+
+    footer = tk.Label(
+        root, text="", font=FONT_SHORTCUT,
+        bg=BG, fg=MUTED, anchor="w", padx=16,
+    )
+
+    def finish(modes: list[str]) -> None:
+        result["modes"] = modes
+        root.destroy()
+
+    def on_click(mode: str, event: tk.Event) -> None:
+        if not event.state & (_SHIFT_MASK | _CONTROL_MASK):
+            # Plain click runs this tool (plus any marked ones)
+            if mode not in marked:
+                marked.append(mode)
+            finish(list(marked))
+            return
+        # Modifier click: mark / unmark for a combined run
+        if mode in marked:
+            marked.remove(mode)
+        else:
+            marked.append(mode)
+        background[rows[mode]] = SELECTED_BG if mode in marked else BG
+        _set_bg(rows[mode], background[rows[mode]])
+        footer.configure(text=f"Enter: run {len(marked)} tools at once" if marked else "")
+
+    def on_enter(_event: object = None) -> None:
+        if marked:
+            finish(list(marked))
+
+    root.bind("<Return>", on_enter)
+
+    for mode, label, accent, description in buttons:
+        rows[mode] = _add_row(
+            btn_frame, label, description, accent,
+            lambda event, m=mode: on_click(m, event),
+            background,
+        )
+
+    footer.pack(fill="x")
+    _show(root)
+
+    # Output the selected mode(s)
+    if result["modes"]:
+        print(",".join(result["modes"]), end="")
+
+
+def pick_result() -> None:
+    """Shows result previews (JSON list on stdin) and prints the chosen index."""
+    try:
+        options = json.loads(sys.stdin.read() or "[]")
+    except ValueError:
+        options = []
+    if not options:
+        return
+
+    root, body = _create_window("Voiz Results", "Click to paste | ESC to close")
+    chosen = {"index": None}
+
+    def choose(index: int) -> None:
+        chosen["index"] = index
+        root.destroy()
+
+    background: dict[tk.Frame, str] = {}
+    for index, option in enumerate(options):
+        text = " ".join(str(option.get("text", "")).split())
+        preview = text[:90] + ("..." if len(text) > 90 else "")
+        _add_row(
+            body, option.get("label", f"Result {index + 1}"), preview, "#89b4fa",
+            lambda _event, i=index: choose(i),
+            background,
+        )
+    _show(root)
+
+    if chosen["index"] is not None:
+        print(chosen["index"], end="")
+
+
+def main() -> None:
+    if "--results" in sys.argv:
+        pick_result()
+    else:
+        pick_tools()
 
 
 if __name__ == "__main__":
@@ -1,33 +1,113 @@
-"""OpenAI Whisper API integration with automatic language detection."""
+"""OpenAI Whisper API integration with automatic language detection.
+
+whisper-1 only returns the finished transcript. The gpt-4o transcription
+models can stream text deltas (stream=True), which lets the caller show or
+type the text while it is still being decoded.
+
+Requests are routed through the endpoint pool (see endpoints.py). The
+user's custom vocabulary is sent as a prompt hint and applied to the final
+transcript (see vocabulary.py).
+"""
 
 import io
+from collections.abc import Callable
+
 from openai import OpenAI
 
+from config import get_setting
+from endpoints import Endpoint, get_pool
+from jobs import CancelToken
+from vocabulary import apply_vocabulary, prompt_hint
+
+# Models that reject stream=True -- these always use the blocking call
+_NON_STREAMING_PREFIXES = ("whisper",)
+
+
+def supports_streaming(model: str) -> bool:
+    """Returns True if the transcription model can stream text deltas."""
+    return not model.startswith(_NON_STREAMING_PREFIXES)
 
-def transcribe(audio_bytes: bytes, api_key: str) -> str:
+
+def transcribe(
+    audio_bytes: bytes,
+    api_key: str,
+    on_delta: Callable[[str], None] | None = None,
+    cancel: CancelToken | None = None,
+) -> str:
     """Transcribes audio bytes using OpenAI Whisper.
 
     Args:
         audio_bytes: WAV file as bytes.
         api_key: OpenAI API key.
+        on_delta: Optional callback receiving each new piece of text as it
+            is decoded. Only called for models that can stream; otherwise
+            the blocking call is used and only the return value matters.
+        cancel: Optional token; cancelling it aborts the HTTP request.
 
     Returns:
-        Transcribed text.
+        Transcribed text, with the custom vocabulary applied. Streamed
+        deltas are passed on as decoded.
 
     Raises:
+        jobs.CancelledError: If cancelled.
         Exception: On API or network errors.
     """
-    client = OpenAI(api_key=api_key)
+    model = get_setting("transcription_model")
+    stream = on_delta is not None and supports_streaming(model)
+    emitted = [False]
+    hint = prompt_hint()
+    extra = {"prompt": hint} if hint else {}
+
+    def _on_delta(delta: str) -> None:
+        if cancel is not None and cancel.cancelled:
+            return  # Aborting -- nothing more reaches the user
+        emitted[0] = True
+        on_delta(delta)
+
+    def _call(client: OpenAI, endpoint: Endpoint) -> str:
+        # BytesIO with filename -- the OpenAI SDK requires a file-like object
+        audio_file = io.BytesIO(audio_bytes)
+        audio_file.name = "recording.wav"
+
+        if stream:
+            raw = client.audio.transcriptions.with_raw_response.create(
+                model=endpoint.model(model),
+                file=audio_file,
+                stream=True,
+                **extra,
+            )
+            endpoint.observe(raw.headers)
+            return _consume_stream(raw.parse(), _on_delta)
+
+        raw = client.audio.transcriptions.with_raw_response.create(
+            model=endpoint.model(model),
+            file=audio_file,
+            # No language parameter -> automatic language detection
+            # Whisper handles code-switching (e.g. German + English) natively
+            **extra,
+        )
+        endpoint.observe(raw.headers)
+        return raw.parse().text.strip()
+
+    # Once text has reached the user, a retry elsewhere would duplicate it
+    text = get_pool(api_key).call(_call, can_retry=lambda: not emitted[0], cancel=cancel)
+    return apply_vocabulary(text)
 
-    # BytesIO with filename -- the OpenAI SDK requires a file-like object
-    audio_file = io.BytesIO(audio_bytes)
-    audio_file.name = "recording.wav"
 
-    response = client.audio.transcriptions.create(
-        model="whisper-1",
-        file=audio_file,
-        # No language parameter -> automatic language detection
-        # Whisper handles code-switching (e.g. German + English) natively
-    )
+def _consume_stream(stream: object, on_delta: Callable[[str], None]) -> str:
+    """Passes transcript deltas (server-sent events) to on_delta."""
+    parts: list[str] = []
+    final_text: str | None = None
+    for event in stream:
+        if event.type == "transcript.text.delta":
+            # Leading whitespace of the first piece is dropped, like .strip()
+            delta = event.delta if parts else event.delta.lstrip()
+            if delta:
+                parts.append(delta)
+                on_delta(delta)
+        elif event.type == "transcript.text.done":
+            final_text = event.text
 
-    return response.text.strip()
+    if final_text is None:
+        final_text = "".join(parts)
+    return final_text.strip()
@@ -0,0 +1,275 @@
+"""Sentence-level translation memory for the translate modes.
+
+Every translated sentence is stored (SQLite, in the app data folder) with a
+MinHash signature of its character 4-grams. On the next translation each
+sentence is looked up:
+
+- exact match (same text, ignoring whitespace) -> the stored translation is
+  reused, no API call for that sentence
+- near duplicate (LSH candidates, verified with difflib) -> sent with the
+  stored pair as an "edit this translation" hint
+- anything else -> translated normally
+
+The memory holds at most "transmem_max_entries" sentences per install; the
+least recently used ones are evicted.
+
+Can be used as a module (from texttools.py) or as a CLI:
+    python transmem.py --stats
+    python transmem.py --clear
+"""
+
+import difflib
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from config import app_data_dir, get_setting
+from memprofile import register_trim
+
+NUM_PERM = 64            # MinHash signature length
+BANDS = 16               # LSH bands (NUM_PERM / BANDS rows each)
+SHINGLE = 4              # Character n-gram size
+MAX_CANDIDATES = 20      # Verified per sentence, best first
+
+_PRIME = 4_294_967_311   # > 2**32
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, 2**31, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2**31, NUM_PERM, dtype=np.uint64)
+
+# Sentence ends, or line breaks (kept as separators when reassembling)
+_SENTENCE_SPLIT = re.compile(r"((?<=[.!?…])[ \t]+|\s*\n\s*)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentences (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    mode      TEXT NOT NULL,
+    key       TEXT NOT NULL,
+    source    TEXT NOT NULL,
+    target    TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    used      REAL NOT NULL,
+    UNIQUE (mode, key)
+);
+CREATE INDEX IF NOT EXISTS sentences_used ON sentences(used);
+"""
+
+
+def default_path() -> str:
+    return os.path.join(app_data_dir(), "transmem.sqlite3")
+
+
+def split_sentences(text: str) -> list[str]:
+    """Splits text into alternating [sentence, separator, sentence, ...] parts.
+
+    "".join(parts) == text, so translated sentences can be put back in place.
+    """
+    return _SENTENCE_SPLIT.split(text)
+
+
+def normalize(sentence: str) -> str:
+    return " ".join(sentence.split())
+
+
+def _key(sentence: str) -> str:
+    return hashlib.sha1(normalize(sentence).encode("utf-8")).hexdigest()
+
+
+def minhash(sentence: str) -> np.ndarray:
+    """Returns the MinHash signature (NUM_PERM x uint32) of a sentence."""
+    text = normalize(sentence).lower()
+    if len(text) < SHINGLE:
+        text = text.ljust(SHINGLE)
+    shingles = np.fromiter(
+        {zlib.crc32(text[i:i + SHINGLE].encode("utf-8")) for i in range(len(text) - SHINGLE + 1)},
+        dtype=np.uint64,
+    )
+    hashed = (_PERM_A[:, None] * shingles[None, :] + _PERM_B[:, None]) % _PRIME
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def _bands(signature: np.ndarray) -> list[bytes]:
+    rows = NUM_PERM // BANDS
+    return [bytes([b]) + signature[b * rows:(b + 1) * rows].tobytes() for b in range(BANDS)]
+
+
+class TranslationMemory:
+    """Persistent sentence store with an in-memory LSH index.
+
+    Usage:
+        tm = TranslationMemory()
+        tm.lookup("translate_de", "Thanks for your message.")
+        # -> ("exact", "Danke für Ihre Nachricht.") / ("fuzzy", (src, tgt)) / (None, None)
+        tm.store("translate_de", "Thanks for your message.", "Danke für Ihre Nachricht.")
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self._path = path or default_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        # (mode, band) -> entry ids; built on first lookup, dropped by drop_index()
+        self._index: dict[tuple[str, bytes], set[int]] | None = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def drop_index(self) -> None:
+        """Releases the in-memory LSH index (rebuilt on demand)."""
+        with self._lock:
+            self._index = None
+
+    # --- Lookup ---
+
+    def lookup(self, mode: str, sentence: str) -> tuple[str | None, object]:
+        """Returns ("exact", target), ("fuzzy", (source, target)) or (None, None)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, target FROM sentences WHERE mode = ? AND key = ?",
+                (mode, _key(sentence)),
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE sentences SET used = ? WHERE id = ?", (time.time(), row[0]))
+                self._conn.commit()
+                return "exact", row[1]
+
+            index = self._ensure_index()
+            signature = minhash(sentence)
+            votes: dict[int, int] = {}
+            for band in _bands(signature):
+                for entry_id in index.get((mode, band), ()):
+                    votes[entry_id] = votes.get(entry_id, 0) + 1
+            if not votes:
+                return None, None
+
+            best = sorted(votes, key=votes.get, reverse=True)[:MAX_CANDIDATES]
+            rows = self._conn.execute(
+                f"SELECT id, source, target FROM sentences WHERE id IN ({','.join('?' * len(best))})",
+                best,
+            ).fetchall()
+
+        threshold = float(get_setting("transmem_fuzzy_threshold"))
+        wanted = normalize(sentence)
+        scored = [
+            (difflib.SequenceMatcher(None, wanted, normalize(source)).ratio(), entry_id, source, target)
+            for entry_id, source, target in rows
+        ]
+        ratio, entry_id, source, target = max(scored)
+        if ratio < threshold:
+            return None, None
+        with self._lock:
+            self._conn.execute("UPDATE sentences SET used = ? WHERE id = ?", (time.time(), entry_id))
+            self._conn.commit()
+        return "fuzzy", (source, target)
+
+    # --- Writing ---
+
+    def store(self, mode: str, source: str, target: str) -> None:
+        """Adds or refreshes a sentence pair and evicts beyond the size limit."""
+        signature = minhash(source)
+        key = _key(source)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sentences (mode, key, source, target, signature, used) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(mode, key) DO UPDATE SET target = excluded.target, used = excluded.used",
+                (mode, key, source, target, signature.tobytes(), time.time()),
+            )
+            if self._index is not None:
+                entry_id = self._conn.execute(
+                    "SELECT id FROM sentences WHERE mode = ? AND key = ?", (mode, key)
+                ).fetchone()[0]
+                for band in _bands(signature):
+                    self._index.setdefault((mode, band), set()).add(entry_id)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Deletes the least recently used sentences beyond the limit (lock held)."""
+        max_entries = int(get_setting("transmem_max_entries"))
+        stale = self._conn.execute(
+            "SELECT id FROM sentences ORDER BY used DESC LIMIT -1 OFFSET ?", (max_entries,)
+        ).fetchall()
+        if not stale:
+            return
+        ids = [row[0] for row in stale]
+        self._conn.executemany("DELETE FROM sentences WHERE id = ?", [(i,) for i in ids])
+        if self._index is not None:
+            gone = set(ids)
+            for entries in self._index.values():
+                entries -= gone
+
+    def _ensure_index(self) -> dict[tuple[str, bytes], set[int]]:
+        if self._index is None:
+            index: dict[tuple[str, bytes], set[int]] = {}
+            for entry_id, mode, blob in self._conn.execute(
+                "SELECT id, mode, signature FROM sentences"
+            ):
+                for band in _bands(np.frombuffer(blob, dtype=np.uint32)):
+                    index.setdefault((mode, band), set()).add(entry_id)
+            self._index = index
+        return self._index
+
+    # --- Maintenance ---
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT mode, COUNT(*) FROM sentences GROUP BY mode"
+            ).fetchall()
+        return dict(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sentences")
+            self._conn.commit()
+            self._index = None
+
+
+# ---------------------------------------------------------------------------
+# Shared instance
+# ---------------------------------------------------------------------------
+
+_memory: TranslationMemory | None = None
+_memory_lock = threading.Lock()
+
+
+def get_memory() -> TranslationMemory | None:
+    """Returns the shared memory, or None if the database cannot be opened."""
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            try:
+                _memory = TranslationMemory()
+            except sqlite3.Error:
+                return None
+            register_trim(_memory.drop_index)
+        return _memory
+
+
+# ---------------------------------------------------------------------------
+# CLI interface
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    memory = TranslationMemory()
+    if "--clear" in sys.argv:
+        memory.clear()
+        print("  Translation memory cleared.")
+    elif "--stats" in sys.argv:
+        counts = memory.stats()
+        print(f"  {sum(counts.values())} sentences (limit {get_setting('transmem_max_entries')})")
+        for mode, count in sorted(counts.items()):
+            print(f"    {mode:<14} {count}")
+    else:
+        print("Usage: python transmem.py [--stats | --clear]")
@@ -0,0 +1,90 @@
+"""Streaming energy-based voice activity detection (end-of-speech).
+
+Fed with the recorder's callback blocks, EnergyVAD tracks the background
+noise level (seeded from the first block, then a running minimum: follows
+drops quickly and rises slowly, and only on unvoiced blocks -- so speech
+never raises it and a take is never cut short by a rising floor) and
+reports when the speaker has finished:
+
+    voiced block       RMS above max(noise floor x NOISE_RATIO, ABS_THRESHOLD)
+    hangover_ms        after a voiced block, quieter blocks still count as
+                       speech (word endings, short breaths)
+    min_speech_ms      voiced audio needed before auto-stop is armed
+    silence_ms         trailing silence (after the hangover) that ends the take
+
+The cost is one RMS per block -- cheap enough for the audio callback.
+
+Usage:
+    vad = EnergyVAD(16_000, silence_ms=1200, hangover_ms=300, min_speech_ms=500)
+    if vad.update(block):   # True once, when speech has ended
+        ...
+"""
+
+import math
+
+import numpy as np
+
+NOISE_RATIO = 2.0        # Voiced: ~6 dB above the noise floor
+ABS_THRESHOLD = 300.0    # ... and above this RMS (int16, about -40 dBFS)
+NOISE_FALL_MS = 100.0    # Noise floor time constant when the level drops
+NOISE_RISE_MS = 10_000.0  # ... and when it rises
+MIN_NOISE = 30.0         # Noise floor lower bound (int16 RMS)
+
+
+class EnergyVAD:
+    """End-of-speech detector over int16 blocks (frames x channels)."""
+
+    def __init__(
+        self,
+        rate: int,
+        silence_ms: int = 1200,
+        hangover_ms: int = 300,
+        min_speech_ms: int = 500,
+    ) -> None:
+        self.rate = rate
+        self.silence_ms = silence_ms
+        self.hangover_ms = hangover_ms
+        self.min_speech_ms = min_speech_ms
+        self.reset()
+
+    def reset(self) -> None:
+        self.noise: float | None = None  # Seeded from the first block
+        self.speech_ms = 0.0      # Voiced time in this take
+        self._quiet_ms = 0.0      # Time since the last voiced block
+        self._ended = False
+
+    @property
+    def ended(self) -> bool:
+        return self._ended
+
+    def update(self, block: np.ndarray) -> bool:
+        """Processes one block; returns True once when speech has ended."""
+        if self._ended or len(block) == 0:
+            return False
+        duration_ms = len(block) * 1000.0 / self.rate
+        samples = block.astype(np.float32)
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        if self.noise is None:
+            # A take usually starts before the first word; if not, the fast
+            # fall time pulls the floor down in the first pause
+            self.noise = max(rms, MIN_NOISE)
+        voiced = rms > max(self.noise * NOISE_RATIO, ABS_THRESHOLD)
+
+        if rms < self.noise or not voiced:
+            tau = NOISE_FALL_MS if rms < self.noise else NOISE_RISE_MS
+            self.noise += (rms - self.noise) * (1.0 - math.exp(-duration_ms / tau))
+            self.noise = max(self.noise, MIN_NOISE)
+
+        if voiced:
+            self.speech_ms += duration_ms
+            self._quiet_ms = 0.0
+            return False
+
+        self._quiet_ms += duration_ms
+        if (
+            self.speech_ms >= self.min_speech_ms
+            and self._quiet_ms - self.hangover_ms >= self.silence_ms
+        ):
+            self._ended = True
+            return True
+        return False
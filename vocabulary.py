@@ -0,0 +1,256 @@
+"""Custom vocabulary: fixes product names, acronyms and names in transcripts.
+
+The user dictionary (vocabulary.txt in the app data folder, or the
+"vocabulary_path" setting) holds one rule per line:
+
+    # Comments start with "#" (at the line start or after a space)
+    voice ease | voys => Voiz     # Any variant on the left becomes the right side
+    Kubernetes                    # Bare term: only fixes its capitalization
+    k8s | cube cuddle => Kubernetes
+
+All variants are compiled into one Aho-Corasick automaton, so a transcript
+is scanned once no matter how many rules there are. Matching ignores case
+and only accepts whole words; overlapping matches resolve to the leftmost,
+then longest one. Replacements are inserted as written, except that a
+lowercase replacement at the start of a sentence is capitalized.
+
+The replacement terms are also sent to the transcription model as a
+`prompt` hint, so they are often spelled right in the first place. The
+file is reloaded when it changes.
+
+Can be used as a module (from transcriber.py) or as a CLI:
+    python vocabulary.py --check
+    python vocabulary.py --apply "we deployed voys on k8s"
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+
+from config import app_data_dir, get_setting
+
+PROMPT_MAX_CHARS = 800  # The prompt hint is capped at ~224 tokens by Whisper
+
+
+def default_path() -> str:
+    return os.path.join(app_data_dir(), "vocabulary.txt")
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _fold(text: str) -> str:
+    """Lowercases text without changing its length (keeps indices aligned)."""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class Vocabulary:
+    """Compiled replacement dictionary (Aho-Corasick automaton).
+
+    Usage:
+        vocab = Vocabulary.parse("voys => Voiz\\nK8s => Kubernetes")
+        vocab.apply("we deployed voys on k8s")  # "we deployed Voiz on Kubernetes"
+    """
+
+    def __init__(self, rules: list[tuple[str, str]]) -> None:
+        self.rules = rules
+        # Trie nodes: transitions, failure link, matched rule, next match on the fail chain
+        self._goto: list[dict[str, int]] = [{}]
+        self._rule: list[int] = [-1]
+        self._depth: list[int] = [0]
+        self._fail: list[int] = [0]
+        self._link: list[int] = [0]
+        for index, (pattern, _) in enumerate(rules):
+            self._insert(_fold(pattern), index)
+        self._build_links()
+
+    @classmethod
+    def parse(cls, source: str) -> "Vocabulary":
+        """Builds a Vocabulary from dictionary text (see module docstring)."""
+        rules: list[tuple[str, str]] = []
+        seen: set[str] = set()
+        for line in source.splitlines():
+            line = re.split(r"(?:^|\s)#", line, maxsplit=1)[0].strip()  # Keeps "C#"
+            if not line:
+                continue
+            if "=>" in line:
+                left, target = (part.strip() for part in line.split("=>", 1))
+                variants = [v.strip() for v in left.split("|")]
+            else:
+                target, variants = line, [line]
+            if not target:
+                continue
+            for variant in variants:
+                key = _fold(variant)
+                if variant and key not in seen:  # First rule for a variant wins
+                    seen.add(key)
+                    rules.append((variant, target))
+        return cls(rules)
+
+    # --- Building ---
+
+    def _insert(self, pattern: str, index: int) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._rule.append(-1)
+                self._depth.append(self._depth[node] + 1)
+                self._fail.append(0)
+                self._link.append(0)
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._rule[node] = index
+
+    def _build_links(self) -> None:
+        """Breadth-first pass setting failure and output (dictionary) links."""
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                f = self._fail[child]
+                self._link[child] = f if self._rule[f] >= 0 else self._link[f]
+                queue.append(child)
+
+    # --- Matching ---
+
+    def apply(self, text: str) -> str:
+        """Returns text with every whole-word variant replaced."""
+        if not self.rules or not text:
+            return text
+        folded = _fold(text)
+        goto, fail, rule, depth, link = self._goto, self._fail, self._rule, self._depth, self._link
+        n = len(text)
+
+        # Candidates as (start, end, rule) for every accepted match
+        matches: list[tuple[int, int, int]] = []
+        node = 0
+        for i, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            out = node if rule[node] >= 0 else link[node]
+            while out:
+                start = i + 1 - depth[out]
+                end = i + 1
+                if (
+                    (start == 0 or not _is_word_char(text[start - 1])
+                     or not _is_word_char(text[start]))
+                    and (end == n or not _is_word_char(text[end])
+                         or not _is_word_char(text[end - 1]))
+                ):
+                    matches.append((start, end, rule[out]))
+                out = link[out]
+        if not matches:
+            return text
+
+        # Leftmost, then longest; skip matches overlapping an accepted one
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        parts: list[str] = []
+        pos = 0
+        for start, end, index in matches:
+            if start < pos:
+                continue
+            target = self.rules[index][1]
+            if target[:1].islower() and text[start:start + 1].isupper() and _sentence_start(text, start):
+                target = target[0].upper() + target[1:]
+            parts.append(text[pos:start])
+            parts.append(target)
+            pos = end
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    def prompt_hint(self, max_chars: int = PROMPT_MAX_CHARS) -> str:
+        """Returns the replacement terms as a transcription prompt (file order)."""
+        terms: list[str] = []
+        seen: set[str] = set()
+        length = 0
+        for _, target in self.rules:
+            if _fold(target) in seen:
+                continue
+            if length + len(target) + 2 > max_chars:
+                break
+            seen.add(_fold(target))
+            terms.append(target)
+            length += len(target) + 2
+        return ", ".join(terms) + "." if terms else ""
+
+
+def _sentence_start(text: str, index: int) -> bool:
+    """True if only whitespace separates index from the previous sentence end."""
+    before = text[:index].rstrip()
+    return not before or before[-1] in ".!?:\n"
+
+
+# ---------------------------------------------------------------------------
+# Loading (cached, reloaded on change)
+# ---------------------------------------------------------------------------
+
+_EMPTY = Vocabulary([])
+_cache: dict = {"path": None, "mtime": None, "vocab": _EMPTY}
+_cache_lock = threading.Lock()
+
+
+def vocabulary_path() -> str:
+    return str(get_setting("vocabulary_path") or "") or default_path()
+
+
+def get_vocabulary() -> Vocabulary:
+    """Returns the compiled dictionary; re-reads the file only when it changed."""
+    path = vocabulary_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    with _cache_lock:
+        if path != _cache["path"] or mtime != _cache["mtime"]:
+            vocab = _EMPTY
+            if mtime is not None:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        vocab = Vocabulary.parse(f.read())
+                except (OSError, UnicodeDecodeError):
+                    pass  # Unreadable file -> no rules
+            _cache.update(path=path, mtime=mtime, vocab=vocab)
+        return _cache["vocab"]
+
+
+def apply_vocabulary(text: str) -> str:
+    """Post-processes a transcript with the user dictionary."""
+    return get_vocabulary().apply(text)
+
+
+def prompt_hint() -> str:
+    """Returns the transcription prompt hint ("" if disabled or no rules)."""
+    if not get_setting("vocabulary_prompt"):
+        return ""
+    return get_vocabulary().prompt_hint()
+
+
+# ---------------------------------------------------------------------------
+# CLI interface
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        t0 = time.perf_counter()
+        vocab = get_vocabulary()
+        print(f"  File:   {vocabulary_path()}")
+        print(f"  Rules:  {len(vocab.rules)} (loaded in {(time.perf_counter() - t0) * 1000:.1f} ms)")
+        print(f"  Prompt: {prompt_hint() or '-'}")
+    elif "--apply" in sys.argv and sys.argv.index("--apply") + 1 < len(sys.argv):
+        print(apply_vocabulary(sys.argv[sys.argv.index("--apply") + 1]))
+    else:
+        print('Usage: python vocabulary.py [--check | --apply "text"]')
@@ -7,6 +7,14 @@ When built with PyInstaller, this is the single entry point for everything:
   voiz.exe --toolpicker     -> Show the tool picker popup (subprocess)
   voiz.exe --api-key-dialog -> Show the API key input dialog (subprocess)
   voiz.exe --error-dialog   -> Show an error message dialog (subprocess)
+  voiz.exe --daemon         -> Headless local API (no tray, no hotkeys)
+  voiz.exe --mem-report     -> Start the main app with allocation tracing
+                               (reports via tray -> Diagnostics -> Memory Report)
+  voiz.exe --profile N      -> Start the main app and sample all threads for N s
+                               (folded stacks in the log folder, see profiler.py)
+
+Worker processes (see workers.py) are started through this entry point too;
+multiprocessing.freeze_support() lets the frozen .exe run them.
 """
 
 import os
@@ -54,12 +62,22 @@ def _run_error_dialog() -> None:
 
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # Returns at once unless this is a frozen worker
+
     if "--toolpicker" in sys.argv:
         _run_toolpicker()
     elif "--api-key-dialog" in sys.argv:
         _run_api_key_dialog()
     elif "--error-dialog" in sys.argv:
         _run_error_dialog()
+    elif "--daemon" in sys.argv:
+        from daemon import serve
+        serve()
     else:
+        if "--mem-report" in sys.argv:
+            # Start tracing before main's imports so they show up in reports
+            import tracemalloc
+            tracemalloc.start(10)
         from main import main
         main()
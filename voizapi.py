@@ -0,0 +1,353 @@
+"""Voiz as a library: transcription and text tools without the tray app.
+
+Sync:
+    from voizapi import Voiz
+    voiz = Voiz()                            # Key from the keyring / OPENAI_API_KEY
+    text = voiz.transcribe("memo.wav")       # WAV path or bytes
+    slack = voiz.optimize(text, "slack")
+    for delta in voiz.stream_transcription("memo.wav"):
+        print(delta, end="")
+    texts = voiz.transcribe_many(paths)      # Results in input order
+    for index, result in voiz.iter_optimize_many(texts, "email"):  # As they finish
+        ...
+
+Async (same methods as coroutines; the iterators are async iterators):
+    async with AsyncVoiz(concurrency=8) as voiz:
+        texts = await voiz.transcribe_many(paths)
+        async for delta in voiz.stream_transcription(wav_bytes):
+            ...
+
+Calls go through the same pipeline as the app (endpoint pool, custom
+vocabulary, translation memory, local model) and read the same settings
+file. Batches run up to `concurrency` requests at once; with
+return_exceptions=True a failed item yields its exception instead of
+aborting the batch, otherwise the first error cancels the rest.
+
+client= injects a ready-made synchronous OpenAI client (openai.OpenAI, a
+client with a custom http_client, or a test double with the same
+interface). It replaces the configured endpoints for this instance only
+and is never closed by Voiz. lane= queues the calls in the process-wide
+priority scheduler (scheduler.py) -- useful when embedded next to the tray
+app; by default calls run directly.
+
+Recording is available separately: `from recorder import Recorder` (needs
+sounddevice).
+"""
+
+import asyncio
+import os
+import queue
+import threading
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TypeVar
+
+from openai import OpenAI
+
+import scheduler
+from config import get_api_key
+from endpoints import EndpointPool, pool_for_client, using_pool
+from jobs import CancelToken
+from texttools import SYSTEM_PROMPTS, optimize_text
+from transcriber import transcribe
+
+T = TypeVar("T")
+
+Audio = bytes | str | os.PathLike  # WAV bytes or a path to a WAV file
+
+_DONE = object()  # End marker for the streaming iterators
+
+
+def _read_audio(audio: Audio) -> bytes:
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return bytes(audio)
+    with open(audio, "rb") as f:
+        return f.read()
+
+
+class Voiz:
+    """Synchronous API; safe to share between threads.
+
+    Args:
+        api_key: OpenAI API key (default: OPENAI_API_KEY, then the key
+            stored by the app). Not needed with client=.
+        client: Optional OpenAI client used for every call of this instance.
+        concurrency: Requests in flight at once in the *_many methods.
+        lane: Optional scheduler lane ("interactive", "speculative",
+            "background"); None runs calls directly.
+
+    Raises:
+        ValueError: If no API key is available or the lane is unknown.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        client: OpenAI | None = None,
+        concurrency: int = 4,
+        lane: str | None = None,
+    ) -> None:
+        self._pool: EndpointPool | None = pool_for_client(client) if client is not None else None
+        self._api_key = api_key or ""
+        if self._pool is None and not self._api_key:
+            self._api_key = os.environ.get("OPENAI_API_KEY") or get_api_key() or ""
+            if not self._api_key:
+                raise ValueError("No API key: pass api_key= or client=, or set OPENAI_API_KEY")
+        if lane is not None and lane not in scheduler.LANES:
+            raise ValueError(f"Unknown lane: {lane}. Use: {list(scheduler.LANES)}")
+        self.concurrency = max(1, concurrency)
+        self._lane = lane
+
+    @property
+    def modes(self) -> list[str]:
+        """Text tool modes accepted by optimize()."""
+        return list(SYSTEM_PROMPTS)
+
+    # --- Single calls ---
+
+    def transcribe(self, audio: Audio, cancel: CancelToken | None = None) -> str:
+        """Returns the transcript of a WAV file (path or bytes)."""
+        return self._transcribe(audio, cancel)
+
+    def optimize(self, text: str, mode: str, cancel: CancelToken | None = None) -> str:
+        """Returns text rewritten by a text tool ("email", "slack", ...)."""
+        return self._optimize(text, mode, cancel)
+
+    def stream_transcription(self, audio: Audio) -> Iterator[str]:
+        """Yields the transcript in pieces as they are decoded.
+
+        Models that cannot stream (whisper-1) yield the whole transcript as
+        one piece. Leaving the loop early aborts the request.
+        """
+        pieces: queue.Queue = queue.Queue()
+        cancel = CancelToken()
+        outcome: dict[str, object] = {}
+
+        def _target() -> None:
+            try:
+                outcome["text"] = self._transcribe(audio, cancel, pieces.put)
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                pieces.put(_DONE)
+
+        threading.Thread(target=_target, name="voizapi-stream", daemon=True).start()
+        emitted = False
+        try:
+            while (piece := pieces.get()) is not _DONE:
+                emitted = True
+                yield piece
+            if "error" in outcome:
+                raise outcome["error"]
+            if not emitted and outcome["text"]:
+                yield outcome["text"]
+        finally:
+            cancel.cancel()  # No-op once finished; aborts if the caller left early
+
+    # --- Batches ---
+
+    def transcribe_many(self, audios: Iterable[Audio], return_exceptions: bool = False) -> list:
+        """Transcribes several files concurrently; results in input order."""
+        return self._collect(self.iter_transcribe_many(audios, return_exceptions))
+
+    def optimize_many(
+        self, texts: Iterable[str], mode: str, return_exceptions: bool = False
+    ) -> list:
+        """Runs one text tool over several texts concurrently; results in input order."""
+        return self._collect(self.iter_optimize_many(texts, mode, return_exceptions))
+
+    def iter_transcribe_many(
+        self, audios: Iterable[Audio], return_exceptions: bool = False
+    ) -> Iterator[tuple[int, object]]:
+        """Yields (input index, transcript) as each file finishes."""
+        return self._iter_many(self._transcribe, list(audios), return_exceptions)
+
+    def iter_optimize_many(
+        self, texts: Iterable[str], mode: str, return_exceptions: bool = False
+    ) -> Iterator[tuple[int, object]]:
+        """Yields (input index, result) as each text finishes."""
+        return self._iter_many(
+            lambda text, cancel: self._optimize(text, mode, cancel), list(texts), return_exceptions
+        )
+
+    # --- Internals ---
+
+    def _transcribe(
+        self,
+        audio: Audio,
+        cancel: CancelToken | None = None,
+        on_delta: Callable[[str], None] | None = None,
+    ) -> str:
+        data = _read_audio(audio)
+        return self._run(
+            lambda token: transcribe(data, self._api_key, on_delta=on_delta, cancel=token), cancel
+        )
+
+    def _optimize(self, text: str, mode: str, cancel: CancelToken | None = None) -> str:
+        return self._run(lambda token: optimize_text(text, mode, self._api_key, cancel=token), cancel)
+
+    def _run(self, fn: Callable[[CancelToken | None], T], cancel: CancelToken | None) -> T:
+        with using_pool(self._pool):
+            if self._lane is None:
+                return fn(cancel)
+            return scheduler.run(self._lane, fn, cancel)
+
+    def _iter_many(
+        self,
+        fn: Callable[[object, CancelToken], str],
+        items: list,
+        return_exceptions: bool,
+    ) -> Iterator[tuple[int, object]]:
+        if not items:
+            return
+        cancel = CancelToken()
+        workers = min(self.concurrency, len(items))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="voizapi") as pool:
+            futures = {pool.submit(fn, item, cancel): i for i, item in enumerate(items)}
+            try:
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if not return_exceptions:
+                            raise
+                        result = e
+                    yield futures[future], result
+            finally:
+                # First error, or the caller stopped iterating -> drop the rest
+                cancel.cancel()
+                for future in futures:
+                    future.cancel()
+
+    @staticmethod
+    def _collect(pairs: Iterator[tuple[int, object]]) -> list:
+        results: dict[int, object] = dict(pairs)
+        return [results[i] for i in range(len(results))]
+
+
+class AsyncVoiz:
+    """asyncio API; same arguments and methods as Voiz.
+
+    Requests run on a thread pool of `concurrency` threads owned by this
+    instance -- close it (or use "async with") when done. Cancelling a task
+    aborts its HTTP request.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        client: OpenAI | None = None,
+        concurrency: int = 4,
+        lane: str | None = None,
+    ) -> None:
+        self._sync = Voiz(api_key, client, concurrency, lane)
+        self._executor = ThreadPoolExecutor(max_workers=self._sync.concurrency,
+                                            thread_name_prefix="voizapi")
+
+    async def __aenter__(self) -> "AsyncVoiz":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Shuts down the thread pool (waits for running requests)."""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    @property
+    def modes(self) -> list[str]:
+        return self._sync.modes
+
+    # --- Single calls ---
+
+    async def transcribe(self, audio: Audio) -> str:
+        return await self._call(self._sync._transcribe, audio)
+
+    async def optimize(self, text: str, mode: str) -> str:
+        return await self._call(lambda t, cancel: self._sync._optimize(t, mode, cancel), text)
+
+    async def stream_transcription(self, audio: Audio) -> AsyncIterator[str]:
+        """Yields the transcript in pieces as they are decoded (see Voiz)."""
+        loop = asyncio.get_running_loop()
+        pieces: asyncio.Queue = asyncio.Queue()
+        cancel = CancelToken()
+        future = loop.run_in_executor(
+            self._executor,
+            self._sync._transcribe,
+            audio,
+            cancel,
+            lambda piece: loop.call_soon_threadsafe(pieces.put_nowait, piece),
+        )
+        # Scheduled after every piece the worker queued before finishing
+        future.add_done_callback(lambda _: pieces.put_nowait(_DONE))
+        emitted = False
+        try:
+            while (piece := await pieces.get()) is not _DONE:
+                emitted = True
+                yield piece
+            text = await future
+            if not emitted and text:
+                yield text
+        finally:
+            cancel.cancel()
+
+    # --- Batches ---
+
+    async def transcribe_many(self, audios: Iterable[Audio], return_exceptions: bool = False) -> list:
+        return await self._collect(self.iter_transcribe_many(audios, return_exceptions))
+
+    async def optimize_many(
+        self, texts: Iterable[str], mode: str, return_exceptions: bool = False
+    ) -> list:
+        return await self._collect(self.iter_optimize_many(texts, mode, return_exceptions))
+
+    def iter_transcribe_many(
+        self, audios: Iterable[Audio], return_exceptions: bool = False
+    ) -> AsyncIterator[tuple[int, object]]:
+        return self._iter_many(self._sync._transcribe, list(audios), return_exceptions)
+
+    def iter_optimize_many(
+        self, texts: Iterable[str], mode: str, return_exceptions: bool = False
+    ) -> AsyncIterator[tuple[int, object]]:
+        return self._iter_many(
+            lambda text, cancel: self._sync._optimize(text, mode, cancel), list(texts), return_exceptions
+        )
+
+    # --- Internals ---
+
+    async def _call(self, fn: Callable[[object, CancelToken], T], item: object) -> T:
+        cancel = CancelToken()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, item, cancel)
+        except asyncio.CancelledError:
+            cancel.cancel()
+            raise
+
+    async def _iter_many(
+        self,
+        fn: Callable[[object, CancelToken], str],
+        items: list,
+        return_exceptions: bool,
+    ) -> AsyncIterator[tuple[int, object]]:
+        async def _one(index: int, item: object) -> tuple[int, object]:
+            try:
+                return index, await self._call(fn, item)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return index, e
+
+        # The executor already limits concurrency; queued tasks just wait for a thread
+        tasks = [asyncio.ensure_future(_one(i, item)) for i, item in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _collect(pairs: AsyncIterator[tuple[int, object]]) -> list:
+        results = {index: result async for index, result in pairs}
+        return [results[i] for i in range(len(results))]
@@ -0,0 +1,140 @@
+"""Warm worker-process pool for CPU-heavy audio stages.
+
+Resampling and WAV encoding of a finished take run in a separate process,
+so they do not hold the GIL while the hotkey listener and the tray loop
+need it. The recorded blocks are copied once into a
+multiprocessing.shared_memory segment and the worker reads them in place;
+only the segment name, shape and rate are pickled. The pool is started
+once (spawn, also on Linux -- forking a process with audio and hotkey
+threads is unsafe) and stays warm between takes.
+
+Enabled with the "worker_processes" setting (0 = everything stays in the
+tray process). voiz.pyw calls multiprocessing.freeze_support() so the
+frozen .exe can start workers.
+
+Usage:
+    pool = WorkerPool(1)
+    pool.start()
+    wav_bytes = pool.encode_take(frames, rate)   # list of int16 blocks
+"""
+
+import io
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import soundfile as sf
+
+from metrics import log_metric
+
+TARGET_RATE = 16_000  # Same as recorder.SAMPLE_RATE (not imported: no sounddevice in workers)
+CHUNK_S = 1            # Seconds of audio per resampler call
+
+
+def _worker_init() -> None:
+    """Imports the heavy modules once per worker, before the first job."""
+    import resample  # noqa: F401
+
+
+def _ping() -> bool:
+    return True
+
+
+def encode_wav(audio: np.ndarray, rate: int) -> bytes:
+    """Converts int16 audio (frames x channels) to 16 kHz mono WAV bytes."""
+    if rate != TARGET_RATE or (audio.ndim == 2 and audio.shape[1] != 1):
+        from resample import StreamResampler
+
+        resampler = StreamResampler(rate, TARGET_RATE)
+        step = rate * CHUNK_S  # Bounded temporaries, like the recorder's converter
+        parts = [resampler.process(audio[i:i + step]) for i in range(0, len(audio), step)]
+        audio = np.concatenate(parts + [resampler.flush()])
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, TARGET_RATE, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def _encode_shared(name: str, shape: tuple[int, ...], rate: int) -> bytes:
+    """Worker side: reads the take from shared memory and encodes it."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return encode_wav(np.ndarray(shape, dtype=np.int16, buffer=shm.buf), rate)
+    finally:
+        shm.close()
+
+
+class WorkerPool:
+    """Process pool that stays warm; falls back to in-process work if broken."""
+
+    def __init__(self, processes: int = 1) -> None:
+        self._processes = max(1, processes)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Spawns the workers now (not on the first take) and warms them up."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_worker_init,
+                )
+                for _ in range(self._processes):
+                    self._executor.submit(_ping)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def encode_take(self, frames: list[np.ndarray], rate: int) -> bytes:
+        """Encodes recorded int16 blocks to 16 kHz mono WAV in a worker.
+
+        The blocks are copied straight into shared memory (no intermediate
+        concatenation, no pickling of the audio).
+        """
+        channels = frames[0].shape[1] if frames[0].ndim == 2 else 1
+        total = sum(len(f) for f in frames)
+        shape = (total, channels)
+        if self._executor is None:
+            self.start()
+
+        try:
+            shm = shared_memory.SharedMemory(create=True, size=max(1, total * channels * 2))
+        except OSError:
+            # No shared memory (e.g. /dev/shm full) -- encode in this process
+            log_metric("worker_shm_failed")
+            return encode_wav(np.concatenate(frames, axis=0), rate)
+        try:
+            audio = np.ndarray(shape, dtype=np.int16, buffer=shm.buf)
+            pos = 0
+            for block in frames:
+                audio[pos:pos + len(block)] = block.reshape(len(block), channels)
+                pos += len(block)
+            del audio
+            try:
+                return self._executor.submit(_encode_shared, shm.name, shape, rate).result()
+            except BrokenProcessPool:
+                # A worker died (e.g. killed) -- restart the pool for the next take
+                log_metric("worker_pool_broken")
+                self.shutdown()
+                return encode_wav(np.concatenate(frames, axis=0), rate)
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+_pool: WorkerPool | None = None
+
+
+def get_pool(processes: int = 1) -> WorkerPool:
+    """Returns the shared worker pool (created on first use)."""
+    global _pool
+    if _pool is None:
+        _pool = WorkerPool(processes)
+    return _pool